@@ -1,18 +1,80 @@
 import os
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     # アプリケーション設定
     APP_NAME: str = "営業リスト処理API"
     DEBUG: bool = True
+    LOG_LEVEL: str = "INFO"  # ログの出力レベル（DEBUGにするとデータの内容・段階ごとの所要時間も出力する）
     
     # ファイルアップロード設定
     UPLOAD_DIR: str = "uploads"
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
     ALLOWED_EXTENSIONS: list = ["xlsx", "xls", "csv"]
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # 保存時に1回で読み込むサイズ（1MB）
+    UPLOAD_SHARD_DEPTH: int = 0  # ファイルIDで振り分けるサブディレクトリの階層数（0の場合は振り分けない）
     
     # データ処理設定
     REQUIRED_COLUMNS: list = ["会社名"]  # 必須カラム
+    PROCESS_CHUNK_SIZE: int = 10000  # ストリーミング処理時の1チャンクあたりの行数
+    COLUMN_SYNONYMS_PATH: str = ""  # カラム名の同義語辞書（JSON）。既定の辞書に追加される
+    COLUMN_FUZZY_CUTOFF: float = 0.85  # カラム名のあいまい一致に必要な類似度（0〜1）
+    TYPE_INFERENCE_SAMPLE_SIZE: int = 1000  # 型の推定に使用する1カラムあたりのサンプル数
+    CATEGORICAL_MAX_UNIQUE: int = 50  # カテゴリとみなすサンプル内の値の種類数の上限
+    CSV_ENCODINGS: list = ["utf-8", "cp932", "euc-jp"]  # CSVのエンコーディングの候補（BOMがない場合に先頭付近を試しに復号して判定する）
+    ENCODING_SAMPLE_SIZE: int = 64 * 1024  # エンコーディングの判定に使用するバイト数
+    EXCEL_READER: str = "fast"  # xlsxの読み込み方法（fast: XMLを直接読み込む / pandas: pandas.read_excel）
+    EXCEL_READ_ALL_SHEETS: bool = False  # 全てのシートを読み込んで連結する（Falseの場合は最初のシートのみ）
+    EXCEL_SHEET_WORKERS: int = 0  # 全てのシートを読み込む場合のプロセス数（0の場合はCPU数。1の場合は並行しない）
+    EXCEL_PARALLEL_MIN_SIZE: int = 8 * 1024 * 1024  # EXCEL_SHEET_WORKERSが0の場合に並行して読み込むファイルサイズの下限（8MB）
+    EXCEL_SHEET_COLUMN: str = "シート名"  # 全てのシートを連結する場合に加える、読み込み元のシート名の列
+    
+    # バックグラウンド処理（ジョブ）の設定
+    JOB_MAX_WORKERS: int = 2  # ファイル処理に使用するプロセス数（同時に実行するジョブ数）
+    JOB_MAX_ACTIVE: int = 10  # 待機中・実行中を合わせたジョブ数の上限（超えると受け付けない）
+    JOB_RETENTION: int = 3600  # 完了したジョブの状態を保持する時間（秒）
+    
+    # 解析済みデータのキャッシュ設定
+    PARSE_CACHE_ENABLED: bool = True
+    PARSE_CACHE_DIR: str = ".parse_cache"  # UPLOAD_DIR配下に作成
+    PARSE_CACHE_MAX_BYTES: int = 500 * 1024 * 1024  # 500MB
+    
+    # 処理済みリストの保存先
+    LIST_STORE_PATH: str = "data/lists.db"
+    
+    # 処理結果の取得・レスポンスの設定
+    ROWS_PAGE_DEFAULT_LIMIT: int = 100  # 行の取得で件数を省略した場合の件数
+    ROWS_PAGE_MAX_LIMIT: int = 10000  # 1回に取得できる行数の上限
+    GZIP_MINIMUM_SIZE: int = 1000  # このサイズ（バイト）以上のレスポンスをgzipで圧縮する（Accept-Encodingで要求された場合）
+    
+    # エクスポート設定
+    EXPORT_BATCH_SIZE: int = 1000  # 1回に読み込む行数
+    EXPORT_SPOOL_MAX_SIZE: int = 10 * 1024 * 1024  # Excel作成時にメモリ上に保持する上限（超えると一時ファイルに書き込む）
+    
+    # LLM設定
+    LLM_MAX_CONCURRENCY: int = 5  # 営業文面の同時生成数（429を受けた場合はLLM_MIN_CONCURRENCYまで自動で減らす）
+    LLM_MIN_CONCURRENCY: int = 1  # 同時生成数を減らす場合の下限
+    LLM_REQUESTS_PER_MINUTE: int = 60  # Gemini APIへの1分あたりの最大リクエスト数
+    LLM_TOKENS_PER_MINUTE: int = 1000000  # Gemini APIへの1分あたりの最大トークン数（入力・出力の見積もりの合計。0の場合は制限しない）
+    LLM_REQUEST_TIMEOUT: float = 60.0  # Gemini APIの1回の呼び出しのタイムアウト（秒）
+    LLM_MAX_RETRIES: int = 4  # レート制限・サーバーエラー・タイムアウト時の再試行回数
+    LLM_RETRY_BASE_DELAY: float = 1.0  # 再試行までの待ち時間の基準（秒）。回数ごとに倍にした範囲からランダムに選ぶ
+    LLM_RETRY_MAX_DELAY: float = 30.0  # 再試行までの待ち時間の上限（秒）
+    DUMMY_LLM_LATENCY: float = 0.0  # 開発環境のダミー生成に加える待ち時間（秒）
+    DUMMY_LLM_SEED: Optional[int] = None  # 指定した場合、ダミー生成で企業IDごとに同じテンプレートを選ぶ（ベンチマークの再現用）
+    LLM_BATCH_SIZE: int = 1  # 1回のリクエストにまとめる企業数（1の場合は企業ごとに生成）
+    GEMINI_MODEL_NAME: str = "gemini-1.5-flash"
+    GEMINI_API_ENDPOINT: str = ""  # 接続先を変更する場合に指定（例: 疑似サーバーの http://127.0.0.1:8001）
+    GEMINI_MODEL_TTL: int = 3600  # モデルの確認結果とクライアントを再利用する時間（秒）
+    SALES_TEXT_REPLAY_BATCH_SIZE: int = 500  # 再接続時に保存済みのイベントを1回に読み込む件数
+    
+    # 営業文面のキャッシュ設定
+    SALES_TEXT_CACHE_ENABLED: bool = True
+    SALES_TEXT_CACHE_PATH: str = "data/sales_text_cache.db"
+    SALES_TEXT_CACHE_MEMORY_SIZE: int = 1000  # メモリ上に保持する件数
+    SALES_TEXT_CACHE_MAX_ENTRIES: int = 100000  # SQLiteに保持する最大件数
+    SALES_TEXT_CACHE_TTL: int = 30 * 24 * 60 * 60  # 30日
     
     class Config:
         env_file = ".env"
@@ -1,16 +1,62 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.middleware.gzip import GZipMiddleware, DEFAULT_EXCLUDED_CONTENT_TYPES
 import uvicorn
+import asyncio
 import os
+import logging
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
-from routers import upload, process, stream, export
+from config import settings
+from routers import upload, process, stream, export, lists
+from services.llm_service import configure_gemini, get_gemini_model
+from services.job_service import job_manager
+from services.sales_text_service import sales_text_runs
+from utils.metrics import render_metrics, CONTENT_TYPE
+
+# ログの設定
+logging.basicConfig(
+    level=settings.LOG_LEVEL.upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+async def warm_up_llm():
+    """
+    本番環境ではGemini APIのクライアントの設定とモデルの準備を起動時に行う
+    （それ以外の環境ではGemini APIを使用しないため、google.generativeaiを読み込まない）
+    """
+    if os.getenv("ENVIRONMENT") == "production":
+        try:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, configure_gemini)
+            await loop.run_in_executor(None, get_gemini_model)
+        except Exception as e:
+            # 起動は継続し、最初のリクエスト時に再度準備する
+            logger.warning("Geminiモデルの準備に失敗しました: %s", str(e))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    起動時: Geminiモデルの準備と、前回の起動時に待機中・実行中のまま終了したファイル処理のジョブを失敗とする
+    終了時: ファイル処理のプロセスプールと、実行中の営業文面の生成を停止する
+    """
+    await warm_up_llm()
+    job_manager.recover()
+    try:
+        yield
+    finally:
+        job_manager.shutdown()
+        await sales_text_runs.shutdown()
 
 # アプリケーションの作成
 app = FastAPI(
     title="営業リスト処理API",
     description="営業リストを受け取り、構造化するAPIサービス",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # CORSミドルウェアの設定
@@ -22,11 +68,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# レスポンスの圧縮（Accept-Encodingでgzipが要求された場合）
+# SSE（text/event-stream）は逐次送信できなくなるため既定で除外され、xlsxは圧縮済みのため除外する
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=settings.GZIP_MINIMUM_SIZE,
+    exclude_content_types=DEFAULT_EXCLUDED_CONTENT_TYPES + (
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ),
+)
+
 # ルーターの登録
 app.include_router(upload.router, prefix="/api", tags=["upload"])
 app.include_router(process.router, prefix="/api", tags=["process"])
 app.include_router(stream.router, prefix="/api", tags=["stream"])
 app.include_router(export.router, prefix="/api", tags=["export"])
+app.include_router(lists.router, prefix="/api", tags=["lists"])
 
 # アップロードディレクトリの作成
 os.makedirs("uploads", exist_ok=True)
@@ -38,6 +95,13 @@ load_dotenv()
 async def root():
     return {"message": "営業リスト処理APIへようこそ"}
 
+@app.get("/metrics")
+async def metrics():
+    """
+    処理件数・所要時間・キャッシュのヒット数などをPrometheusのテキスト形式で返す
+    """
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
 @app.get("/api/test-data")
 async def test_data():
     """
@@ -1,61 +1,63 @@
 from fastapi import APIRouter, Request, HTTPException
 from fastapi.responses import StreamingResponse
-import pandas as pd
+import asyncio
+import csv
 import io
-from typing import List, Dict
+import tempfile
+from typing import List, Dict, Any, AsyncIterator, Iterator
+
+from config import settings
+from utils.metrics import timed, ROWS_PROCESSED, STREAMS_IN_FLIGHT
 
 router = APIRouter()
 
+# エクスポートするカラム
+EXPORT_COLUMNS = ["company_name", "industry", "contact_person", "email",
+                  "phone", "address", "url", "salesText"]
+
+# 日本語カラム名
+COLUMN_LABELS = {
+    "company_name": "会社名",
+    "industry": "業種",
+    "contact_person": "担当者",
+    "email": "メールアドレス",
+    "phone": "電話番号",
+    "address": "住所",
+    "url": "URL",
+    "salesText": "営業文面"
+}
+
 @router.get("/export")
-async def export_data(request: Request, format: str = "csv"):
+async def export_data(request: Request, format: str = "csv", bom: bool = False):
     """
     データをCSVまたはExcelとしてエクスポートする
+    bom=trueの場合、Excelで文字化けしないようCSVの先頭にUTF-8のBOMを付ける
+    保存されていないリストの場合は404を返す（list_idの指定がない場合・"current"はテスト用データを出力する）
     """
+    # services.data_service（pandas）は読み込みに時間がかかるため、初めて使用する時に読み込む
+    from services.data_service import company_list_exists
+    
     try:
         # クエリパラメータからリストIDを取得
         list_id = request.query_params.get("list_id")
         
-        # データの取得（実際の実装ではDBなどから取得）
-        data = await get_company_data(list_id)
-        
-        # DataFrameに変換
-        df = pd.DataFrame(data)
-        
-        # 必要なカラムのみ選択
-        columns = ["company_name", "industry", "contact_person", "email", 
-                   "phone", "address", "url", "salesText"]
-        df = df[columns]
-        
-        # 日本語カラム名に変換
-        column_mapping = {
-            "company_name": "会社名",
-            "industry": "業種",
-            "contact_person": "担当者",
-            "email": "メールアドレス",
-            "phone": "電話番号",
-            "address": "住所",
-            "url": "URL",
-            "salesText": "営業文面"
-        }
-        df = df.rename(columns=column_mapping)
+        # 存在しないリストは、ヘッダーを送信する前に404とする
+        if not await company_list_exists(list_id):
+            raise HTTPException(status_code=404, detail="リストが見つかりません。")
         
         # 指定された形式でエクスポート
         if format.lower() == "csv":
-            output = io.StringIO()
-            df.to_csv(output, index=False, encoding="utf-8")
             response = StreamingResponse(
-                iter([output.getvalue()]),
+                iter_csv(list_id, bom),
                 media_type="text/csv"
             )
             response.headers["Content-Disposition"] = f"attachment; filename=sales_list_{list_id}.csv"
             return response
         
         elif format.lower() == "excel":
-            output = io.BytesIO()
-            df.to_excel(output, index=False, engine="openpyxl")
-            output.seek(0)
+            output = await write_excel(list_id)
             response = StreamingResponse(
-                iter([output.getvalue()]),
+                iter_file(output),
                 media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
             )
             response.headers["Content-Disposition"] = f"attachment; filename=sales_list_{list_id}.xlsx"
@@ -64,5 +66,82 @@ async def export_data(request: Request, format: str = "csv"):
         else:
             raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
     
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+def to_row(company: Dict[str, Any]) -> List[Any]:
+    """
+    会社データをエクスポート用の行に変換する
+    """
+    return [company.get(col) for col in EXPORT_COLUMNS]
+
+async def iter_csv(list_id: str, bom: bool = False) -> AsyncIterator[bytes]:
+    """
+    CSVをバッチ単位でエンコードしながら出力する
+    """
+    # services.data_service（pandas）は読み込みに時間がかかるため、初めて使用する時に読み込む
+    from services.data_service import iter_company_data
+    
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    
+    with STREAMS_IN_FLIGHT.track_inprogress(kind="export"), timed("export"):
+        # ヘッダーはデータの取得を待たずに送信する
+        writer.writerow([COLUMN_LABELS[col] for col in EXPORT_COLUMNS])
+        header = buffer.getvalue()
+        yield (("\ufeff" + header) if bom else header).encode("utf-8")
+        
+        async for companies in iter_company_data(list_id, columns=EXPORT_COLUMNS,
+                                                 batch_size=settings.EXPORT_BATCH_SIZE):
+            buffer.seek(0)
+            buffer.truncate(0)
+            writer.writerows(to_row(company) for company in companies)
+            ROWS_PROCESSED.inc(len(companies), stage="export")
+            yield buffer.getvalue().encode("utf-8")
+
+async def write_excel(list_id: str) -> tempfile.SpooledTemporaryFile:
+    """
+    openpyxlの書き込み専用モードでExcelファイルを作成する
+    一定サイズを超えた場合はメモリではなく一時ファイルに書き込まれる
+    """
+    from openpyxl import Workbook
+    from services.data_service import iter_company_data
+    
+    loop = asyncio.get_event_loop()
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append([COLUMN_LABELS[col] for col in EXPORT_COLUMNS])
+    
+    def append_rows(companies: List[Dict[str, Any]]) -> None:
+        for company in companies:
+            sheet.append(to_row(company))
+    
+    with timed("export"):
+        async for companies in iter_company_data(list_id, columns=EXPORT_COLUMNS,
+                                                 batch_size=settings.EXPORT_BATCH_SIZE):
+            await loop.run_in_executor(None, append_rows, companies)
+            ROWS_PROCESSED.inc(len(companies), stage="export")
+        
+        output = tempfile.SpooledTemporaryFile(max_size=settings.EXPORT_SPOOL_MAX_SIZE)
+        try:
+            await loop.run_in_executor(None, workbook.save, output)
+        except Exception:
+            output.close()
+            raise
+    output.seek(0)
+    return output
+
+def iter_file(file, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    ファイルを少しずつ読み込んで出力し、最後に閉じる
+    """
+    try:
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        file.close()
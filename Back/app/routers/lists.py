@@ -0,0 +1,34 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import ORJSONResponse
+from typing import Optional
+import asyncio
+import functools
+
+from config import settings
+
+router = APIRouter()
+
+@router.get("/lists/{list_id}/rows")
+async def get_list_rows(list_id: str,
+                        offset: int = Query(0, ge=0),
+                        limit: int = Query(settings.ROWS_PAGE_DEFAULT_LIMIT, ge=1, le=settings.ROWS_PAGE_MAX_LIMIT),
+                        cursor: Optional[str] = None,
+                        fields: Optional[str] = None):
+    """
+    処理済みのリストの行を1ページずつ返すエンドポイント（ファイルの処理は再実行しない）
+    cursorには前のページのnext_cursorを指定する（offsetより高速）
+    fieldsにはカンマ区切りで返却するカラムを指定する（行IDは常に含める）
+    """
+    # services.data_service（pandas）は読み込みに時間がかかるため、初めて使用する時に読み込む
+    from services.data_service import get_list_page, parse_fields
+    
+    try:
+        loop = asyncio.get_event_loop()
+        page = await loop.run_in_executor(None, functools.partial(
+            get_list_page, list_id, limit, offset, cursor, parse_fields(fields)
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if page is None:
+        raise HTTPException(status_code=404, detail="リストが見つかりません。")
+    return ORJSONResponse(page)
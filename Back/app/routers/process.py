@@ -1,25 +1,163 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Dict, Any
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Dict, Any, List, Optional, Literal
+import asyncio
+import functools
+import itertools
 
-from services.data_service import process_file
+from config import settings
+from services.store_service import get_rows
+from services.job_service import job_manager, JobLimitError
+from utils.metrics import track_stream
+
+# services.data_service（pandas）は読み込みに時間がかかるため、各エンドポイントで初めて使用する時に読み込む
 
 class ProcessRequest(BaseModel):
     file_id: str
+    # Trueの場合はNDJSONで逐次返却する（1行目がマッピングと型、最終行が集計。stream_process_result を参照）
+    stream: bool = False
+    background: bool = False  # Trueの場合はジョブとして登録し、ジョブIDをすぐに返す
+    dedup: Optional[Literal["flag", "merge"]] = None  # 重複する会社の処理方法（flag: 印を付ける / merge: まとめる）
+    dedup_cross_list: bool = False  # Trueの場合は処理済みの他のリストとも照合する
+    previous_list_id: Optional[str] = None  # 同じリストの前のバージョン（変更のない行の行ID・営業文面を引き継ぐ）
+    # 返却する行の範囲とカラム（省略時は全て）。続きは /api/lists/{list_id}/rows で取得する
+    offset: int = Field(0, ge=0)
+    limit: Optional[int] = Field(None, ge=1, le=settings.ROWS_PAGE_MAX_LIMIT)
+    fields: Optional[List[str]] = None
+
+def get_process_options(request: ProcessRequest) -> Dict[str, Any]:
+    """
+    リクエストから処理のオプションを取り出す
+    """
+    return {"dedup": request.dedup, "dedup_cross_list": request.dedup_cross_list,
+            "previous_list_id": request.previous_list_id}
 
 router = APIRouter()
 
 @router.post("/process")
-async def process_data(request: ProcessRequest) -> Dict[str, Any]:
+async def process_data(request: ProcessRequest):
     """
     アップロードされたファイルを処理するエンドポイント
     """
+    from services.data_service import process_file, paginate_records
+    
     try:
-        result = await process_file(request.file_id)
-        return result
+        if request.background:
+            return submit_job(request)
+        
+        if request.stream:
+            return await stream_process_result(request)
+        
+        result = await process_file(request.file_id, **get_process_options(request))
+        if request.offset or request.limit is not None or request.fields:
+            # 処理結果の全体は保存済みのため、指定された範囲のみ返す
+            result.update(paginate_records(result["data"], request.offset, request.limit, request.fields))
+        # 大量の行を含むためjsonable_encoderを通さずorjsonで直接シリアライズする
+        return ORJSONResponse(result)
+    except HTTPException:
+        raise
     except FileNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"データ処理中にエラーが発生しました: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"データ処理中にエラーが発生しました: {str(e)}")
+
+async def stream_process_result(request: ProcessRequest) -> StreamingResponse:
+    """
+    処理結果をNDJSONでストリーミングするレスポンスを作成する
+    1行目: {"list_id", "mapping", "column_types", "encoding"}（column_typesは最初のチャンクから推定した型）
+    2行目以降: 1行につき1レコード
+    最終行: {"summary": {"row_count", "type_violations"}}。column_typesの型に変換できず、
+    元の文字列のまま出力した値の数をカラムごとに示す（一括処理ではそのカラムは文字列（text）となる）
+    """
+    from services.data_service import iter_process_file
+    
+    lines = iter_process_file(request.file_id, **get_process_options(request))
+    # 1行目（マッピング）を先に生成し、ファイル未検出や必須カラム不足を通常のエラーとして返す
+    loop = asyncio.get_event_loop()
+    first_line = await loop.run_in_executor(None, next, lines)
+    return StreamingResponse(
+        track_stream(itertools.chain([first_line], lines), "process"),
+        media_type="application/x-ndjson"
+    )
+
+def submit_job(request: ProcessRequest) -> ORJSONResponse:
+    """
+    ファイル処理のジョブを登録し、202でジョブの状態を返す
+    """
+    try:
+        job = job_manager.submit(request.file_id, get_process_options(request))
+    except JobLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return ORJSONResponse(job, status_code=202)
+
+@router.post("/process/jobs", status_code=202)
+async def create_process_job(request: ProcessRequest):
+    """
+    ファイル処理をバックグラウンドのジョブとして登録するエンドポイント
+    """
+    try:
+        return submit_job(request)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/process/jobs/{job_id}")
+async def get_process_job(job_id: str):
+    """
+    ジョブの状態と進捗を返すエンドポイント
+    """
+    job = job_manager.get_status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません。")
+    return job
+
+@router.get("/process/jobs/{job_id}/result")
+async def get_process_job_result(job_id: str,
+                                 offset: int = Query(0, ge=0),
+                                 limit: Optional[int] = Query(None, ge=1, le=settings.ROWS_PAGE_MAX_LIMIT),
+                                 cursor: Optional[str] = None,
+                                 fields: Optional[str] = None):
+    """
+    完了したジョブの処理結果を返すエンドポイント（/processと同じ形式）
+    limit・cursor・fieldsを指定した場合は /api/lists/{list_id}/rows と同じく1ページ分を返す
+    """
+    job = job_manager.get_status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません。")
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"ジョブは完了していません（状態: {job['status']}）。")
+    summary = job_manager.get_result(job_id)
+    if summary is None:
+        # 処理結果の概要を保存する前のバージョンで完了したジョブ
+        raise HTTPException(status_code=404, detail="ジョブの処理結果が見つかりません。")
+    
+    loop = asyncio.get_event_loop()
+    if limit is not None or cursor is not None or fields:
+        from services.data_service import get_list_page, parse_fields
+        
+        try:
+            result = await loop.run_in_executor(None, functools.partial(
+                get_list_page, summary["list_id"], limit or settings.ROWS_PAGE_DEFAULT_LIMIT, offset, cursor,
+                parse_fields(fields)
+            ))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if result is None:
+            raise HTTPException(status_code=404, detail="リストが見つかりません。")
+    else:
+        data = await loop.run_in_executor(None, get_rows, summary["list_id"])
+        result = {"list_id": summary["list_id"], "data": data}
+    result.update((key, value) for key, value in summary.items() if key not in ("list_id", "row_count"))
+    return ORJSONResponse(result)
+
+@router.delete("/process/jobs/{job_id}")
+async def cancel_process_job(job_id: str):
+    """
+    ジョブを中止するエンドポイント
+    """
+    job = job_manager.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません。")
+    return job
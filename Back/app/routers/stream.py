@@ -1,11 +1,9 @@
-from fastapi import APIRouter, Request, Depends
+from fastapi import APIRouter, Request, HTTPException
 from fastapi.responses import StreamingResponse
-import asyncio
 import json
-from typing import List, Dict
 
-from services.data_service import get_company_data
-from services.llm_service import generate_sales_text
+from services.sales_text_service import sales_text_runs, format_event_id
+from utils.metrics import STREAMS_IN_FLIGHT
 
 router = APIRouter()
 
@@ -13,46 +11,48 @@ router = APIRouter()
 async def stream_sales_text(request: Request):
     """
     営業文面の生成をストリーミングするエンドポイント
+    生成はLLM_MAX_CONCURRENCY件まで並行して行い、完了した順に送信する
+    各イベントにはリスト内の位置(index)を含めるため、クライアント側で並べ替えられる
+    再試行しても生成できなかった企業は {"status": "error", "id", "index", "error"} を送信する
+    生成はクライアントの接続とは独立して実行され、切断しても続行する
+    生成結果のイベントにはIDを付けるため、Last-Event-ID（ヘッダーまたはlast_event_idパラメータ）を
+    指定して再接続すると、LLMを呼び出さずに続きから再送する
+    保存されていないリストの場合は404を返す（list_idの指定がない場合・"current"はテスト用データで生成する）
     """
+    # クエリパラメータからリストIDを取得
+    list_id = request.query_params.get("list_id")
+    # force=trueの場合はキャッシュ・生成済みの文面を使用せずに再生成する
+    force = request.query_params.get("force", "").lower() in ("1", "true")
+    last_event_id = request.headers.get("last-event-id") or request.query_params.get("last_event_id")
+    
+    # 存在しないリストは生成を開始せずに404とする
+    # （services.data_service（pandas）は読み込みに時間がかかるため、初めて使用する時に読み込む）
+    from services.data_service import company_list_exists
+    
+    if not await company_list_exists(list_id):
+        raise HTTPException(status_code=404, detail="リストが見つかりません。")
+    
+    run_id, events = await sales_text_runs.open(list_id, force, last_event_id)
+    
     async def event_generator():
+        STREAMS_IN_FLIGHT.inc(kind="sales_text")
         try:
-            # クエリパラメータからリストIDを取得
-            list_id = request.query_params.get("list_id")
-            
-            # 会社データの取得（実際の実装ではDBなどから取得）
-            companies = await get_company_data(list_id)
-            
-            # 各会社について営業文面を生成
-            for company in companies:
-                # 進捗状況の通知
-                progress_data = json.dumps({
-                    "status": "processing",
-                    "id": company["id"],
-                    "message": f"{company.get('company_name', '不明')}の営業文面を生成中..."
-                })
-                yield f"data: {progress_data}\n\n"
-                
-                # 営業文面の生成
-                sales_text = await generate_sales_text(company)
-                
-                # 生成結果の送信
-                result_data = json.dumps({
-                    "id": company["id"],
-                    "text": sales_text
-                })
-                yield f"data: {result_data}\n\n"
-                
-                # 少し待機（サーバー負荷軽減のため）
-                await asyncio.sleep(0.5)
-            
-            # 全ての処理が完了したことを通知
-            yield "data: {\"status\": \"done\"}\n\n"
+            async for seq, event in events:
+                data = json.dumps(event)
+                if seq is None:
+                    yield f"data: {data}\n\n"
+                else:
+                    yield f"id: {format_event_id(run_id, seq)}\ndata: {data}\n\n"
         except Exception as e:
             error_data = json.dumps({"error": str(e)})
             yield f"data: {error_data}\n\n"
             yield "data: {\"status\": \"done\"}\n\n"
+        finally:
+            # クライアントが切断しても生成は続行し、購読のみ終了する
+            await events.aclose()
+            STREAMS_IN_FLIGHT.dec(kind="sales_text")
     
     return StreamingResponse(
         event_generator(),
         media_type="text/event-stream"
-    )
\ No newline at end of file
+    )
@@ -4,7 +4,7 @@ from typing import List
 import os
 import uuid
 
-from services.file_service import validate_file, save_file
+from services.file_service import validate_file, save_file, build_upload_name, register_file
 from config import settings
 
 router = APIRouter()
@@ -20,13 +20,19 @@ async def upload_file(file: UploadFile = File(...)):
         
         # ファイルの保存
         file_id = str(uuid.uuid4())
-        file_name = f"{file_id}-{file.filename}"
-        file_path = await save_file(file, file_name)
+        file_name = build_upload_name(file_id, file.filename)
+        file_path, file_hash, file_size = await save_file(file, file_name)
+        
+        # ファイルIDから直接参照できるよう登録する
+        duplicate_of = await register_file(file_id, file_path, file.filename, file_size, file_hash)
         
         return {
             "success": True,
             "file_id": file_id,
-            "file_name": file.filename
+            "file_name": file.filename,
+            "sha256": file_hash,
+            "size": file_size,
+            "duplicate_of": duplicate_of
         }
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
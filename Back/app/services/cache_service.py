@@ -0,0 +1,256 @@
+import os
+import json
+import time
+import hashlib
+import uuid
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple, TYPE_CHECKING
+
+from config import settings
+from utils.metrics import CACHE_REQUESTS
+
+# pandas・pyarrowは読み込みに時間がかかるため、解析済みデータのキャッシュを使用する時に読み込む
+# （営業文面のキャッシュのみを使用する場合は読み込まない）
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Parquetのメタデータにカラムマッピング・カラムの型を保存する際のキー
+MAPPING_METADATA_KEY = b"column_mapping"
+TYPES_METADATA_KEY = b"column_types"
+
+def compute_file_hash(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    ファイル内容のSHA-256ハッシュを計算する
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def get_parse_cache_dir() -> str:
+    """
+    解析済みデータのキャッシュディレクトリを取得する
+    """
+    return os.path.join(settings.UPLOAD_DIR, settings.PARSE_CACHE_DIR)
+
+def load_parsed_frame(cache_key: str) -> Optional[Tuple["pd.DataFrame", Dict[str, str], Dict[str, Any]]]:
+    """
+    キャッシュから解析済みのDataFrame・カラムマッピング・カラムの型を読み込む
+    キャッシュが存在しない場合はNoneを返す
+    """
+    if not settings.PARSE_CACHE_ENABLED:
+        return None
+    
+    cache_path = os.path.join(get_parse_cache_dir(), f"{cache_key}.parquet")
+    if not os.path.exists(cache_path):
+        CACHE_REQUESTS.inc(cache="parse", result="miss")
+        return None
+    
+    try:
+        import pyarrow.parquet as pq
+        
+        table = pq.read_table(cache_path)
+        metadata = table.schema.metadata or {}
+        column_mapping = json.loads(metadata[MAPPING_METADATA_KEY])
+        column_types = json.loads(metadata[TYPES_METADATA_KEY])
+        df = table.to_pandas()
+        # 最終アクセス時刻を更新（サイズ超過時に古いものから削除するため）
+        os.utime(cache_path)
+        CACHE_REQUESTS.inc(cache="parse", result="hit")
+        return df, column_mapping, column_types
+    except Exception as e:
+        logger.warning("キャッシュの読み込みに失敗しました: %s: %s", cache_path, str(e))
+        CACHE_REQUESTS.inc(cache="parse", result="miss")
+        return None
+
+def save_parsed_frame(cache_key: str, df: "pd.DataFrame", column_mapping: Dict[str, str],
+                      column_types: Dict[str, Any]) -> None:
+    """
+    解析済みのDataFrame・カラムマッピング・カラムの型をキャッシュに保存する
+    保存できない場合（型が混在するカラムなど）はキャッシュせずに処理を続ける
+    """
+    if not settings.PARSE_CACHE_ENABLED:
+        return
+    
+    cache_dir = get_parse_cache_dir()
+    os.makedirs(cache_dir, exist_ok=True)
+    cache_path = os.path.join(cache_dir, f"{cache_key}.parquet")
+    # 同じプロセスの複数のスレッドが同じファイルを同時に保存しても一時ファイルが重ならないようにする
+    tmp_path = f"{cache_path}.{uuid.uuid4().hex}.tmp"
+    
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[MAPPING_METADATA_KEY] = json.dumps(column_mapping, ensure_ascii=False).encode("utf-8")
+        metadata[TYPES_METADATA_KEY] = json.dumps(column_types, ensure_ascii=False).encode("utf-8")
+        table = table.replace_schema_metadata(metadata)
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        logger.warning("キャッシュの保存に失敗しました: %s", str(e))
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return
+    
+    evict_parse_cache()
+
+def evict_parse_cache() -> None:
+    """
+    キャッシュの合計サイズが上限を超えた場合、最終アクセスが古いものから削除する
+    """
+    cache_dir = get_parse_cache_dir()
+    entries = []
+    for filename in os.listdir(cache_dir):
+        if not filename.endswith(".parquet"):
+            continue
+        stat = os.stat(os.path.join(cache_dir, filename))
+        entries.append((stat.st_mtime, stat.st_size, filename))
+    
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, filename in sorted(entries):
+        if total_size <= settings.PARSE_CACHE_MAX_BYTES:
+            break
+        try:
+            os.remove(os.path.join(cache_dir, filename))
+            total_size -= size
+        except FileNotFoundError:
+            pass
+
+class SalesTextCache:
+    """
+    営業文面のキャッシュ
+    メモリ上のLRUを1次キャッシュ、SQLiteを2次キャッシュとして使用する
+    """
+    # 何回書き込むごとにSQLite側の期限切れ・件数超過を整理するか
+    TRIM_INTERVAL = 100
+    
+    def __init__(self, db_path: str, memory_size: int, max_entries: int, ttl: int):
+        self.db_path = db_path
+        self.memory_size = memory_size
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.conn: Optional[sqlite3.Connection] = None
+        self.writes = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+    
+    def _connect(self) -> sqlite3.Connection:
+        """
+        SQLiteへの接続を取得する（初回のみテーブルを作成）
+        """
+        if self.conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS sales_texts "
+                "(key TEXT PRIMARY KEY, text TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_sales_texts_created_at ON sales_texts (created_at)")
+            self.conn.commit()
+        return self.conn
+    
+    def get(self, key: str) -> Optional[str]:
+        """
+        キャッシュから営業文面を取得する（期限切れ・未登録の場合はNone）
+        """
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None and now - entry[1] < self.ttl:
+                self.memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                CACHE_REQUESTS.inc(cache="sales_text", result="memory_hit")
+                return entry[0]
+            
+            try:
+                row = self._connect().execute(
+                    "SELECT text, created_at FROM sales_texts WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning("営業文面キャッシュの読み込みに失敗しました: %s", str(e))
+                row = None
+            
+            if row is not None and now - row[1] < self.ttl:
+                self._remember(key, row[0], row[1])
+                self.stats["disk_hits"] += 1
+                CACHE_REQUESTS.inc(cache="sales_text", result="disk_hit")
+                return row[0]
+            
+            self.stats["misses"] += 1
+            CACHE_REQUESTS.inc(cache="sales_text", result="miss")
+            return None
+    
+    def set(self, key: str, text: str) -> None:
+        """
+        営業文面をキャッシュに保存する
+        """
+        now = time.time()
+        with self.lock:
+            self._remember(key, text, now)
+            try:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO sales_texts (key, text, created_at) VALUES (?, ?, ?)",
+                    (key, text, now)
+                )
+                self.writes += 1
+                if self.writes % self.TRIM_INTERVAL == 0:
+                    self._trim(conn, now)
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning("営業文面キャッシュの保存に失敗しました: %s", str(e))
+    
+    def _remember(self, key: str, text: str, created_at: float) -> None:
+        """
+        メモリ上のLRUに追加し、上限を超えた分を古いものから削除する
+        """
+        self.memory[key] = (text, created_at)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_size:
+            self.memory.popitem(last=False)
+    
+    def _trim(self, conn: sqlite3.Connection, now: float) -> None:
+        """
+        期限切れのものと件数の上限を超えた古いものをSQLiteから削除する
+        """
+        conn.execute("DELETE FROM sales_texts WHERE created_at < ?", (now - self.ttl,))
+        conn.execute(
+            "DELETE FROM sales_texts WHERE key IN "
+            "(SELECT key FROM sales_texts ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+    
+    def get_stats(self) -> Dict[str, int]:
+        """
+        ヒット数・ミス数を取得する
+        """
+        with self.lock:
+            return dict(self.stats)
+
+def build_cache_key(data: Dict[str, Any], version: int) -> str:
+    """
+    辞書の内容とバージョンから安定したキャッシュキーを作成する
+    """
+    payload = json.dumps(
+        {"version": version, "data": data},
+        ensure_ascii=False, sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+# 営業文面のキャッシュ（アプリケーション全体で共有）
+sales_text_cache = SalesTextCache(
+    settings.SALES_TEXT_CACHE_PATH,
+    memory_size=settings.SALES_TEXT_CACHE_MEMORY_SIZE,
+    max_entries=settings.SALES_TEXT_CACHE_MAX_ENTRIES,
+    ttl=settings.SALES_TEXT_CACHE_TTL
+)
@@ -1,206 +1,823 @@
 import pandas as pd
 import os
-import re
-import uuid
+import asyncio
 import numpy as np
-from typing import Dict, List, Any
+import orjson
+import hashlib
+import functools
+import logging
+from typing import Dict, List, Any, Iterator, Tuple, Optional, AsyncIterator, Callable
 
 from config import settings
+from utils.column_mapper import get_column_mapper
+from utils.metrics import timed, ROWS_PROCESSED
+from utils.encoding import detect_encoding, next_encoding
+from services.dedup_service import deduplicate
+from services.diff_service import RowMatcher, compute_fingerprints, remap_duplicate_ids
+from services.cache_service import compute_file_hash, load_parsed_frame, save_parsed_frame
+from services.store_service import (
+    create_list, append_rows, save_list, get_list_info, get_rows, get_row_page, iter_rows, save_sales_texts,
+    get_upload, save_dedup_keys
+)
+from services.excel_reader import read_excel_file
 
-async def process_file(file_id: str) -> Dict[str, Any]:
+logger = logging.getLogger(__name__)
+
+# 正規化処理のバージョン（変換ロジックを変更した場合は更新し、解析済みキャッシュを無効化する）
+NORMALIZATION_VERSION = 8
+
+# 解析結果に影響する設定（解析済みキャッシュのキーに含める。カラム名の変換の設定はColumnMapper.signatureで含める）
+PARSE_CACHE_SETTINGS = ["TYPE_INFERENCE_SAMPLE_SIZE", "CATEGORICAL_MAX_UNIQUE", "EXCEL_READER",
+                        "EXCEL_READ_ALL_SHEETS", "EXCEL_SHEET_COLUMN"]
+
+# 数値とみなす文字列（桁区切りのカンマを許可し、先頭が0の整数は除く）
+NUMERIC_PATTERN = r"[+-]?(?:0|[1-9]\d{0,2}(?:,\d{3})+|[1-9]\d*)(?:\.\d+)?"
+
+# 日付として解釈する書式（先に一致したものを使用する）
+DATE_FORMATS = [
+    "%Y-%m-%d", "%Y/%m/%d", "%Y.%m.%d", "%Y年%m月%d日",
+    "%Y-%m-%d %H:%M:%S", "%Y/%m/%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y/%m/%d %H:%M",
+    "%Y年%m月", "%Y/%m", "%Y-%m"
+]
+DATE_OUTPUT_FORMAT = "%Y-%m-%d"
+DATETIME_OUTPUT_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 保存されたリストの代わりにテスト用データを返すリストID（list_idを指定しない場合も同様）
+DUMMY_LIST_IDS = ("current",)
+
+async def process_file(file_id: str, dedup: Optional[str] = None, dedup_cross_list: bool = False,
+                       previous_list_id: Optional[str] = None) -> Dict[str, Any]:
     """
     アップロードされたファイルを処理する
+    解析・正規化は同期処理のため、イベントループを止めないよう別スレッドで実行する
+    """
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(
+        None, functools.partial(process_file_sync, file_id, dedup=dedup, dedup_cross_list=dedup_cross_list,
+                                previous_list_id=previous_list_id)
+    )
+
+def process_file_sync(file_id: str, progress: Optional[Callable[[str, float], None]] = None,
+                      dedup: Optional[str] = None, dedup_cross_list: bool = False,
+                      previous_list_id: Optional[str] = None) -> Dict[str, Any]:
     """
-    print(f"ファイル処理開始: {file_id}")
+    アップロードされたファイルを処理する（同期処理）
+    progressには処理の段階と進捗（0〜1）が通知される
+    dedupに"flag"または"merge"を指定した場合は重複する会社を検出する（dedup_service.deduplicate を参照）
+    previous_list_idに同じリストの前のバージョンを指定した場合は行を照合し、
+    変更のない行の行ID・営業文面を引き継ぐ（diff_service.RowMatcher を参照）
+    """
+    def report(stage: str, ratio: float) -> None:
+        if progress is not None:
+            progress(stage, ratio)
+    
+    logger.info("ファイル処理開始: %s", file_id)
     try:
         # ファイルの検索
-        upload_dir = settings.UPLOAD_DIR
-        for filename in os.listdir(upload_dir):
-            if filename.startswith(file_id):
-                file_path = os.path.join(upload_dir, filename)
-                print(f"ファイルを見つけました: {file_path}")
-                break
-        else:
-            print(f"ファイルが見つかりません: {file_id}")
-            raise FileNotFoundError(f"File with ID {file_id} not found")
+        report("reading", 0.0)
+        file_path = find_upload(file_id)
+        encoding = get_file_encoding(file_path)
+        
+        # 同じ内容のファイルを解析済みであればキャッシュを使用する
+        cache_key = None
+        cached = None
+        if settings.PARSE_CACHE_ENABLED:
+            # アップロード時に計算したハッシュがあれば再計算しない
+            upload = get_upload(file_id)
+            file_hash = upload["sha256"] if upload is not None else compute_file_hash(file_path)
+            cache_key = build_parse_cache_key(file_hash, encoding)
+            cached = load_parsed_frame(cache_key)
         
-        # ファイル形式に基づいて読み込み
-        ext = filename.split(".")[-1].lower()
-        if ext == "csv":
-            # エンコーディングを指定して読み込み（日本語対応）
-            try:
-                df = pd.read_csv(file_path, encoding='utf-8')
-            except UnicodeDecodeError:
-                # UTF-8で読めない場合はShift-JISを試す
-                df = pd.read_csv(file_path, encoding='shift_jis')
-        elif ext in ["xlsx", "xls"]:
-            df = pd.read_excel(file_path)
+        if cached is not None:
+            df, column_mapping, column_types = cached
+            logger.info("解析済みキャッシュを使用します: %s", cache_key)
         else:
-            raise ValueError(f"Unsupported file format: {ext}")
+            df, column_mapping, column_types = parse_file(file_path, report, encoding)
+            if cache_key is not None:
+                save_parsed_frame(cache_key, df, column_mapping, column_types)
         
-        # 読み込んだデータの内容を詳細に確認
-        print(f"読み込んだファイルの内容:")
-        print(f"カラム: {list(df.columns)}")
-        print(f"データタイプ: {df.dtypes}")
-        print(f"先頭5行:\n{df.head()}")
-        print(f"null値の数: {df.isnull().sum()}")
+        # 各行にIDを追加
+        report("converting", 0.5)
+        df['id'] = generate_row_ids(len(df))
         
-        # 必須カラムの確認（より柔軟な方法）
-        required_found = False
-        for required_col in settings.REQUIRED_COLUMNS:
-            # 元のカラム名または変換後のスネークケース名をチェック
-            column_matches = [col for col in df.columns if 
-                              col.lower() == required_col.lower() or
-                              to_snake_case(col) == required_col]
-            
-            if column_matches:
-                required_found = True
-                break
-
-        if not required_found:
-            print(f"必須カラムが見つかりません。カラム: {list(df.columns)}")
-            raise ValueError(f"必須カラムが見つかりません。最低でも企業名/会社名が必要です。")
+        # 重複する会社の検出
+        dedup_stats = None
+        if dedup:
+            report("deduplicating", 0.6)
+            with timed("dedup"):
+                df, dedup_stats, dedup_keys = deduplicate(df, file_id, dedup, dedup_cross_list)
+            logger.info("重複の検出結果: %s", dedup_stats)
         
-        # カラム名のマッピングを作成
-        column_mapping = {}
-        for col in df.columns:
-            snake_case = to_snake_case(col)
-            column_mapping[snake_case] = col
-            print(f"カラム変換: '{col}' -> '{snake_case}'")
+        # データをJSON形式に変換（列単位で一括変換）
+        with timed("serialize"):
+            result_data = convert_to_records(df)
         
-        # カラム名を変換
-        df.columns = [to_snake_case(col) for col in df.columns]
-        print(f"変換後のカラム: {list(df.columns)}")
+        # 再アップロード時に前のバージョンと照合するため、各行のフィンガープリントを作成する
+        with timed("fingerprint"):
+            fingerprints = compute_fingerprints(result_data)
         
-        # データの正規化
-        df = normalize_data(df)
+        # 前のバージョンとの照合（保存で前のバージョンが置き換えられる場合があるため、保存より前に行う）
+        diff_stats = None
+        if previous_list_id:
+            report("diffing", 0.7)
+            with timed("diff"):
+                matcher = RowMatcher(previous_list_id)
+                id_map = matcher.match(result_data, fingerprints)
+                if dedup:
+                    dedup_keys = remap_duplicate_ids(result_data, dedup_keys, id_map)
+                diff_stats = matcher.summary()
+            logger.info("前のバージョンとの照合結果: 追加%d件・変更%d件・変更なし%d件・削除%d件",
+                        diff_stats["added"], diff_stats["changed"], diff_stats["unchanged"], diff_stats["removed"])
         
-        # データをJSON形式に変換
-        def convert_to_json(df):
-            """
-            DataFrameをJSON形式に変換
-            """
-            # 各行にIDを追加
-            df['id'] = [str(uuid.uuid4()) for _ in range(len(df))]
-            
-            # DataFrameをJSON形式に変換（NaN値をNoneに変換）
-            records = []
-            for _, row in df.iterrows():
-                record = {}
-                for col in df.columns:
-                    value = row[col]
-                    if pd.isna(value):
-                        record[col] = None
-                    else:
-                        # 数値型の場合はそのまま、それ以外は文字列に変換
-                        if isinstance(value, (int, float)):
-                            record[col] = value
-                        else:
-                            record[col] = str(value)
-                records.append(record)
-            
-            print(f"結果データ構造:")
-            print(f"データ件数: {len(records)}")
-            if records:
-                print(f"最初の行のキー: {list(records[0].keys())}")
-                print(f"最初の行の値: {list(records[0].values())}")
-            
-            return records
-
-        # 変換を適用
-        result_data = convert_to_json(df)
+        # 行の内容の出力は大きなデータで時間がかかるため、DEBUGレベルの場合のみ行う
+        if result_data and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("最初の行: %s", result_data[0])
         
-        return {
+        # 営業文面の生成やエクスポートで使用するため、処理結果を保存する
+        report("saving", 0.8)
+        with timed("save"):
+            save_list(file_id, result_data, column_mapping, fingerprints)
+            if dedup:
+                save_dedup_keys(file_id, dedup_keys)
+        report("completed", 1.0)
+        ROWS_PROCESSED.inc(len(result_data), stage="process")
+        logger.info("ファイル処理完了: %s (%d件)", file_id, len(result_data))
+        
+        result = {
+            "list_id": file_id,
             "data": result_data,
-            "mapping": column_mapping
+            "mapping": column_mapping,
+            "column_types": get_column_type_names(column_types),
+            "encoding": encoding
         }
+        if dedup_stats is not None:
+            result["dedup"] = dedup_stats
+        if diff_stats is not None:
+            result["diff"] = diff_stats
+        return result
     except Exception as e:
-        print(f"データ処理エラー: {str(e)}")
+        logger.error("データ処理エラー: %s: %s", file_id, str(e))
         raise
 
-def to_snake_case(text: str) -> str:
+def parse_file(file_path: str, progress: Optional[Callable[[str, float], None]] = None,
+               encoding: Optional[str] = None) -> Tuple[pd.DataFrame, Dict[str, str], Dict[str, Dict[str, Any]]]:
     """
-    テキストをスネークケースに変換する
+    ファイルを読み込み、カラム名の変換と正規化を行う
+    CSVはencoding（省略時は判定したエンコーディング）で読み込む
+    戻り値は (DataFrame, カラム名のマッピング, 推定したカラムの型)
+    """
+    # ファイル形式に基づいて読み込み
+    with timed("read"):
+        df = read_file(file_path, encoding)
+    
+    # 読み込んだデータの内容（全体を走査するため、DEBUGレベルの場合のみ出力する）
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("読み込んだファイル: %s (%d行)", file_path, len(df))
+        logger.debug("データタイプ:\n%s", df.dtypes)
+        logger.debug("先頭5行:\n%s", df.head())
+        logger.debug("null値の数:\n%s", df.isnull().sum())
+    
+    with timed("map_headers"):
+        # カラム名の変換（各カラムにつき1回のみ）
+        snake_columns = map_column_names(df.columns)
+        
+        # 必須カラムの確認
+        check_required_columns(df.columns, snake_columns)
+        
+        # カラム名のマッピングを作成
+        column_mapping = build_column_mapping(df.columns, snake_columns)
+    
+    # カラム名を変換
+    df.columns = snake_columns
+    
+    # データの正規化（サンプルから推定した型に該当するカラムのみ変換する）
+    if progress is not None:
+        progress("normalizing", 0.3)
+    with timed("normalize"):
+        df, column_types = normalize_data(df)
+    logger.debug("推定したカラムの型: %s", get_column_type_names(column_types))
+    
+    return df, column_mapping, column_types
+
+def iter_process_file(file_id: str, chunksize: int = None, dedup: Optional[str] = None,
+                      dedup_cross_list: bool = False, previous_list_id: Optional[str] = None) -> Iterator[bytes]:
+    """
+    アップロードされたファイルをチャンク単位で処理し、NDJSON形式で逐次出力する
+    1行目は {"list_id": ..., "mapping": ..., "column_types": ..., "encoding": ...}、以降は1行につき1レコード
+    column_typesは最初のチャンクから推定するため、以降のチャンクで型に合わない値は元の文字列のまま出力し、
+    最終行の {"summary": {"row_count": ..., "type_violations": {カラム名: {"type": 型, "count": 件数}}}} で通知する
+    （一括処理ではそのようなカラムは文字列（text）となる）
+    重複の検出では前のチャンクの行とも照合する（dedup="merge"の場合、出力済みの行には値を補わない）
+    previous_list_idを指定した場合はチャンクごとに前のバージョンと照合する（照合結果の集計はログにのみ出力する）
     """
-    # 日本語を英語に変換（実際のアプリケーションでは辞書を使用）
-    translation = {
-        "会社名": "company_name",
-        "企業名": "company_name",
-        "社名": "company_name",
-        "業種": "industry",
-        "業界": "industry",
-        "担当者": "contact_person",
-        "担当者名": "contact_person",
-        "メールアドレス": "email",
-        "メール": "email",
-        "電話番号": "phone",
-        "電話": "phone",
-        "TEL": "phone",
-        "住所": "address",
-        "所在地": "address",
-        "URL": "url",
-        "ウェブサイト": "url",
-        "HP": "url",
-        "従業員数": "employee_count",
-        "社員数": "employee_count",
-        "売上": "revenue",
-        "売上高": "revenue",
-        "年商": "revenue",
-        "設立年": "established_year",
-        "設立": "established_year",
-        "創業年": "established_year"
+    chunksize = chunksize or settings.PROCESS_CHUNK_SIZE
+    logger.info("ファイル処理開始（ストリーミング）: %s", file_id)
+    file_path = find_upload(file_id)
+    encoding = get_file_encoding(file_path)
+    # 前のバージョンの行は、リストを置き換える前に読み込んでおく
+    matcher = RowMatcher(previous_list_id) if previous_list_id else None
+    
+    schema = None
+    row_count = 0
+    source_count = 0
+    violations: Dict[str, int] = {}
+    chunks = read_file_chunks(file_path, chunksize, encoding)
+    while True:
+        with timed("read"):
+            chunk = next(chunks, None)
+        if chunk is None:
+            break
+        
+        if schema is None:
+            # ヘッダーは最初のチャンクでのみ変換・検証する
+            with timed("map_headers"):
+                snake_columns = map_column_names(chunk.columns)
+                check_required_columns(chunk.columns, snake_columns)
+                column_mapping = build_column_mapping(chunk.columns, snake_columns)
+            create_list(file_id, column_mapping)
+        
+        chunk.columns = snake_columns
+        
+        # 最初のチャンクで推定した型を以降のチャンクにも適用する
+        if schema is None:
+            with timed("normalize"):
+                chunk, column_types = normalize_data(chunk)
+                schema = infer_schema(chunk)
+            yield orjson.dumps({
+                "list_id": file_id,
+                "mapping": column_mapping,
+                "column_types": get_column_type_names(column_types),
+                "encoding": encoding
+            }) + b"\n"
+        else:
+            with timed("normalize"):
+                chunk, _ = normalize_data(chunk, column_types, violations)
+                chunk = apply_schema(chunk, schema)
+        
+        chunk['id'] = generate_row_ids(len(chunk))
+        if dedup:
+            chunk_length = len(chunk)
+            with timed("dedup"):
+                chunk, _, dedup_keys = deduplicate(chunk, file_id, dedup, dedup_cross_list,
+                                                   start_index=source_count)
+            source_count += chunk_length
+        with timed("serialize"):
+            records = convert_to_records(chunk)
+        with timed("fingerprint"):
+            fingerprints = compute_fingerprints(records)
+        if matcher is not None:
+            with timed("diff"):
+                id_map = matcher.match(records, fingerprints)
+                if dedup:
+                    dedup_keys = remap_duplicate_ids(records, dedup_keys, id_map)
+        with timed("serialize"):
+            lines = b"".join(orjson.dumps(record) + b"\n" for record in records)
+        with timed("save"):
+            append_rows(file_id, row_count, records, fingerprints)
+            if dedup:
+                save_dedup_keys(file_id, dedup_keys)
+        ROWS_PROCESSED.inc(len(records), stage="process_stream")
+        yield lines
+        row_count += len(records)
+    
+    if schema is None:
+        raise ValueError("ファイルにデータが含まれていません。")
+    if matcher is not None:
+        diff_stats = matcher.summary()
+        logger.info("前のバージョンとの照合結果: 追加%d件・変更%d件・変更なし%d件・削除%d件",
+                    diff_stats["added"], diff_stats["changed"], diff_stats["unchanged"], diff_stats["removed"])
+    
+    # 1行目のcolumn_typesに合わない値を出力したカラム
+    type_violations = {
+        col: {"type": column_types[col]["type"], "count": count}
+        for col, count in violations.items() if count
     }
+    if type_violations:
+        logger.warning("推定した型に変換できない値を文字列のまま出力しました: %s", type_violations)
+    yield orjson.dumps({"summary": {"row_count": row_count, "type_violations": type_violations}}) + b"\n"
+    logger.info("ストリーミング処理完了: %s (%d件)", file_id, row_count)
+
+def build_parse_cache_key(file_hash: str, encoding: Optional[str]) -> str:
+    """
+    解析済みキャッシュのキーを作成する
+    ファイルの内容・正規化処理のバージョンに加え、解析結果（カラムマッピング・型）に影響する設定と
+    エンコーディングで区別し、設定を変更した場合に古い解析結果を使用しないようにする
+    """
+    options = {name: getattr(settings, name) for name in PARSE_CACHE_SETTINGS}
+    options["column_mapper"] = get_column_mapper().signature
+    options["encoding"] = encoding
+    digest = hashlib.sha256(orjson.dumps(options, option=orjson.OPT_SORT_KEYS)).hexdigest()[:16]
+    return f"{file_hash}-v{NORMALIZATION_VERSION}-{digest}"
+
+def find_upload(file_id: str) -> str:
+    """
+    ファイルIDからアップロード済みファイルのパスを取得する
+    """
+    # 登録済みのファイルはディレクトリを走査せずに取得する
+    upload = get_upload(file_id)
+    if upload is not None and os.path.exists(upload["path"]):
+        logger.debug("ファイルを見つけました: %s", upload["path"])
+        return upload["path"]
+    
+    # 登録される前にアップロードされたファイルはディレクトリから探す
+    # （空のIDは全てのファイルに前方一致してしまうため対象外）
+    upload_dir = settings.UPLOAD_DIR
+    for filename in os.listdir(upload_dir) if file_id else []:
+        if filename.startswith(file_id):
+            file_path = os.path.join(upload_dir, filename)
+            logger.debug("ファイルを見つけました: %s", file_path)
+            return file_path
     
-    # 大文字小文字を区別せずに変換
-    for key, value in translation.items():
-        if text.lower() == key.lower():
-            return value
+    logger.warning("ファイルが見つかりません: %s", file_id)
+    raise FileNotFoundError(f"File with ID {file_id} not found")
+
+def get_file_encoding(file_path: str) -> Optional[str]:
+    """
+    CSVのエンコーディングを判定する（CSV以外はNone）
+    """
+    if file_path.split(".")[-1].lower() != "csv":
+        return None
+    with timed("detect_encoding"):
+        encoding = detect_encoding(file_path)
+    logger.info("エンコーディング: %s (%s)", encoding, file_path)
+    return encoding
+
+def read_file(file_path: str, encoding: Optional[str] = None) -> pd.DataFrame:
+    """
+    ファイル形式に基づいてファイル全体を読み込む
+    CSVはencoding（省略時は判定したエンコーディング）で読み込み、復号できない場合は次の候補で1回のみ読み直す
+    """
+    ext = file_path.split(".")[-1].lower()
+    if ext == "csv":
+        encoding = encoding or detect_encoding(file_path)
+        try:
+            return pd.read_csv(file_path, encoding=encoding)
+        except UnicodeDecodeError:
+            # 先頭の範囲がASCIIのみで判定できなかった場合など。次の候補がなければそのまま送出する
+            fallback = next_encoding(encoding)
+            if fallback is None:
+                raise
+            logger.warning("%sで復号できないため、%sで読み直します: %s", encoding, fallback, file_path)
+            return pd.read_csv(file_path, encoding=fallback)
+    elif ext in ["xlsx", "xls"]:
+        return read_excel_file(file_path)
+    else:
+        raise ValueError(f"Unsupported file format: {ext}")
+
+def read_file_chunks(file_path: str, chunksize: int, encoding: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """
+    ファイルをchunksize行ずつ読み込む
+    CSVは途中で復号できなくなった場合、次の候補で読み直して出力済みの行の続きから出力する（読み直しは1回のみ）
+    Excelは行単位で読み込めないため、全体を読み込んでから分割する
+    """
+    ext = file_path.split(".")[-1].lower()
+    if ext == "csv":
+        encoding = encoding or detect_encoding(file_path)
+        yielded = 0
+        try:
+            with pd.read_csv(file_path, encoding=encoding, chunksize=chunksize) as reader:
+                for chunk in reader:
+                    yield chunk
+                    yielded += len(chunk)
+        except UnicodeDecodeError:
+            # 先頭の範囲がASCIIのみで判定できなかった場合など。次の候補がなければそのまま送出する
+            fallback = next_encoding(encoding)
+            if fallback is None:
+                raise
+            logger.warning("%sで復号できないため、%sで読み直します: %s", encoding, fallback, file_path)
+            with pd.read_csv(file_path, encoding=fallback, chunksize=chunksize) as reader:
+                for chunk in reader:
+                    # 出力済みの行は読み直しても同じ内容のため、続きの行から出力する
+                    if yielded >= len(chunk):
+                        yielded -= len(chunk)
+                        continue
+                    yield chunk.iloc[yielded:]
+                    yielded = 0
+    elif ext in ["xlsx", "xls"]:
+        df = read_excel_file(file_path)
+        for start in range(0, max(len(df), 1), chunksize):
+            yield df.iloc[start:start + chunksize].copy()
+    else:
+        raise ValueError(f"Unsupported file format: {ext}")
+
+def check_required_columns(columns, snake_columns: List[str]) -> None:
+    """
+    必須カラムが含まれているか確認する
+    """
+    for required_col in settings.REQUIRED_COLUMNS:
+        # 元のカラム名、または変換後のスネークケース名が一致するかをチェック
+        required_snake = to_snake_case(required_col)
+        column_matches = [col for col, snake_case in zip(columns, snake_columns) if 
+                          str(col).lower() == required_col.lower() or
+                          snake_case in (required_col, required_snake)]
+        
+        if column_matches:
+            return
     
-    # 一般的な変換ロジック
-    s1 = re.sub('(.)([A-Z][a-z]+)', r'\1_\2', text)
-    s2 = re.sub('([a-z0-9])([A-Z])', r'\1_\2', s1).lower()
-    # 空白やその他の文字を_に置換
-    s3 = re.sub(r'[^\w]', '_', s2)
-    # 連続する_を単一の_に置換
-    s4 = re.sub(r'_+', '_', s3)
-    # 先頭と末尾の_を削除
-    return s4.strip('_')
-
-def normalize_data(df: pd.DataFrame) -> pd.DataFrame:
+    logger.warning("必須カラムが見つかりません。カラム: %s", list(columns))
+    raise ValueError(f"必須カラムが見つかりません。最低でも企業名/会社名が必要です。")
+
+def build_column_mapping(columns, snake_columns: List[str]) -> Dict[str, str]:
+    """
+    変換後のスネークケース名から元のカラム名へのマッピングを作成する
+    """
+    column_mapping = {}
+    for col, snake_case in zip(columns, snake_columns):
+        column_mapping[snake_case] = col
+        logger.debug("カラム変換: '%s' -> '%s'", col, snake_case)
+    return column_mapping
+
+def map_column_names(columns) -> List[str]:
+    """
+    カラム名をスネークケースに変換する（変換後の名前が重複しないようにする）
+    """
+    return get_column_mapper().map_columns(columns)
+
+def infer_schema(df: pd.DataFrame) -> Dict[str, str]:
+    """
+    正規化後のDataFrameから各カラムの型を決定する
+    """
+    schema = {}
+    for col in df.columns:
+        kind = df[col].dtype.kind
+        if kind == "b":
+            schema[col] = "bool"
+        elif kind in "iu":
+            schema[col] = "int"
+        elif kind == "f":
+            schema[col] = "float"
+        else:
+            schema[col] = "object"
+    return schema
+
+def apply_schema(df: pd.DataFrame, schema: Dict[str, str]) -> pd.DataFrame:
+    """
+    チャンクごとに型がぶれないよう、決定済みの型に合わせて変換する
+    """
+    for col, col_type in schema.items():
+        # 数値に変換できない値を残したカラムはそのまま出力する
+        if col not in df.columns or df[col].dtype.kind not in "biuf":
+            continue
+        if col_type in ("int", "float"):
+            values = pd.to_numeric(df[col], errors='coerce')
+            if col_type == "int":
+                # 欠損値を含んでも整数として出力できるようにする
+                valid = values.dropna()
+                if (valid == valid.round()).all():
+                    values = values.astype('Int64')
+            else:
+                values = values.astype('float64')
+            df[col] = values
+    return df
+
+def generate_row_ids(count: int) -> List[str]:
+    """
+    UUID4形式の行IDをまとめて生成する
+    """
+    if count == 0:
+        return []
+    # 乱数をまとめて取得し、バージョン/バリアントのビットを一括で設定
+    raw = np.frombuffer(os.urandom(16 * count), dtype=np.uint8).reshape(count, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    h = raw.tobytes().hex()
+    return [
+        f"{h[i:i + 8]}-{h[i + 8:i + 12]}-{h[i + 12:i + 16]}-{h[i + 16:i + 20]}-{h[i + 20:i + 32]}"
+        for i in range(0, 32 * count, 32)
+    ]
+
+def convert_column(series: pd.Series) -> List[Any]:
+    """
+    1列分の値をJSONに変換可能な値のリストに変換する
+    欠損値はNone、数値はそのまま、それ以外は文字列にする
+    """
+    mask = series.isna().to_numpy()
+    values = series.to_numpy(dtype=object)
+    
+    if series.dtype.kind in "biuf":
+        # 数値列はPythonの数値型に変換済みなので欠損値のみ置き換える
+        if mask.any():
+            values[mask] = None
+        return values.tolist()
+    
+    if series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) in ("string", "empty"):
+        # 文字列のみの列は変換不要
+        if mask.any():
+            values[mask] = None
+        return values.tolist()
+    
+    # 型が混在する列は要素ごとに判定する
+    return [
+        None if missing else (value if isinstance(value, (int, float)) else str(value))
+        for value, missing in zip(values, mask)
+    ]
+
+def convert_to_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    DataFrameをJSON形式（レコードのリスト）に変換する
+    """
+    columns = list(df.columns)
+    converted = [convert_column(df.iloc[:, i]) for i in range(len(columns))]
+    return [dict(zip(columns, values)) for values in zip(*converted)]
+
+def to_snake_case(text: str) -> str:
+    """
+    テキストをスネークケースに変換する
+    """
+    # 日本語・英語の同義語辞書（部分一致・あいまい一致を含む）で変換し、
+    # 一致しない場合は一般的な変換ロジックを使用する
+    return get_column_mapper().to_snake_case(text)
+
+def infer_column_types(df: pd.DataFrame, sample_size: int = None) -> Dict[str, Dict[str, Any]]:
+    """
+    各カラムのサンプルから型（numeric / date / categorical / text）を推定する
+    日付は一致した書式の一覧、数値は桁区切りの有無も合わせて返す
+    """
+    sample_size = sample_size or settings.TYPE_INFERENCE_SAMPLE_SIZE
+    column_types = {}
+    for col in df.columns:
+        series = df[col]
+        kind = series.dtype.kind
+        if kind in "biuf":
+            column_types[col] = {"type": "numeric"}
+            continue
+        if kind == "M":
+            # Excelの日付セルなど、読み込み時点で日時型になっているもの
+            valid = series.dropna()
+            has_time = bool((valid != valid.dt.normalize()).any())
+            column_types[col] = {"type": "date", "formats": None,
+                                 "output": DATETIME_OUTPUT_FORMAT if has_time else DATE_OUTPUT_FORMAT}
+            continue
+        
+        strings = to_stripped_strings(sample_values(series, sample_size)).dropna()
+        if series.dtype != object or strings.empty:
+            column_types[col] = {"type": "text"}
+            continue
+        
+        # 先頭が0の値（電話番号・郵便番号など）は数値に一致しないため文字列のまま残る
+        if strings.str.fullmatch(NUMERIC_PATTERN).all():
+            column_types[col] = {"type": "numeric", "thousands": bool(strings.str.contains(",", regex=False).any())}
+            continue
+        
+        date_formats = detect_date_formats(strings)
+        if date_formats is not None:
+            column_types[col] = {"type": "date", "formats": date_formats, "output": DATE_OUTPUT_FORMAT}
+        elif strings.nunique() <= min(settings.CATEGORICAL_MAX_UNIQUE, len(strings) // 2):
+            column_types[col] = {"type": "categorical"}
+        else:
+            column_types[col] = {"type": "text"}
+    return column_types
+
+def sample_values(series: pd.Series, sample_size: int) -> pd.Series:
+    """
+    欠損値を除いた値から、先頭から末尾まで等間隔にサンプルを取り出す
+    """
+    values = series.dropna()
+    if len(values) <= sample_size:
+        return values
+    positions = np.linspace(0, len(values) - 1, sample_size).astype(np.int64)
+    return values.iloc[positions]
+
+def detect_date_formats(strings: pd.Series) -> Optional[List[str]]:
+    """
+    サンプルの全ての値がいずれかの日付の書式で解析できる場合、使用する書式の一覧を返す（ない場合はNone）
+    書式が混在するカラム（例: "2010-04-01" と "2011/05/01"）は、各値をDATE_FORMATSの順で最初に一致した書式で解析する
+    """
+    # 数字を含まない値が混ざっている場合は日付ではない
+    if not strings.str.contains(r"\d", regex=True).all():
+        return None
+    formats = []
+    remaining = strings
+    for date_format in DATE_FORMATS:
+        matched = pd.to_datetime(remaining, format=date_format, errors='coerce').notna()
+        if matched.any():
+            formats.append(date_format)
+            remaining = remaining[~matched]
+            if remaining.empty:
+                return formats
+    return None
+
+def parse_dates(strings: pd.Series, formats: List[str]) -> pd.Series:
+    """
+    書式の一覧の順に日付を解析する（前の書式で解析できなかった値のみ次の書式で解析する）
+    """
+    parsed = pd.to_datetime(strings, format=formats[0], errors='coerce')
+    for date_format in formats[1:]:
+        missing = parsed.isna() & strings.notna()
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(strings[missing], format=date_format, errors='coerce')
+    return parsed
+
+def to_stripped_strings(series: pd.Series) -> pd.Series:
+    """
+    値を前後の空白を除いた文字列に変換する（欠損値・空文字はNaNのまま）
+    """
+    strings = series.astype(str).str.strip()
+    return strings.where(series.notna() & (strings != ""))
+
+def normalize_data(df: pd.DataFrame,
+                   column_types: Optional[Dict[str, Dict[str, Any]]] = None,
+                   violations: Optional[Dict[str, int]] = None
+                   ) -> Tuple[pd.DataFrame, Dict[str, Dict[str, Any]]]:
     """
     データを正規化する
+    column_typesを省略した場合はサンプルから型を推定し、変換できない値を含むカラムは文字列のまま残す
+    指定した場合（ストリーミング処理の2チャンク目以降）はその型に合わせ、変換できない値のみ元の文字列のまま残す
+    violationsを指定した場合は、カラムごとの変換できなかった値の数を加算する
     """
     # 欠損値の処理
     df = df.dropna(how='all')
     
-    # データ型の変換
+    fixed = column_types is not None
+    if not fixed:
+        column_types = infer_column_types(df)
+    else:
+        column_types = dict(column_types)
+    
     for col in df.columns:
-        # 数値型への変換を試みる
-        if df[col].dtype == 'object':
-            try:
-                # errors='coerce'を使用して無効な値をNaNに変換
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-            except:
-                pass
+        info = column_types.get(col)
+        if info is None or info["type"] in ("text", "categorical"):
+            continue
+        series = df[col]
+        if series.dtype.kind in "biufM":
+            strings = series
+        else:
+            strings = to_stripped_strings(series)
+        
+        if info["type"] == "numeric":
+            if series.dtype.kind in "biuf":
+                continue
+            if info.get("thousands"):
+                strings = strings.str.replace(",", "", regex=False)
+            converted = pd.to_numeric(strings, errors='coerce')
+        else:
+            if series.dtype.kind == "M":
+                parsed = series
+            else:
+                parsed = parse_dates(strings, info["formats"])
+            converted = parsed.dt.strftime(info["output"]).astype(object)
         
-        # 日付型への変換を試みる
-        if df[col].dtype == 'object':
-            try:
-                # errors='coerce'を使用して無効な日付をNaTに変換
-                df[col] = pd.to_datetime(df[col], errors='coerce')
-                # NaT値をNoneに変換
-                mask = df[col].notna()
-                df.loc[mask, col] = df.loc[mask, col].dt.strftime('%Y-%m-%d')
-                df.loc[~mask, col] = None
-            except:
-                pass
+        # 変換によって新たに欠損となる値（数値・日付として解釈できない値）
+        failed = converted.isna() & strings.notna()
+        
+        if not failed.any():
+            df[col] = converted.where(converted.notna(), None) if converted.dtype == object else converted
+        elif fixed:
+            df[col] = converted.astype(object).where(~failed, series).where(converted.notna() | failed, None)
+            if violations is not None:
+                violations[col] = violations.get(col, 0) + int(failed.sum())
+        else:
+            # 混在しているカラムは欠損値に置き換えず、文字列のまま残す
+            column_types[col] = {"type": "text"}
     
-    return df
+    return df, column_types
 
-async def get_company_data(list_id: str = None) -> List[Dict[str, Any]]:
+def get_column_type_names(column_types: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+    """
+    レスポンス用に、カラムごとの型名のみを取り出す
+    """
+    return {col: info["type"] for col, info in column_types.items()}
+
+class ListNotFoundError(LookupError):
+    """
+    指定したリストが保存されていない
+    """
+
+def is_dummy_list_id(list_id: Optional[str]) -> bool:
+    """
+    保存されたリストの代わりにテスト用データを使用するリストIDか（未指定の場合を含む）
+    """
+    return not list_id or list_id in DUMMY_LIST_IDS
+
+async def company_list_exists(list_id: Optional[str]) -> bool:
+    """
+    会社データを取得できるリストか（テスト用データのリストIDの場合はTrue）
+    エクスポート・営業文面の生成で、存在しないリストを応答を始める前に404とするために使用する
+    """
+    if is_dummy_list_id(list_id):
+        return True
+    loop = asyncio.get_event_loop()
+    return await loop.run_in_executor(None, get_list_info, list_id) is not None
+
+async def get_company_data(list_id: str = None, offset: int = 0, limit: Optional[int] = None,
+                           columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
     """
     会社データを取得する
-    実際のアプリケーションではデータベースから取得
+    process_fileで保存したリストから取得し、保存されていない場合はListNotFoundErrorとする
+    テスト用のリストID（DUMMY_LIST_IDS・未指定）の場合はテスト用データを返す
+    offset/limitで範囲を、columnsで取得するカラムを指定できる
+    """
+    if not is_dummy_list_id(list_id):
+        loop = asyncio.get_event_loop()
+        if await loop.run_in_executor(None, get_list_info, list_id) is None:
+            raise ListNotFoundError(f"リストが見つかりません: {list_id}")
+        return await loop.run_in_executor(None, get_rows, list_id, offset, limit, columns)
+    
+    companies = get_dummy_company_data(list_id)
+    if columns is not None:
+        companies = [{col: company.get(col) for col in columns} for company in companies]
+    return companies[offset:None if limit is None else offset + limit]
+
+async def iter_company_data(list_id: str = None, columns: Optional[List[str]] = None,
+                            batch_size: int = 500) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    会社データをbatch_size件ずつ取得する（リスト全体をメモリに載せない）
+    保存されていないリストの場合はListNotFoundErrorとする（get_company_data を参照）
+    """
+    if is_dummy_list_id(list_id):
+        yield await get_company_data(list_id, columns=columns)
+        return
+    
+    loop = asyncio.get_event_loop()
+    if await loop.run_in_executor(None, get_list_info, list_id) is None:
+        raise ListNotFoundError(f"リストが見つかりません: {list_id}")
+    batches = iter_rows(list_id, columns, batch_size)
+    while True:
+        batch = await loop.run_in_executor(None, next, batches, None)
+        if batch is None:
+            return
+        yield batch
+
+def get_projection(fields: Optional[List[str]]) -> Optional[List[str]]:
+    """
+    返却するカラムの一覧を作成する（指定がない場合は全てのカラム。行IDは常に含める）
+    """
+    if not fields:
+        return None
+    return ["id"] + [field for field in fields if field != "id"]
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    カンマ区切りのカラム名（クエリパラメータのfields）を一覧にする
+    """
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()] or None
+
+def parse_cursor(cursor: Optional[str]) -> Optional[int]:
+    """
+    ページのカーソル（前のページの最後の行番号）を解析する
+    """
+    if cursor is None:
+        return None
+    try:
+        return int(cursor)
+    except ValueError:
+        raise ValueError(f"カーソルが不正です: {cursor}")
+
+def paginate_records(records: List[Dict[str, Any]], offset: int = 0, limit: Optional[int] = None,
+                     fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    処理結果の行から1ページ分を取り出す（続きは /api/lists/{list_id}/rows でnext_cursorを指定して取得する）
+    """
+    columns = get_projection(fields)
+    end = len(records) if limit is None else min(offset + limit, len(records))
+    page = records[offset:end]
+    if columns is not None:
+        page = [{col: record.get(col) for col in columns} for record in page]
+    return {
+        "data": page,
+        "total": len(records),
+        "offset": offset,
+        "limit": limit,
+        # 行番号は処理結果の順番と一致する
+        "next_cursor": str(end - 1) if page and end < len(records) else None
+    }
+
+def get_list_page(list_id: str, limit: int, offset: int = 0, cursor: Optional[str] = None,
+                  fields: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+    """
+    処理済みのリストの行を1ページ分取得する（リストが存在しない場合はNone）
+    cursorを指定した場合はoffsetより優先し、前のページの続きから取得する
+    """
+    after_index = parse_cursor(cursor)
+    info = get_list_info(list_id)
+    if info is None:
+        return None
+    rows, last_index = get_row_page(list_id, limit, offset, after_index, get_projection(fields))
+    return {
+        "list_id": list_id,
+        "mapping": info["mapping"],
+        "data": rows,
+        "total": info["row_count"],
+        "offset": offset if after_index is None else None,
+        "limit": limit,
+        "next_cursor": str(last_index) if last_index is not None else None
+    }
+
+async def save_company_sales_texts(list_id: str, sales_texts: Dict[str, str]) -> None:
+    """
+    生成した営業文面を保存済みのリストに書き戻す（キーは行ID）
+    """
+    if not list_id or not sales_texts:
+        return
+    loop = asyncio.get_event_loop()
+    await loop.run_in_executor(None, save_sales_texts, list_id, sales_texts)
+
+def get_dummy_company_data(list_id: str = None) -> List[Dict[str, Any]]:
+    """
+    テスト用のリストID（DUMMY_LIST_IDS・未指定）の会社データを取得する
     """
     # テスト用のダミーデータ
     if list_id == "current":
@@ -0,0 +1,304 @@
+import re
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Callable, Optional, Tuple
+
+from utils.formatters import normalize_text
+from services.store_service import find_dedup_matches
+
+# 重複の判定に使用するキーと、元になるカラム
+KEY_COLUMNS = {
+    "name": "company_name",
+    "phone": "phone",
+    "domain": "email",
+    "host": "url",
+}
+
+# 同じ会社と確定するために組み合わせて使用する、会社名以外のキー
+PAIR_KEYS = [("phone", "domain"), ("phone", "host"), ("domain", "host")]
+# 会社名のないグループの行が保存する組み合わせのキーの種類に付ける接尾辞（会社名のある行が照合する）
+NAMELESS_SUFFIX = "/nameless"
+
+# 会社名から取り除く法人格（NFKC正規化・小文字化した後の表記）
+# 正規表現の選択（|）より部分文字列の置換の方が速いため、日本語の法人格は文字列で持つ
+# 共通する語を含む場合のみ確認し、同じ語を含むものは長いものから順に除く
+LEGAL_SUFFIXES = {
+    "会社": ("株式会社", "有限会社", "合同会社", "合資会社", "合名会社"),
+    "法人": ("特定非営利活動法人", "一般社団法人", "一般財団法人", "公益社団法人", "公益財団法人",
+             "医療法人社団", "医療法人財団", "社会福祉法人",
+             "社団法人", "財団法人", "医療法人", "学校法人", "npo法人"),
+    "(": ("(株)", "(有)", "(同)", "(合)", "(資)", "(名)", "(社)", "(財)", "(医)", "(福)", "(学)"),
+}
+# 英語の法人格（英字を含む会社名のみに適用する）
+ENGLISH_SUFFIX_PATTERN = re.compile(
+    r"\b(?:kabushiki\s*kaisha|co\.?,?\s*ltd|company\s+limited|limited|ltd|inc|incorporated|"
+    r"corporation|corp|llc|k\.?k)\b\.?"
+)
+ASCII_LETTER_PATTERN = re.compile(r"[a-z]")
+# 会社名の比較で無視する空白・記号
+NAME_SEPARATORS_PATTERN = re.compile(r"[\s・,.、。'\"&＆/\-_()]+")
+NON_DIGIT_PATTERN = re.compile(r"\D")
+URL_SCHEME_PATTERN = re.compile(r"^[a-z][a-z0-9+.\-]*://")
+
+# 多くの会社・個人が共有しており、会社の特定に使えないドメイン
+SHARED_DOMAINS = {
+    "gmail.com", "googlemail.com", "yahoo.co.jp", "yahoo.com", "ymail.ne.jp",
+    "hotmail.com", "hotmail.co.jp", "outlook.com", "outlook.jp", "live.jp", "live.com", "msn.com",
+    "icloud.com", "me.com", "mac.com", "aol.com",
+    "docomo.ne.jp", "ezweb.ne.jp", "au.com", "softbank.ne.jp", "i.softbank.jp",
+    "nifty.com", "biglobe.ne.jp", "ocn.ne.jp", "so-net.ne.jp", "plala.or.jp",
+    "facebook.com", "instagram.com", "twitter.com", "x.com", "linkedin.com",
+    "line.me", "ameblo.jp", "note.com", "wixsite.com", "jimdofree.com",
+}
+
+def normalize_company_name(text: str) -> Optional[str]:
+    """
+    会社名を比較用に正規化する（法人格・空白・記号を除く）
+    """
+    name = normalize_text(str(text)).casefold()
+    for marker, suffixes in LEGAL_SUFFIXES.items():
+        if marker in name:
+            for suffix in suffixes:
+                if suffix in name:
+                    name = name.replace(suffix, "")
+    if ASCII_LETTER_PATTERN.search(name):
+        name = ENGLISH_SUFFIX_PATTERN.sub("", name)
+    name = NAME_SEPARATORS_PATTERN.sub("", name)
+    return name or None
+
+def normalize_phone(text: str) -> Optional[str]:
+    """
+    電話番号を数字のみに正規化する（+81は0に置き換える）
+    """
+    digits = NON_DIGIT_PATTERN.sub("", normalize_text(str(text)))
+    if digits.startswith("81") and str(text).lstrip().startswith("+"):
+        digits = "0" + digits[2:]
+    # 桁数が足りないものは番号として扱わない
+    return digits if len(digits) >= 9 else None
+
+def normalize_email_domain(text: str) -> Optional[str]:
+    """
+    メールアドレスからドメインを取り出す（フリーメールなどの共有ドメインは除く）
+    """
+    address = normalize_text(str(text)).casefold()
+    if "@" not in address:
+        return None
+    domain = address.rsplit("@", 1)[1].strip(". ")
+    if not domain or domain in SHARED_DOMAINS:
+        return None
+    return domain
+
+def normalize_url_host(text: str) -> Optional[str]:
+    """
+    URLからホスト名を取り出す（www.を除き、共有ドメインは除く）
+    """
+    url = URL_SCHEME_PATTERN.sub("", normalize_text(str(text)).casefold())
+    host = re.split(r"[/?#:]", url, 1)[0].strip(". ")
+    if host.startswith("www."):
+        host = host[4:]
+    if "." not in host or host in SHARED_DOMAINS:
+        return None
+    return host
+
+# キーごとの正規化関数
+NORMALIZERS: Dict[str, Callable[[str], Optional[str]]] = {
+    "name": normalize_company_name,
+    "phone": normalize_phone,
+    "domain": normalize_email_domain,
+    "host": normalize_url_host,
+}
+
+def build_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    各行の重複判定用のキー（name / phone / domain / host）を作成する
+    同じ値は1回だけ正規化する
+    """
+    keys = pd.DataFrame(index=df.index)
+    for key, column in KEY_COLUMNS.items():
+        if column not in df.columns:
+            continue
+        values = df[column].dropna().astype(str)
+        normalizer = NORMALIZERS[key]
+        normalized = {value: normalizer(value) for value in values.unique()}
+        keys[key] = values.map(normalized).reindex(df.index)
+    return keys
+
+def build_match_keys(keys: pd.DataFrame) -> pd.DataFrame:
+    """
+    同じ会社と確定するためのキーを作成する
+    会社名（name）と、会社名以外のキー2つの組み合わせ（phone+domain など）
+    組み合わせのキーが一致する行は、会社名以外のキーが2つ以上一致する
+    """
+    match_keys = pd.DataFrame(index=keys.index)
+    if "name" in keys.columns:
+        match_keys["name"] = keys["name"]
+    for first, second in PAIR_KEYS:
+        if first in keys.columns and second in keys.columns:
+            both = keys[first].notna() & keys[second].notna()
+            combined = keys[first].astype(str) + "|" + keys[second].astype(str)
+            match_keys[f"{first}+{second}"] = combined.where(both)
+    return match_keys
+
+def group_rows(match_keys: pd.DataFrame) -> np.ndarray:
+    """
+    同じ会社とみなされる行を同じグループにまとめる
+    いずれかのキーが一致する行を候補とし、会社名が一致する場合、または一方に会社名がなく会社名以外のキーが
+    2つ以上一致する場合のみ同じ会社とする（会社名が異なる行は、代表番号やドメインを共有するグループ会社などのためまとめない）
+    戻り値は各行が属するグループの先頭行の位置
+    全ての組み合わせを比較せず、会社名はキーごとの最初の行にまとめ、組み合わせのキーは会社名のない行を含むものだけを照合する
+    """
+    count = len(match_keys)
+    labels = np.arange(count, dtype=np.int64)
+    name_codes = np.full(count, -1, dtype=np.int64)
+    if "name" in match_keys.columns:
+        name_codes, _ = pd.factorize(match_keys["name"])
+        named = name_codes >= 0
+        if named.any():
+            first = np.full(name_codes.max() + 1, count, dtype=np.int64)
+            np.minimum.at(first, name_codes[named], labels[named])
+            labels[named] = first[name_codes[named]]
+    
+    nameless = name_codes < 0
+    pair_columns = [column for column in match_keys.columns if column != "name"]
+    if not nameless.any() or not pair_columns:
+        return labels
+    
+    # 先頭行（グループ内の最小の位置）を親とするUnion-Find。会社名はグループの先頭行の位置に持つ
+    parent = labels.tolist()
+    group_names = name_codes.tolist()
+    
+    def find(position: int) -> int:
+        while parent[position] != position:
+            parent[position] = parent[parent[position]]
+            position = parent[position]
+        return position
+    
+    for column in pair_columns:
+        codes, _ = pd.factorize(match_keys[column])
+        blocks = np.unique(codes[nameless & (codes >= 0)])
+        if not len(blocks):
+            continue
+        heads: Dict[int, int] = {}
+        positions = np.flatnonzero(np.isin(codes, blocks))
+        for position, code in zip(positions.tolist(), codes[positions].tolist()):
+            if code not in heads:
+                heads[code] = position
+                continue
+            a, b = find(heads[code]), find(position)
+            if a == b or (group_names[a] >= 0 and group_names[b] >= 0 and group_names[a] != group_names[b]):
+                continue
+            root, other = min(a, b), max(a, b)
+            parent[other] = root
+            group_names[root] = max(group_names[a], group_names[b])
+    
+    labels = np.asarray(parent, dtype=np.int64)
+    # 親は常に自身より前の行のため、先頭行に達するまで参照をたどる
+    while True:
+        updated = labels[labels]
+        if (updated == labels).all():
+            return labels
+        labels = updated
+
+def build_stored_keys(match_keys: pd.DataFrame, labels: np.ndarray) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    前のチャンク・他のリストと照合するキー（保存用・照合用）を作成する（列名がキーの種類）
+    会社名のある行は会社名で照合し、会社名のないグループの行は組み合わせのキーで照合する
+    会社名のない行と照合できるよう、会社名のないグループの行は組み合わせのキーを NAMELESS_SUFFIX を付けた種類でも保存し、
+    会社名のある行はそちらを照合する（会社名の異なる行どうしは組み合わせのキーでは一致しない）
+    戻り値は (保存用, 照合用)
+    """
+    pair_columns = [column for column in match_keys.columns if column != "name"]
+    if "name" in match_keys.columns:
+        named = match_keys["name"].notna()
+    else:
+        named = pd.Series(False, index=match_keys.index)
+    # 会社名のある行を含むグループ
+    named_groups = np.zeros(len(labels), dtype=bool)
+    named_groups[labels[named.to_numpy()]] = True
+    nameless_group = pd.Series(~named_groups[labels], index=match_keys.index)
+    
+    save_keys = match_keys.copy()
+    lookup_keys = match_keys.drop(columns=pair_columns)
+    for column in pair_columns:
+        save_keys[column + NAMELESS_SUFFIX] = match_keys[column].where(nameless_group)
+        lookup_keys[column] = match_keys[column].where(nameless_group)
+        lookup_keys[column + NAMELESS_SUFFIX] = match_keys[column].where(named)
+    return save_keys, lookup_keys
+
+def deduplicate(df: pd.DataFrame, list_id: str, mode: str = "flag", cross_list: bool = False,
+                start_index: int = 0) -> Tuple[pd.DataFrame, Dict[str, int], List[Tuple[str, int, str]]]:
+    """
+    同じ会社とみなされる行を検出する（dfには行IDのidカラムが必要。判定の条件は group_rows を参照）
+    mode="flag"の場合は重複する行のduplicate_ofに先頭行のIDを設定し、
+    mode="merge"の場合は重複する行を先頭行にまとめる（先頭行の欠損値は他の行の値で補う）
+    保存済みのキーと照合するため、同じリストの前のチャンクに含まれる行も重複として検出する
+    cross_list=Trueの場合は他のリストとも照合し、一致したリストのIDをduplicate_of_listに設定する
+    戻り値は (処理後のDataFrame, 集計, 保存用のキー)。キーはリストを保存した後にsave_dedup_keysで保存する
+    """
+    if mode not in ("flag", "merge"):
+        raise ValueError(f"重複の処理方法が不正です: {mode}")
+    
+    df = df.reset_index(drop=True)
+    match_keys = build_match_keys(build_keys(df))
+    labels = group_rows(match_keys)
+    ids = df["id"].to_numpy(dtype=object)
+    save_keys, lookup_keys = build_stored_keys(match_keys, labels)
+    # 同じキーの行は同じグループに属するため、照合・保存はキーごとに最初の行のみで行う
+    unique_keys = flatten_keys(save_keys)
+    positions = unique_keys.to_numpy()
+    unique_lookup_keys = flatten_keys(lookup_keys)
+    
+    # 保存済みのキーとの照合（前のチャンク・他のリスト）
+    previous, other_lists = find_dedup_matches(list_id, unique_lookup_keys.index.tolist(), start_index, cross_list)
+    
+    duplicate_of = np.where(labels != np.arange(len(df)), ids[labels], None)
+    # 前のチャンクの行が先頭行となるよう、グループ全体に反映する
+    previous_heads = spread_to_groups(labels, unique_lookup_keys, previous)
+    duplicate_of = np.where(pd.notna(previous_heads), previous_heads, duplicate_of)
+    
+    df["duplicate_of"] = duplicate_of
+    if cross_list:
+        df["duplicate_of_list"] = spread_to_groups(labels, unique_lookup_keys, other_lists)
+    
+    stats = {
+        "duplicates": int(pd.notna(duplicate_of).sum()),
+        "cross_list_matches": int(df["duplicate_of_list"].notna().sum()) if cross_list else 0
+    }
+    
+    # 後から照合した行が重複元を参照できるよう、キーは先頭行のIDで保存する
+    canonical_ids = np.where(pd.isna(duplicate_of), ids, duplicate_of)
+    key_rows = list(zip(canonical_ids[positions].tolist(), (positions + start_index).tolist(),
+                        unique_keys.index.tolist()))
+    
+    if mode == "merge":
+        heads = (labels == np.arange(len(df))) & pd.isna(duplicate_of)
+        sizes = np.bincount(labels, minlength=len(df))
+        merged = df.groupby(labels, sort=False).first()
+        merged["duplicate_count"] = sizes[merged.index.to_numpy()] - 1
+        # 前のチャンクに先頭行がある行は出力済みのため除く
+        df = merged[heads[merged.index.to_numpy()]].drop(columns=["duplicate_of"]).reset_index(drop=True)
+    
+    return df, stats, key_rows
+
+def spread_to_groups(labels: np.ndarray, unique_keys: pd.Series, matches: Dict[str, str]) -> np.ndarray:
+    """
+    キーごとの照合結果を、そのキーを持つ行のグループ全体に反映する
+    """
+    by_group = np.full(len(labels), None, dtype=object)
+    if matches:
+        positions = unique_keys.reindex(list(matches.keys())).to_numpy()
+        by_group[labels[positions]] = list(matches.values())
+    return by_group[labels]
+
+def flatten_keys(keys: pd.DataFrame) -> pd.Series:
+    """
+    キーを "種類:値" の文字列にまとめ、キーごとに最初に現れた行の位置を返す（インデックスがキー）
+    """
+    parts = []
+    for key in keys.columns:
+        column = keys[key].dropna()
+        parts.append(pd.Series(column.index.to_numpy(), index=key + ":" + column.astype(str)))
+    if not parts:
+        return pd.Series([], dtype=np.int64)
+    flattened = pd.concat(parts)
+    return flattened[~flattened.index.duplicated()]
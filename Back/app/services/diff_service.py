@@ -0,0 +1,141 @@
+import hashlib
+import logging
+import orjson
+from collections import defaultdict, deque
+from typing import Dict, List, Any, Optional, Tuple
+
+from services.dedup_service import normalize_company_name
+from services.store_service import get_list_info, get_row_fingerprints
+
+logger = logging.getLogger(__name__)
+
+# フィンガープリントに含めない項目（処理ごとに変わるID・生成結果・重複の検出結果）
+EXCLUDED_FINGERPRINT_FIELDS = {"id", "status", "salesText", "duplicate_of", "duplicate_of_list", "duplicate_count"}
+
+def compute_fingerprint(record: Dict[str, Any]) -> str:
+    """
+    行の内容のフィンガープリントを作成する（値がない項目・項目の順番の違いは無視する）
+    欠損値を含む列は整数が小数になるため、整数値の小数は整数として扱う
+    """
+    fields = {}
+    for key, value in record.items():
+        if key in EXCLUDED_FINGERPRINT_FIELDS or value is None or value == "":
+            continue
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        fields[key] = value
+    return hashlib.blake2b(orjson.dumps(fields, option=orjson.OPT_SORT_KEYS), digest_size=16).hexdigest()
+
+def compute_fingerprints(records: List[Dict[str, Any]]) -> List[Tuple[Optional[str], str]]:
+    """
+    各行の (照合用のキー, フィンガープリント) を作成する
+    キーは正規化した会社名で、同じ会社名は1回だけ正規化する
+    """
+    names: Dict[str, Optional[str]] = {}
+    result = []
+    for record in records:
+        name = record.get("company_name")
+        row_key = None
+        if name is not None and name != "":
+            name = str(name)
+            row_key = names.get(name)
+            if row_key is None and name not in names:
+                row_key = names[name] = normalize_company_name(name)
+        result.append((row_key, compute_fingerprint(record)))
+    return result
+
+class RowMatcher:
+    """
+    再アップロードされたリストの行を前のバージョンの行と照合する
+    内容（フィンガープリント）が同じ行は変更なしとして行IDと営業文面を引き継ぎ、
+    会社名（キー）のみ一致する行は変更ありとして行IDのみ引き継ぐ（営業文面は生成し直す）
+    """
+    def __init__(self, previous_list_id: str):
+        if get_list_info(previous_list_id) is None:
+            raise ValueError(f"前のリストが見つかりません: {previous_list_id}")
+        self.previous_list_id = previous_list_id
+        self.previous = get_row_fingerprints(previous_list_id)
+        self.used = [False] * len(self.previous)
+        self.by_fingerprint: Dict[Tuple[Optional[str], str], deque] = defaultdict(deque)
+        self.by_key: Dict[str, deque] = defaultdict(deque)
+        for index, (_, row_key, fingerprint, _, data) in enumerate(self.previous):
+            if fingerprint is None:
+                # フィンガープリントを保存していない行は保存済みのデータから作成する
+                row_key, fingerprint = compute_fingerprints([data])[0]
+            self.by_fingerprint[(row_key, fingerprint)].append(index)
+            if row_key is not None:
+                self.by_key[row_key].append(index)
+        self.added_ids: List[str] = []
+        self.changed_ids: List[str] = []
+        self.unchanged = 0
+    
+    def _take(self, candidates: Optional[deque]) -> Optional[int]:
+        """
+        照合済みでない前のバージョンの行を順番に1つ取り出す
+        """
+        while candidates:
+            index = candidates.popleft()
+            if not self.used[index]:
+                self.used[index] = True
+                return index
+        return None
+    
+    def match(self, records: List[Dict[str, Any]], fingerprints: List[Tuple[Optional[str], str]]) -> Dict[str, str]:
+        """
+        行を照合し、一致した行のIDを前のバージョンのIDに置き換える（recordsを直接変更する）
+        内容が同じ行を先に照合し、残りの行を会社名で照合する
+        戻り値は置き換えたIDの対応（新しいID → 前のバージョンのID）
+        """
+        id_map: Dict[str, str] = {}
+        pending = []
+        for record, key in zip(records, fingerprints):
+            index = self._take(self.by_fingerprint.get(key))
+            if index is None:
+                pending.append((record, key[0]))
+                continue
+            row_id, _, _, sales_text, _ = self.previous[index]
+            id_map[str(record["id"])] = row_id
+            record["id"] = row_id
+            if sales_text is not None:
+                record["salesText"] = sales_text
+            self.unchanged += 1
+        
+        for record, row_key in pending:
+            index = self._take(self.by_key.get(row_key)) if row_key is not None else None
+            if index is None:
+                self.added_ids.append(str(record["id"]))
+                continue
+            row_id = self.previous[index][0]
+            id_map[str(record["id"])] = row_id
+            record["id"] = row_id
+            self.changed_ids.append(row_id)
+        return id_map
+    
+    def summary(self) -> Dict[str, Any]:
+        """
+        照合結果の集計（追加・変更・削除された行のID）
+        """
+        removed_ids = [row[0] for row, used in zip(self.previous, self.used) if not used]
+        return {
+            "previous_list_id": self.previous_list_id,
+            "added": len(self.added_ids),
+            "changed": len(self.changed_ids),
+            "unchanged": self.unchanged,
+            "removed": len(removed_ids),
+            "added_ids": self.added_ids,
+            "changed_ids": self.changed_ids,
+            "removed_ids": removed_ids,
+        }
+
+def remap_duplicate_ids(records: List[Dict[str, Any]], key_rows: List[Tuple[str, int, str]],
+                        id_map: Dict[str, str]) -> List[Tuple[str, int, str]]:
+    """
+    重複の検出結果（duplicate_of・保存用のキー）が参照する行IDを照合後のIDに置き換える
+    """
+    if not id_map:
+        return key_rows
+    for record in records:
+        duplicate_of = record.get("duplicate_of")
+        if duplicate_of is not None:
+            record["duplicate_of"] = id_map.get(duplicate_of, duplicate_of)
+    return [(id_map.get(row_id, row_id), row_index, key) for row_id, row_index, key in key_rows]
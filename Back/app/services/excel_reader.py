@@ -0,0 +1,473 @@
+import os
+import re
+import math
+import zipfile
+import posixpath
+import multiprocessing
+import xml.etree.ElementTree as ET
+from xml.parsers import expat
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+import pandas as pd
+from pandas.io.parsers import TextParser
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+from openpyxl.utils.datetime import from_excel, CALENDAR_WINDOWS_1900, CALENDAR_MAC_1904
+
+from config import settings
+
+# xlsxの名前空間
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PACKAGE_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+# expatで名前空間を展開した要素名（"名前空間 要素名"）
+TEXT_TAG = f"{MAIN_NS} t"
+PHONETIC_TAG = f"{MAIN_NS} rPh"
+SHARED_STRING_TAG = f"{MAIN_NS} si"
+
+# 日本語版Excelの組み込みの日付書式（openpyxlの組み込み書式には含まれない）
+JAPANESE_DATE_FORMAT_IDS = set(range(27, 37)) | set(range(50, 59))
+
+CELL_REF_PATTERN = re.compile(r"^([A-Z]+)(\d+)$")
+
+# 結合セルの要素（<mergeCell ref="A1:B2"/>。名前空間の接頭辞の有無によらない）
+MERGE_CELL_PATTERN = re.compile(rb"<(?:[\w.-]+:)?mergeCell\b[^>]*?\bref=[\"']([^\"']+)[\"']")
+
+# 結合セルを探す際にシートのXMLを読み込む単位
+MERGE_SCAN_BLOCK_SIZE = 1024 * 1024
+
+# 1つの範囲の (開始行, 開始列, 終了行, 終了列)（0から、終了を含む）
+CellRange = Tuple[int, int, int, int]
+
+class SheetParser:
+    """
+    ワークシートのXMLを1回走査し、各行の値と結合セルの範囲を取り出す
+    セルの値はpandas.read_excel（openpyxl）と同じ規則で変換する
+    （空のセルは""、エラーはNaN、整数値の数値はint、日付書式の数値はdatetime）
+    """
+    def __init__(self, shared_strings: List[str], date_styles: set, epoch: datetime):
+        self.shared_strings = shared_strings
+        self.date_styles = date_styles
+        self.epoch = epoch
+        self.rows: List[List[Any]] = []
+        self.merges: List[str] = []
+        self.row: Optional[List[Any]] = None
+        self.column = -1
+        self.cell_type = None
+        self.cell_style = 0
+        self.text: List[str] = []
+        self.has_value = False
+        self.in_value = False
+        self.in_phonetic = False
+        self.column_cache: Dict[str, int] = {}
+        self.set_prefix("")
+    
+    def set_prefix(self, prefix: str) -> None:
+        """
+        比較する要素名に名前空間の接頭辞（"x:"など）を付ける
+        """
+        self.row_tag = prefix + "row"
+        self.cell_tag = prefix + "c"
+        self.value_tag = prefix + "v"
+        self.text_tag = prefix + "t"
+        self.phonetic_tag = prefix + "rPh"
+        self.merge_cell_tag = prefix + "mergeCell"
+    
+    def parse(self, source) -> None:
+        # シートのXMLは大きいため、名前空間の展開は行わず（展開すると大幅に遅くなる）、
+        # ルート要素の接頭辞から要素名を決める
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        
+        def start_root(name: str, attrs: Dict[str, str]) -> None:
+            self.set_prefix(name[:name.index(":") + 1] if ":" in name else "")
+            parser.StartElementHandler = self.start
+        
+        parser.StartElementHandler = start_root
+        parser.EndElementHandler = self.end
+        parser.CharacterDataHandler = self.characters
+        parser.ParseFile(source)
+    
+    def column_index(self, ref: str) -> int:
+        letters = ref.rstrip("0123456789")
+        index = self.column_cache.get(letters)
+        if index is None:
+            index = 0
+            for letter in letters:
+                index = index * 26 + ord(letter) - 64
+            index = self.column_cache[letters] = index - 1
+        return index
+    
+    def start(self, name: str, attrs: Dict[str, str]) -> None:
+        if name == self.cell_tag:
+            ref = attrs.get("r")
+            self.column = self.column_index(ref) if ref else self.column + 1
+            self.cell_type = attrs.get("t", "n")
+            self.cell_style = int(attrs.get("s", 0))
+            self.text = []
+            self.has_value = False
+        elif name == self.value_tag or name == self.text_tag:
+            if not self.in_phonetic:
+                self.in_value = True
+                self.has_value = True
+        elif name == self.row_tag:
+            # 値のない行は省略されているため、行番号に合わせて空の行を補う
+            number = attrs.get("r")
+            if number is not None:
+                while len(self.rows) < int(number) - 1:
+                    self.rows.append([])
+            self.row = []
+            self.column = -1
+        elif name == self.phonetic_tag:
+            self.in_phonetic = True
+        elif name == self.merge_cell_tag:
+            self.merges.append(attrs.get("ref", ""))
+    
+    def end(self, name: str) -> None:
+        if name == self.value_tag or name == self.text_tag:
+            self.in_value = False
+        elif name == self.cell_tag:
+            value = self.convert() if self.has_value else ""
+            row = self.row
+            if self.column > len(row):
+                row.extend([""] * (self.column - len(row)))
+            if self.column == len(row):
+                row.append(value)
+            else:
+                row[self.column] = value
+        elif name == self.row_tag:
+            self.rows.append(self.row)
+            self.row = None
+        elif name == self.phonetic_tag:
+            self.in_phonetic = False
+    
+    def characters(self, data: str) -> None:
+        if self.in_value:
+            self.text.append(data)
+    
+    def convert(self) -> Any:
+        text = "".join(self.text)
+        cell_type = self.cell_type
+        if cell_type == "n":
+            if not text:
+                return ""
+            if "." in text or "E" in text or "e" in text:
+                number = float(text)
+            else:
+                number = int(text)
+            if self.cell_style in self.date_styles:
+                return from_excel(number, self.epoch)
+            if isinstance(number, float) and number.is_integer():
+                return int(number)
+            return number
+        if cell_type == "s":
+            return self.shared_strings[int(text)]
+        if cell_type == "b":
+            return text == "1"
+        if cell_type == "e":
+            return math.nan
+        if cell_type == "d":
+            return datetime.fromisoformat(text.rstrip("Z"))
+        # inlineStr / str（数式の結果の文字列）
+        return text
+
+def read_shared_strings(archive: zipfile.ZipFile, path: Optional[str]) -> List[str]:
+    """
+    共有文字列を読み込む（ふりがな（rPh）は除く）
+    """
+    if path is None or path not in archive.namelist():
+        return []
+    strings: List[str] = []
+    state = {"text": [], "in_text": False, "in_phonetic": False}
+    
+    def start(name, attrs):
+        if name == TEXT_TAG and not state["in_phonetic"]:
+            state["in_text"] = True
+        elif name == PHONETIC_TAG:
+            state["in_phonetic"] = True
+        elif name == SHARED_STRING_TAG:
+            state["text"] = []
+    
+    def end(name):
+        if name == TEXT_TAG:
+            state["in_text"] = False
+        elif name == PHONETIC_TAG:
+            state["in_phonetic"] = False
+        elif name == SHARED_STRING_TAG:
+            strings.append("".join(state["text"]))
+    
+    def characters(data):
+        if state["in_text"]:
+            state["text"].append(data)
+    
+    parser = expat.ParserCreate(namespace_separator=" ")
+    parser.buffer_text = True
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = characters
+    with archive.open(path) as source:
+        parser.ParseFile(source)
+    return strings
+
+def read_date_styles(archive: zipfile.ZipFile, path: Optional[str]) -> set:
+    """
+    日付の表示形式が設定されたセルのスタイル番号を取得する
+    """
+    if path is None or path not in archive.namelist():
+        return set()
+    root = ET.fromstring(archive.read(path))
+    formats = dict(BUILTIN_FORMATS)
+    for num_fmt in root.iter(f"{{{MAIN_NS}}}numFmt"):
+        formats[int(num_fmt.get("numFmtId"))] = num_fmt.get("formatCode", "")
+    
+    date_styles = set()
+    cell_xfs = root.find(f"{{{MAIN_NS}}}cellXfs")
+    for index, xf in enumerate(cell_xfs if cell_xfs is not None else []):
+        format_id = int(xf.get("numFmtId", 0))
+        if format_id in JAPANESE_DATE_FORMAT_IDS or is_date_format(formats.get(format_id, "")):
+            date_styles.add(index)
+    return date_styles
+
+def resolve_target(base_dir: str, target: str) -> str:
+    """
+    リレーションシップのTargetをアーカイブ内のパスにする
+    """
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(base_dir, target))
+
+def read_workbook(archive: zipfile.ZipFile) -> Tuple[List[Tuple[str, str]], Optional[str], Optional[str], datetime]:
+    """
+    ブックの構成を読み込む
+    戻り値は ([(シート名, シートのパス)], 共有文字列のパス, スタイルのパス, 日付の基準日)
+    """
+    rels_root = ET.fromstring(archive.read("_rels/.rels"))
+    workbook_path = next(
+        resolve_target("", rel.get("Target")) for rel in rels_root.iter(f"{{{PACKAGE_REL_NS}}}Relationship")
+        if rel.get("Type", "").endswith("/officeDocument")
+    )
+    base_dir = posixpath.dirname(workbook_path)
+    workbook_rels = posixpath.join(base_dir, "_rels", posixpath.basename(workbook_path) + ".rels")
+    
+    targets = {}
+    shared_strings_path = styles_path = None
+    for rel in ET.fromstring(archive.read(workbook_rels)).iter(f"{{{PACKAGE_REL_NS}}}Relationship"):
+        rel_type = rel.get("Type", "")
+        target = resolve_target(base_dir, rel.get("Target"))
+        if rel_type.endswith("/worksheet"):
+            targets[rel.get("Id")] = target
+        elif rel_type.endswith("/sharedStrings"):
+            shared_strings_path = target
+        elif rel_type.endswith("/styles"):
+            styles_path = target
+    
+    root = ET.fromstring(archive.read(workbook_path))
+    workbook_pr = root.find(f"{{{MAIN_NS}}}workbookPr")
+    date1904 = workbook_pr is not None and workbook_pr.get("date1904") in ("1", "true")
+    # グラフシートなど、ワークシート以外のシートは除く
+    sheets = [
+        (sheet.get("name"), targets[sheet.get(f"{{{REL_NS}}}id")])
+        for sheet in root.iter(f"{{{MAIN_NS}}}sheet") if sheet.get(f"{{{REL_NS}}}id") in targets
+    ]
+    return sheets, shared_strings_path, styles_path, CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+
+def parse_range(ref: str) -> Optional[CellRange]:
+    """
+    "A1:C3"形式の範囲を (開始行, 開始列, 終了行, 終了列)（0から）に変換する
+    """
+    bounds = []
+    for part in ref.split(":"):
+        match = CELL_REF_PATTERN.match(part)
+        if match is None:
+            return None
+        column = 0
+        for letter in match.group(1):
+            column = column * 26 + ord(letter) - 64
+        bounds.append((int(match.group(2)) - 1, column - 1))
+    if len(bounds) != 2:
+        return None
+    return bounds[0][0], bounds[0][1], bounds[1][0], bounds[1][1]
+
+def unmerge_cells(rows: List[List[Any]], merges: List[Optional[CellRange]]) -> None:
+    """
+    結合セルを解除し、範囲内の全てのセルに左上のセルの値を設定する（範囲がNoneのものは無視する）
+    """
+    for bounds in merges:
+        if bounds is None:
+            continue
+        min_row, min_col, max_row, max_col = bounds
+        if min_row >= len(rows) or min_col >= len(rows[min_row]):
+            continue
+        value = rows[min_row][min_col]
+        for row_index in range(min_row, min(max_row, len(rows) - 1) + 1):
+            row = rows[row_index]
+            if len(row) <= max_col:
+                row.extend([""] * (max_col + 1 - len(row)))
+            row[min_col:max_col + 1] = [value] * (max_col - min_col + 1)
+
+def to_frame(rows: List[List[Any]]) -> pd.DataFrame:
+    """
+    読み込んだ行をpandas.read_excelと同じ規則でDataFrameにする（1行目を見出しとする）
+    """
+    # 末尾の空のセル・空の行を除き、行の長さを揃える
+    last_row_with_data = -1
+    for index, row in enumerate(rows):
+        while row and row[-1] == "":
+            row.pop()
+        if row:
+            last_row_with_data = index
+    rows = rows[:last_row_with_data + 1]
+    if not rows:
+        return pd.DataFrame()
+    width = max(len(row) for row in rows)
+    rows = [row + [""] * (width - len(row)) if len(row) < width else row for row in rows]
+    # 数値・欠損値の判定はpandas.read_excelと同じパーサーで行う
+    return TextParser(rows, header=0).read()
+
+def read_sheet(file_path: str, sheet_name: Optional[str] = None) -> pd.DataFrame:
+    """
+    xlsxの1シートを読み込む（シート名を省略した場合は最初のシート）
+    openpyxlのセルオブジェクトを作らずにXMLを直接走査し、結合セルは左上の値で埋める
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        sheets, shared_strings_path, styles_path, epoch = read_workbook(archive)
+        parser = SheetParser(read_shared_strings(archive, shared_strings_path),
+                             read_date_styles(archive, styles_path), epoch)
+        with archive.open(select_sheet(sheets, sheet_name)) as source:
+            parser.parse(source)
+    
+    unmerge_cells(parser.rows, [parse_range(ref) for ref in parser.merges])
+    return to_frame(parser.rows)
+
+def select_sheet(sheets: List[Tuple[str, str]], sheet_name: Optional[str] = None) -> str:
+    """
+    シート名（省略した場合は最初のシート）からシートのXMLのパスを取得する
+    """
+    if not sheets:
+        raise ValueError("ワークシートが含まれていません。")
+    if sheet_name is None:
+        return sheets[0][1]
+    sheet_path = dict(sheets).get(sheet_name)
+    if sheet_path is None:
+        raise ValueError(f"シートが見つかりません: {sheet_name}")
+    return sheet_path
+
+def read_xlsx_merges(file_path: str, sheet_name: Optional[str] = None) -> List[Optional[CellRange]]:
+    """
+    xlsxのシートの結合セルの範囲を取得する（セルの値は解析せず、XMLから結合セルの要素のみを探す）
+    """
+    merges = []
+    with zipfile.ZipFile(file_path) as archive:
+        with archive.open(select_sheet(read_workbook(archive)[0], sheet_name)) as source:
+            rest = b""
+            for block in iter(lambda: source.read(MERGE_SCAN_BLOCK_SIZE), b""):
+                data = rest + block
+                # 要素の途中で切れている場合に備え、最後の"<"以降は次のブロックと合わせて探す
+                cut = data.rfind(b"<")
+                if cut < 0:
+                    cut = len(data)
+                merges.extend(MERGE_CELL_PATTERN.findall(data, 0, cut))
+                rest = data[cut:]
+            merges.extend(MERGE_CELL_PATTERN.findall(rest))
+    return [parse_range(ref.decode("ascii", "ignore")) for ref in merges]
+
+def read_xls_merges(file_path: str, sheet_name: Optional[str] = None) -> List[Optional[CellRange]]:
+    """
+    xlsのシートの結合セルの範囲を取得する（xlrdはpandasでxlsを読み込む場合に必要な依存）
+    """
+    import xlrd
+    
+    book = xlrd.open_workbook(file_path, formatting_info=True, on_demand=True)
+    try:
+        sheet = book.sheet_by_index(0) if sheet_name is None else book.sheet_by_name(sheet_name)
+        # xlrdの範囲は (開始行, 終了行の次, 開始列, 終了列の次)
+        return [(rlo, clo, rhi - 1, chi - 1) for rlo, rhi, clo, chi in sheet.merged_cells]
+    finally:
+        book.release_resources()
+
+def read_merges(file_path: str, sheet_name: Optional[str] = None) -> List[Optional[CellRange]]:
+    """
+    シートの結合セルの範囲を取得する
+    """
+    if file_path.split(".")[-1].lower() == "xls":
+        return read_xls_merges(file_path, sheet_name)
+    return read_xlsx_merges(file_path, sheet_name)
+
+def frame_from_cells(cells: pd.DataFrame, merges: List[Optional[CellRange]]) -> pd.DataFrame:
+    """
+    見出しを解釈せずに読み込んだセルの値（header=None）の結合セルを解除し、to_frameと同じ規則でDataFrameにする
+    """
+    rows = [
+        ["" if isinstance(value, float) and math.isnan(value) else value for value in row]
+        for row in cells.itertuples(index=False, name=None)
+    ]
+    unmerge_cells(rows, merges)
+    return to_frame(rows)
+
+def read_sheet_with_pandas(file_path: str, sheet_name: Optional[str] = None) -> pd.DataFrame:
+    """
+    pandas.read_excelで1シートを読み込む（xls・EXCEL_READERが"pandas"の場合）
+    結合セルはread_sheetと同じく左上の値で埋める
+    """
+    cells = pd.read_excel(file_path, sheet_name=0 if sheet_name is None else sheet_name, header=None, dtype=object)
+    return frame_from_cells(cells, read_merges(file_path, sheet_name))
+
+def list_sheets(file_path: str) -> List[str]:
+    """
+    xlsxのワークシート名の一覧を取得する
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        return [name for name, _ in read_workbook(archive)[0]]
+
+def read_all_sheets(file_path: str, max_workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    xlsxの全てのシートを読み込み、シート名の列（EXCEL_SHEET_COLUMN）を加えて縦に連結する
+    シートが複数ある場合は、シートごとに別プロセスで並行して読み込む
+    （max_workersを省略した場合、EXCEL_PARALLEL_MIN_SIZE未満のファイルは並行しない）
+    """
+    sheet_names = list_sheets(file_path)
+    if max_workers is None and os.path.getsize(file_path) < settings.EXCEL_PARALLEL_MIN_SIZE:
+        # 小さいファイルはプロセスの起動の方が時間がかかるため、並行せずに読み込む
+        max_workers = 1
+    workers = min(max_workers or os.cpu_count() or 1, len(sheet_names))
+    if workers <= 1:
+        frames = [read_sheet(file_path, name) for name in sheet_names]
+    else:
+        # スレッドを使用しているプロセスからのforkは不安定になるため、spawnで起動する
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            frames = list(executor.map(read_sheet, [file_path] * len(sheet_names), sheet_names))
+    return concat_sheets(sheet_names, frames)
+
+def concat_sheets(sheet_names: List[str], frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    シートごとのDataFrameにシート名の列を加えて連結する
+    """
+    for name, frame in zip(sheet_names, frames):
+        frame[settings.EXCEL_SHEET_COLUMN] = name
+    frames = [frame for frame in frames if len(frame)]
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True, sort=False)
+
+def read_excel_file(file_path: str, all_sheets: Optional[bool] = None) -> pd.DataFrame:
+    """
+    Excelファイルを読み込む
+    xlsxはEXCEL_READERが"fast"の場合に独自の読み込み処理を使用し、xlsはpandas.read_excelで読み込む
+    いずれの場合も結合セルは左上の値で埋める
+    all_sheets（省略時はEXCEL_READ_ALL_SHEETS）がTrueの場合は全てのシートを連結する
+    """
+    if all_sheets is None:
+        all_sheets = settings.EXCEL_READ_ALL_SHEETS
+    ext = file_path.split(".")[-1].lower()
+    
+    if ext == "xlsx" and settings.EXCEL_READER == "fast":
+        if all_sheets:
+            return read_all_sheets(file_path, settings.EXCEL_SHEET_WORKERS or None)
+        return read_sheet(file_path)
+    
+    if all_sheets:
+        sheets = pd.read_excel(file_path, sheet_name=None, header=None, dtype=object)
+        frames = [frame_from_cells(cells, read_merges(file_path, name)) for name, cells in sheets.items()]
+        return concat_sheets(list(sheets.keys()), frames)
+    return read_sheet_with_pandas(file_path)
@@ -1,7 +1,11 @@
 from fastapi import UploadFile, HTTPException
 import os
+import hashlib
 import aiofiles
+import asyncio
+from typing import Tuple, Optional
 from config import settings
+from services.store_service import register_upload, find_upload_by_hash
 
 async def validate_file(file: UploadFile) -> bool:
     """
@@ -19,18 +23,57 @@ async def validate_file(file: UploadFile) -> bool:
     
     return True
 
-async def save_file(file: UploadFile, filename: str) -> str:
+def build_upload_name(file_id: str, filename: str) -> str:
     """
-    アップロードされたファイルを保存する
+    保存先のファイル名（UPLOAD_DIRからの相対パス）を作成する
+    UPLOAD_SHARD_DEPTHが1以上の場合はファイルIDの先頭から2文字ずつのサブディレクトリに振り分ける
+    """
+    # パス区切りを含むファイル名でUPLOAD_DIRの外に書き込まれないようにする
+    name = f"{file_id}-{os.path.basename(filename)}"
+    shards = [file_id[i * 2:i * 2 + 2] for i in range(settings.UPLOAD_SHARD_DEPTH)]
+    return os.path.join(*shards, name)
+
+async def save_file(file: UploadFile, filename: str) -> Tuple[str, str, int]:
+    """
+    アップロードされたファイルを一定サイズずつ保存する
+    保存しながらサイズの上限を確認し、SHA-256ハッシュを計算する
+    戻り値は (保存先のパス, ハッシュ, サイズ)
     """
     file_path = os.path.join(settings.UPLOAD_DIR, filename)
     
     # ディレクトリが存在することを確認
-    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
     
     # ファイルを保存
-    async with aiofiles.open(file_path, "wb") as out_file:
-        content = await file.read()
-        await out_file.write(content)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with aiofiles.open(file_path, "wb") as out_file:
+            while True:
+                chunk = await file.read(settings.UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > settings.MAX_FILE_SIZE:
+                    raise ValueError(f"File size exceeds the limit of {settings.MAX_FILE_SIZE / (1024 * 1024)}MB")
+                digest.update(chunk)
+                await out_file.write(chunk)
+    except BaseException:
+        # 途中で失敗・中断した場合は書きかけのファイルを削除する
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
     
-    return file_path
\ No newline at end of file
+    return file_path, digest.hexdigest(), size
+
+async def register_file(file_id: str, file_path: str, filename: str, size: int, sha256: str) -> Optional[str]:
+    """
+    保存したファイルを登録し、同じ内容のファイルが既にあればそのファイルIDを返す
+    """
+    ext = filename.split(".")[-1].lower()
+    loop = asyncio.get_event_loop()
+    duplicate_of = await loop.run_in_executor(None, find_upload_by_hash, sha256, file_id)
+    await loop.run_in_executor(
+        None, register_upload, file_id, file_path, os.path.basename(filename), ext, size, sha256
+    )
+    return duplicate_of
\ No newline at end of file
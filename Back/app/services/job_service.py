@@ -0,0 +1,194 @@
+import os
+import time
+import logging
+import uuid
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Dict, Any, Optional
+
+from config import settings
+from services.store_service import (
+    create_job, update_job, get_job, request_job_cancel, delete_jobs_before, complete_job, get_job_result,
+    get_active_job_owners, fail_active_jobs
+)
+
+logger = logging.getLogger(__name__)
+
+class JobCancelledError(Exception):
+    """
+    ジョブが中止された
+    """
+
+class JobLimitError(Exception):
+    """
+    受け付け可能なジョブ数を超えた
+    """
+
+def run_process_job(job_id: str, file_id: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    ワーカープロセスでファイルを処理する
+    処理結果の行は保存先に書き込まれるため、プロセス間ではマッピングなどの概要のみ受け渡す
+    """
+    from services.data_service import process_file_sync
+    
+    def report(stage: str, ratio: float) -> None:
+        # 保存が終わった後は中止を受け付けない
+        if ratio < 1.0:
+            job = get_job(job_id)
+            if job is not None and job["cancel_requested"]:
+                raise JobCancelledError("ジョブが中止されました。")
+        update_job(job_id, status="running", stage=stage, progress=ratio)
+    
+    result = process_file_sync(file_id, progress=report, **options)
+    summary = {key: value for key, value in result.items() if key != "data"}
+    summary["row_count"] = len(result["data"])
+    return summary
+
+def is_process_alive(pid: int) -> bool:
+    """
+    指定したPIDのプロセスが存在するか確認する
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # 他のユーザーのプロセスとして存在する
+        return True
+    return True
+
+class JobManager:
+    """
+    ファイル処理をプロセスプールで実行するジョブの管理
+    同時に実行するのはmax_workers件までで、それ以降は待機する
+    待機中・実行中のジョブがmax_active件に達した場合は新しいジョブを受け付けない
+    ジョブの状態と完了したジョブの概要は保存先に記録するため、再起動後や他のワーカープロセスからも取得できる
+    """
+    def __init__(self, max_workers: int, max_active: int, retention: int):
+        self.max_workers = max_workers
+        self.max_active = max_active
+        self.retention = retention
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.futures: Dict[str, Future] = {}
+        self.lock = threading.Lock()
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """
+        プロセスプールを取得する（初回のみ作成）
+        """
+        if self.executor is None:
+            # スレッドを使用しているプロセスからのforkは不安定になるため、spawnで起動する
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self.executor
+    
+    def submit(self, file_id: str, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        ファイル処理のジョブを登録し、ジョブの状態を返す
+        optionsはprocess_file_syncにそのまま渡す（dedup・dedup_cross_list・previous_list_id）
+        """
+        # data_service（pandas）は読み込みに時間がかかるため、最初のジョブの登録時に読み込む
+        from services.data_service import find_upload
+        
+        # ファイルが存在しない場合はここでFileNotFoundErrorとする
+        find_upload(file_id)
+        self._prune()
+        
+        with self.lock:
+            active = sum(1 for future in self.futures.values() if not future.done())
+            if active >= self.max_active:
+                raise JobLimitError(f"処理中のジョブが上限（{self.max_active}件）に達しています。")
+            
+            job_id = str(uuid.uuid4())
+            create_job(job_id, file_id)
+            future = self._get_executor().submit(run_process_job, job_id, file_id, options or {})
+            self.futures[job_id] = future
+        
+        future.add_done_callback(lambda f: self._finish(job_id, f))
+        return get_job(job_id)
+    
+    def _finish(self, job_id: str, future: Future) -> None:
+        """
+        ジョブの終了時に結果と状態を記録する
+        """
+        if future.cancelled():
+            update_job(job_id, status="cancelled")
+            return
+        
+        error = future.exception()
+        if error is None:
+            complete_job(job_id, future.result())
+        elif isinstance(error, JobCancelledError):
+            update_job(job_id, status="cancelled")
+        else:
+            logger.error("ジョブの処理に失敗しました: %s: %s", job_id, str(error))
+            update_job(job_id, status="failed", error=str(error))
+    
+    def get_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        ジョブの状態を取得する（存在しない場合はNone）
+        """
+        return get_job(job_id)
+    
+    def get_result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        完了したジョブの概要（処理結果から行を除いたものと行数）を取得する（完了していない場合はNone）
+        """
+        return get_job_result(job_id)
+    
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        ジョブを中止する
+        待機中のジョブはすぐに取り消し、実行中のジョブは次の段階に進む前に中止する
+        """
+        job = get_job(job_id)
+        if job is None:
+            return None
+        
+        future = self.futures.get(job_id)
+        if future is not None and future.cancel():
+            return get_job(job_id)
+        if job["status"] in ("queued", "running"):
+            request_job_cancel(job_id)
+        return get_job(job_id)
+    
+    def _prune(self) -> None:
+        """
+        保持期間を過ぎた終了済みのジョブを削除する
+        """
+        delete_jobs_before(time.time() - self.retention)
+        with self.lock:
+            for job_id, future in list(self.futures.items()):
+                if future.done() and get_job(job_id) is None:
+                    del self.futures[job_id]
+    
+    def recover(self) -> int:
+        """
+        登録したプロセスが終了し、待機中・実行中のまま残ったジョブを失敗とする（起動時に呼び出す）
+        他のワーカープロセスが実行中のジョブはそのままにする。戻り値は失敗としたジョブ数
+        """
+        orphaned = [pid for pid in get_active_job_owners() if pid is None or not is_process_alive(pid)]
+        if not orphaned:
+            return 0
+        count = fail_active_jobs(orphaned, "処理中にサーバーが停止したため、ジョブが中断されました。")
+        if count:
+            logger.warning("中断されたジョブを失敗としました: %d件", count)
+        return count
+    
+    def shutdown(self) -> None:
+        """
+        プロセスプールを停止する（待機中のジョブは取り消す）
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+# ファイル処理のジョブ管理（アプリケーション全体で共有）
+job_manager = JobManager(
+    max_workers=settings.JOB_MAX_WORKERS,
+    max_active=settings.JOB_MAX_ACTIVE,
+    retention=settings.JOB_RETENTION
+)
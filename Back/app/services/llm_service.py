@@ -1,13 +1,54 @@
 import os
+import json
 import asyncio
-from typing import Dict, Any, List
-import google.generativeai as genai
-from google.api_core.exceptions import GoogleAPIError
+import logging
+from typing import Dict, Any, List, Tuple, Optional, Callable
 import random
+import threading
+import time
+
+from config import settings
+from services.cache_service import sales_text_cache, build_cache_key
+from utils.templates import TemplateRenderer
+from utils.metrics import LLM_REQUEST_DURATION, MODEL_DISCOVERY, LLM_RETRIES, LLM_CONCURRENCY_LIMIT
+
+logger = logging.getLogger(__name__)
+
+# プロンプトのバージョン（プロンプトを変更した場合は更新し、営業文面のキャッシュを無効化する）
+PROMPT_VERSION = 1
+
+# プロンプトに含めないフィールド
+EXCLUDED_PROMPT_FIELDS = ["id", "status", "salesText"]
+
+# 営業文面1件あたりの出力トークン数の見積もり（300文字程度の日本語）
+SALES_TEXT_OUTPUT_TOKENS = 600
 
 # Gemini APIキーの設定
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-genai.configure(api_key=GEMINI_API_KEY)
+
+# Gemini APIのクライアント（google.generativeaiは読み込みに時間がかかるため、configure_geminiで読み込む）
+_genai = None
+_genai_lock = threading.Lock()
+
+def configure_gemini():
+    """
+    Gemini APIのクライアントを読み込んで設定する（設定済みの場合はそのまま返す）
+    本番環境では起動時に呼び出し、それ以外では初めてGemini APIを使用する時に呼び出される
+    """
+    global _genai
+    
+    with _genai_lock:
+        if _genai is None:
+            import google.generativeai as genai
+            
+            if settings.GEMINI_API_ENDPOINT:
+                # 接続先を変更する場合（ローカルの疑似サーバーなど）はRESTで接続する
+                genai.configure(api_key=GEMINI_API_KEY, transport="rest",
+                                client_options={"api_endpoint": settings.GEMINI_API_ENDPOINT})
+            else:
+                genai.configure(api_key=GEMINI_API_KEY)
+            _genai = genai
+        return _genai
 
 # テスト用のダミー営業文面
 SAMPLE_TEXTS = [
@@ -18,29 +59,341 @@ SAMPLE_TEXTS = [
     "{company_name}様\n\n拝啓 時下ますますご清栄のこととお慶び申し上げます。\n\n弊社では、{established_year}年創業の老舗企業様向けに、伝統と革新を両立させるデジタル変革支援を行っております。{industry}業界での豊富な実績を基に、貴社の価値を最大化するソリューションをご提案いたします。\n\n詳細資料をお送りいたしますので、ご検討いただければ幸いです。敬具"
 ]
 
-# ダミー営業文面を生成する関数
-def generate_dummy_sales_text(company_data):
-    template = random.choice(SAMPLE_TEXTS)
+# ダミー営業文面で値がない項目に埋め込む文字列
+SAMPLE_TEXT_DEFAULTS = {
+    "company_name": "貴社",
+    "industry": "各",
+    "employee_count": "数十",
+    "revenue": "数百",
+    "contact_person": "ご担当者",
+    "established_year": "数十",
+}
+
+# ダミー営業文面のテンプレート（起動時に1回のみ解析する）
+sample_text_renderer = TemplateRenderer(SAMPLE_TEXTS, SAMPLE_TEXT_DEFAULTS)
+
+class SalesTextGenerationError(Exception):
+    """
+    営業文面の生成に失敗した（再試行しても成功しなかった）
+    """
+
+class LoopLocal:
+    """
+    実行中のイベントループごとに作成するasyncioの同期プリミティブ（Lock・Conditionなど）
+    モジュールの読み込み時に作成すると最初に使用したイベントループに結び付き、別のイベントループ
+    （TestClient・ベンチマーク・ワーカーの再起動）から使用できなくなるため、使用時に作成する
+    """
+    def __init__(self, factory: Callable[[], Any]):
+        self.factory = factory
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.value = None
+    
+    def get(self) -> Any:
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.value = self.factory()
+            self.loop = loop
+        return self.value
+
+class RateLimiter:
+    """
+    トークンバケット方式で1分あたりのリクエスト数とトークン数を制限する
+    トークン数はリクエスト前の見積もりで消費する
+    """
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int = 0, burst: int = 1):
+        self.request_rate = requests_per_minute / 60.0
+        self.request_capacity = max(1, burst)
+        self.requests = float(self.request_capacity)
+        # トークン数は1分間分まで貯められる
+        self.token_rate = tokens_per_minute / 60.0
+        self.token_capacity = max(0, tokens_per_minute)
+        self.tokens = float(self.token_capacity)
+        self.updated_at = time.monotonic()
+        self.lock = LoopLocal(asyncio.Lock)
+    
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self.updated_at
+        self.requests = min(self.request_capacity, self.requests + elapsed * self.request_rate)
+        self.tokens = min(self.token_capacity, self.tokens + elapsed * self.token_rate)
+        self.updated_at = now
+    
+    async def acquire(self, tokens: int = 0) -> None:
+        """
+        リクエスト1回分とtokensトークン分の枠が空くまで待機する
+        """
+        # 0以下の場合は制限しない
+        check_requests = self.request_rate > 0
+        check_tokens = self.token_rate > 0 and tokens > 0
+        if not check_requests and not check_tokens:
+            return
+        # 1分間の上限を超える見積もりは上限まで待てば実行する
+        tokens = min(tokens, self.token_capacity) if check_tokens else 0
+        async with self.lock.get():
+            while True:
+                self._refill()
+                wait = 0.0
+                if check_requests and self.requests < 1:
+                    wait = (1 - self.requests) / self.request_rate
+                if check_tokens and self.tokens < tokens:
+                    wait = max(wait, (tokens - self.tokens) / self.token_rate)
+                if wait <= 0:
+                    if check_requests:
+                        self.requests -= 1
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep(wait)
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD方式で同時実行数を調整する
+    成功するたびに上限を少しずつ増やし（上限の件数分成功すると1増える）、
+    レート制限（429）を受けた場合は半分に減らす
+    """
+    def __init__(self, max_limit: int, min_limit: int = 1):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self.decreased_at = 0.0
+        self.condition = LoopLocal(asyncio.Condition)
+        LLM_CONCURRENCY_LIMIT.set(self.limit)
+    
+    async def acquire(self) -> float:
+        """
+        実行枠が空くまで待機する（戻り値は開始時刻で、releaseに渡す）
+        """
+        condition = self.condition.get()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        return time.monotonic()
+    
+    async def release(self, started_at: float, throttled: bool = False) -> None:
+        """
+        実行枠を返し、結果に応じて上限を調整する
+        """
+        condition = self.condition.get()
+        async with condition:
+            self.in_flight -= 1
+            if throttled:
+                # 同時に実行していたリクエストが続けて429を受けても、減らすのは1回のみとする
+                if started_at >= self.decreased_at:
+                    self.limit = max(self.min_limit, self.limit / 2)
+                    self.decreased_at = time.monotonic()
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            LLM_CONCURRENCY_LIMIT.set(self.limit)
+            condition.notify_all()
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """
+    レート制限・クォータ超過（429）のエラーかどうか
+    """
+    from google.api_core.exceptions import ResourceExhausted, TooManyRequests
+    
+    return isinstance(error, (ResourceExhausted, TooManyRequests))
+
+def get_retry_reason(error: Exception) -> str:
+    """
+    再試行するエラーの種類を返す（再試行しないエラーの場合は空文字）
+    """
+    from google.api_core.exceptions import ServerError, DeadlineExceeded
+    
+    if is_rate_limit_error(error):
+        return "rate_limited"
+    if isinstance(error, ServerError):
+        return "server_error"
+    if isinstance(error, (DeadlineExceeded, asyncio.TimeoutError, TimeoutError)):
+        return "timeout"
+    if isinstance(error, ConnectionError) or type(error).__name__ == "ConnectionError":
+        # requestsのConnectionErrorは組み込みのConnectionErrorを継承していない
+        return "connection"
+    return ""
+
+class LLMScheduler:
+    """
+    Gemini APIの呼び出しを、レート制限・同時実行数の調整・再試行を行いながら実行する
+    再試行は指数バックオフ（上限までの範囲でランダムに待つ）で、再試行可能なエラーのみ行う
+    """
+    def __init__(self, rate_limiter: RateLimiter, concurrency: AdaptiveConcurrencyLimiter,
+                 max_retries: int, base_delay: float, max_delay: float):
+        self.rate_limiter = rate_limiter
+        self.concurrency = concurrency
+        self.max_retries = max(0, max_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+    
+    def get_backoff(self, attempt: int) -> float:
+        """
+        attempt回目（0から）の再試行までの待ち時間を返す
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+    
+    async def call(self, prompt: str, backend: str = "gemini",
+                   output_tokens: int = SALES_TEXT_OUTPUT_TOKENS) -> str:
+        """
+        プロンプトから文面を生成する（再試行しても失敗した場合は最後の例外を送出する）
+        """
+        tokens = estimate_tokens(prompt) + output_tokens
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire(tokens)
+            started_at = await self.concurrency.acquire()
+            throttled = False
+            try:
+                return await call_gemini_api_async(prompt, backend)
+            except Exception as e:
+                throttled = is_rate_limit_error(e)
+                reason = get_retry_reason(e)
+                if not reason or attempt >= self.max_retries:
+                    raise
+                error = e
+            finally:
+                await self.concurrency.release(started_at, throttled)
+            
+            delay = self.get_backoff(attempt)
+            attempt += 1
+            LLM_RETRIES.inc(reason=reason)
+            logger.warning("Gemini API呼び出しを%.1f秒後に再試行します（%d回目）: %s", delay, attempt, str(error))
+            await asyncio.sleep(delay)
+
+def estimate_tokens(text: str) -> int:
+    """
+    テキストのトークン数を見積もる（日本語は1文字、英数字は3文字程度で1トークンとみなす）
+    """
+    return max(1, len(text.encode("utf-8")) // 3)
+
+# Gemini APIの呼び出しに共通で使用するスケジューラー
+llm_scheduler = LLMScheduler(
+    RateLimiter(settings.LLM_REQUESTS_PER_MINUTE, settings.LLM_TOKENS_PER_MINUTE,
+                burst=settings.LLM_MAX_CONCURRENCY),
+    AdaptiveConcurrencyLimiter(settings.LLM_MAX_CONCURRENCY, settings.LLM_MIN_CONCURRENCY),
+    max_retries=settings.LLM_MAX_RETRIES,
+    base_delay=settings.LLM_RETRY_BASE_DELAY,
+    max_delay=settings.LLM_RETRY_MAX_DELAY
+)
+
+# 共有のGeminiモデル（TTLが切れるまで再利用する）
+_gemini_model = None
+_gemini_model_expires_at = 0.0
+_gemini_model_lock = threading.Lock()
+
+def discover_model_name() -> str:
+    """
+    利用可能なモデルを確認し、使用するモデル名を決定する
+    """
+    from google.api_core.exceptions import GoogleAPIError
+    
+    model_name = settings.GEMINI_MODEL_NAME  # 基本的なモデル名
+    try:
+        models = configure_gemini().list_models()
+        available_models = [model.name for model in models if 'generateContent' in model.supported_generation_methods]
+        logger.debug("利用可能なモデル: %s", available_models)
+        
+        # 利用可能なモデルから選択
+        if f"models/{model_name}" in available_models:
+            model_name = f"models/{model_name}"
+    except GoogleAPIError as e:
+        logger.warning("モデル一覧の取得に失敗しました。%sを使用します: %s", model_name, str(e))
+    
+    logger.info("使用するモデル: %s", model_name)
+    return model_name
+
+def get_gemini_model():
+    """
+    共有のGeminiモデルを取得する
+    モデルの確認とクライアントの作成はGEMINI_MODEL_TTL秒ごとにのみ行う
+    """
+    global _gemini_model, _gemini_model_expires_at
     
-    # 会社データを使用してテンプレートを埋める
-    for key, value in company_data.items():
-        if value and isinstance(value, (str, int, float)):
-            placeholder = "{" + key + "}"
-            if placeholder in template:
-                template = template.replace(placeholder, str(value))
+    with _gemini_model_lock:
+        if _gemini_model is not None and time.monotonic() < _gemini_model_expires_at:
+            MODEL_DISCOVERY.inc(result="skipped")
+            return _gemini_model
+        
+        MODEL_DISCOVERY.inc(result="called")
+        _gemini_model = configure_gemini().GenerativeModel(discover_model_name())
+        _gemini_model_expires_at = time.monotonic() + settings.GEMINI_MODEL_TTL
+        return _gemini_model
+
+def generate_dummy_sales_text(company_data: Dict[str, Any]) -> str:
+    """
+    ダミーの営業文面を作成する
+    DUMMY_LLM_SEEDを指定した場合は、同じ企業IDに対して常に同じテンプレートを選ぶ
+    """
+    return sample_text_renderer.render_many([company_data], settings.DUMMY_LLM_SEED)[0]
+
+async def generate_dummy_sales_texts(companies: Dict[str, Dict[str, Any]]) -> Dict[str, str]:
+    """
+    複数企業のダミーの営業文面をまとめて作成する（待ち時間は1回分のみ）
+    1件ずつ作成した場合（generate_dummy_sales_text）と同じ文面になる
+    """
+    with LLM_REQUEST_DURATION.time(backend="dummy_batch", outcome="success"):
+        if settings.DUMMY_LLM_LATENCY > 0:
+            await asyncio.sleep(settings.DUMMY_LLM_LATENCY)
+        texts = sample_text_renderer.render_many(companies.values(), settings.DUMMY_LLM_SEED)
+        return dict(zip(companies.keys(), texts))
+
+def call_gemini_api(prompt: str) -> str:
+    """
+    共有のGeminiモデルを使用してプロンプトから文面を生成する（同期処理）
+    """
+    # モデルの確認とクライアントの作成は共有のものを再利用する
+    model = get_gemini_model()
     
-    return template
+    # 再試行はLLMSchedulerで行うため、クライアントライブラリの再試行は無効にする
+    response = model.generate_content(
+        [
+            {"role": "user", "parts": [{"text": "あなたはプロの営業文面作成者です。"}]},
+            {"role": "user", "parts": [{"text": prompt}]}
+        ],
+        request_options={"retry": None, "timeout": settings.LLM_REQUEST_TIMEOUT}
+    )
+    return response.text
+
+async def call_gemini_api_async(prompt: str, backend: str = "gemini") -> str:
+    """
+    Gemini APIを別スレッドで呼び出し、所要時間を記録する
+    """
+    loop = asyncio.get_event_loop()
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        text = await loop.run_in_executor(None, call_gemini_api, prompt)
+        outcome = "success"
+        return text
+    finally:
+        elapsed = time.perf_counter() - start
+        LLM_REQUEST_DURATION.observe(elapsed, backend=backend, outcome=outcome)
+        logger.debug("Gemini API呼び出し（%s）: %.3f秒", backend, elapsed)
+
+def get_prompt_fields(company_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    プロンプトに含める企業情報を抽出する
+    """
+    return {
+        key: value for key, value in company_data.items()
+        if value and key not in EXCLUDED_PROMPT_FIELDS
+    }
+
+def get_sales_text_cache_key(company_data: Dict[str, Any]) -> str:
+    """
+    プロンプトに使用する企業情報とプロンプトのバージョンからキャッシュキーを作成する
+    """
+    return build_cache_key(get_prompt_fields(company_data), PROMPT_VERSION)
 
 # 本番環境ではGemini API、開発環境ではダミーテキストを使用
-async def generate_sales_text(company_data: Dict[str, Any]) -> str:
+async def generate_sales_text(company_data: Dict[str, Any], force: bool = False) -> str:
     """
     企業データに基づいて営業文面を生成する
+    force=Trueの場合はキャッシュを使用せずに再生成する
+    再試行しても生成できなかった場合はSalesTextGenerationErrorを送出する
     """
     # 会社情報のフォーマット
     company_info = ""
-    for key, value in company_data.items():
-        if value and key not in ["id", "status", "salesText"]:
-            company_info += f"{key}: {value}\n"
+    for key, value in get_prompt_fields(company_data).items():
+        company_info += f"{key}: {value}\n"
     
     # プロンプトの作成
     prompt = f"""
@@ -56,47 +409,157 @@ async def generate_sales_text(company_data: Dict[str, Any]) -> str:
     - 営業文面は300文字程度にすること
     """
     
-    try:
-        # 本番環境ではGemini APIを使用
-        if os.getenv("ENVIRONMENT") == "production":
-            # 既存のGemini API呼び出しコード
-            # 非同期処理をシミュレート（Gemini APIは現在直接の非同期サポートがないため）
-            loop = asyncio.get_event_loop()
-            
-            # Gemini APIを使用して文面を生成（同期処理を非同期的に実行）
-            def call_gemini_api():
-                # 利用可能なモデルを確認
-                models = genai.list_models()
-                available_models = [model.name for model in models if 'generateContent' in model.supported_generation_methods]
-                print(f"利用可能なモデル: {available_models}")
-                
-                # 利用可能なモデルから選択
-                model_name = 'gemini-1.5-flash'  # 基本的なモデル名
-                if 'models/gemini-1.5-flash' in available_models:
-                    model_name = 'models/gemini-1.5-flash'
-                elif 'gemini-1.5-flash' in available_models:
-                    model_name = 'gemini-1.5-flash'
-                
-                print(f"使用するモデル: {model_name}")
-                model = genai.GenerativeModel(model_name)
-                
-                response = model.generate_content(
-                    [
-                        {"role": "user", "parts": [{"text": "あなたはプロの営業文面作成者です。"}]},
-                        {"role": "user", "parts": [{"text": prompt}]}
-                    ]
-                )
-                return response.text
-            
-            sales_text = await loop.run_in_executor(None, call_gemini_api)
-            return sales_text
-        else:
-            # 開発環境ではダミーテキストを使用
+    # 本番環境ではGemini APIを使用
+    if os.getenv("ENVIRONMENT") == "production":
+        # Gemini APIは同期処理のため、キャッシュの読み書きと合わせて別スレッドで実行する
+        loop = asyncio.get_event_loop()
+        
+        # 同じ企業情報・プロンプトで生成済みであればキャッシュを使用する
+        cache_key = None
+        if settings.SALES_TEXT_CACHE_ENABLED:
+            cache_key = get_sales_text_cache_key(company_data)
+            if not force:
+                cached_text = await loop.run_in_executor(None, sales_text_cache.get, cache_key)
+                if cached_text is not None:
+                    return cached_text
+        
+        # レート制限・同時実行数の調整・再試行はスケジューラーで行う
+        try:
+            sales_text = await llm_scheduler.call(prompt)
+        except Exception as e:
+            logger.error("Gemini API呼び出しエラー: %s", str(e))
+            raise SalesTextGenerationError(f"営業文面の生成に失敗しました: {str(e)}") from e
+        if cache_key is not None:
+            await loop.run_in_executor(None, sales_text_cache.set, cache_key, sales_text)
+        return sales_text
+    else:
+        # 開発環境ではダミーテキストを使用
+        with LLM_REQUEST_DURATION.time(backend="dummy", outcome="success"):
+            if settings.DUMMY_LLM_LATENCY > 0:
+                await asyncio.sleep(settings.DUMMY_LLM_LATENCY)
             return generate_dummy_sales_text(company_data)
-    except GoogleAPIError as e:
-        print(f"Gemini API呼び出しエラー: {str(e)}")
-        return f"営業文面の生成に失敗しました: {str(e)}"
-    except Exception as e:
-        print(f"LLM呼び出しエラー: {str(e)}")
-        # エラー時はダミーテキストを返す
-        return generate_dummy_sales_text(company_data)
\ No newline at end of file
+
+async def generate_each(companies: Dict[str, Dict[str, Any]], force: bool = False
+                        ) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    企業ごとに営業文面を生成する（戻り値はgenerate_sales_textsと同じ）
+    """
+    texts = await asyncio.gather(*[
+        generate_sales_text(company, force=force) for company in companies.values()
+    ], return_exceptions=True)
+    
+    results, errors = {}, {}
+    for company_id, text in zip(companies.keys(), texts):
+        if isinstance(text, SalesTextGenerationError):
+            errors[company_id] = str(text)
+        elif isinstance(text, BaseException):
+            raise text
+        else:
+            results[company_id] = text
+    return results, errors
+
+async def generate_sales_texts(companies: List[Dict[str, Any]], force: bool = False
+                               ) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    複数企業の営業文面をまとめて生成する
+    戻り値は (企業IDごとの営業文面, 生成に失敗した企業IDごとのエラーメッセージ)
+    本番環境ではLLM_BATCH_SIZE件ずつ1回のリクエストにまとめ、
+    結果が欠けている・不正な企業のみ個別に生成し直す
+    """
+    companies_by_id = {str(company["id"]): company for company in companies}
+    results: Dict[str, str] = {}
+    
+    # 開発環境ではダミーテキストを一括で作成する
+    if os.getenv("ENVIRONMENT") != "production":
+        return await generate_dummy_sales_texts(companies_by_id), {}
+    
+    if settings.LLM_BATCH_SIZE <= 1 or len(companies_by_id) <= 1:
+        return await generate_each(companies_by_id, force=force)
+    
+    loop = asyncio.get_event_loop()
+    cache_keys = {}
+    if settings.SALES_TEXT_CACHE_ENABLED:
+        for company_id, company in companies_by_id.items():
+            cache_keys[company_id] = get_sales_text_cache_key(company)
+            if not force:
+                cached_text = await loop.run_in_executor(None, sales_text_cache.get, cache_keys[company_id])
+                if cached_text is not None:
+                    results[company_id] = cached_text
+    
+    # キャッシュになかった企業をまとめて生成
+    missing_ids = [company_id for company_id in companies_by_id if company_id not in results]
+    for start in range(0, len(missing_ids), settings.LLM_BATCH_SIZE):
+        batch_ids = missing_ids[start:start + settings.LLM_BATCH_SIZE]
+        prompt = build_batch_prompt({company_id: companies_by_id[company_id] for company_id in batch_ids})
+        try:
+            response_text = await llm_scheduler.call(prompt, backend="gemini_batch",
+                                                     output_tokens=SALES_TEXT_OUTPUT_TOKENS * len(batch_ids))
+            batch_results = parse_batch_response(response_text, batch_ids)
+        except Exception as e:
+            logger.warning("一括生成に失敗しました。個別に生成します: %s", str(e))
+            batch_results = {}
+        
+        for company_id, sales_text in batch_results.items():
+            results[company_id] = sales_text
+            if company_id in cache_keys:
+                await loop.run_in_executor(None, sales_text_cache.set, cache_keys[company_id], sales_text)
+    
+    # 一括生成で取得できなかった企業は個別に生成する
+    errors: Dict[str, str] = {}
+    fallback_ids = [company_id for company_id in companies_by_id if company_id not in results]
+    if fallback_ids:
+        logger.info("個別生成にフォールバックします: %d件", len(fallback_ids))
+        fallback_results, errors = await generate_each(
+            {company_id: companies_by_id[company_id] for company_id in fallback_ids}, force=True
+        )
+        results.update(fallback_results)
+    
+    return {company_id: results[company_id] for company_id in companies_by_id if company_id in results}, errors
+
+def build_batch_prompt(companies: Dict[str, Dict[str, Any]]) -> str:
+    """
+    複数企業分の営業文面をJSONで出力させるプロンプトを作成する
+    """
+    company_info = json.dumps(
+        {company_id: get_prompt_fields(company) for company_id, company in companies.items()},
+        ensure_ascii=False, indent=2, default=str
+    )
+    
+    return f"""
+    以下の複数の企業について、それぞれ効果的な営業文面を日本語で作成してください。
+    
+    ## 企業情報（キーは企業ID）
+    {company_info}
+    
+    ## 指示
+    - 丁寧な敬語を使用すること
+    - 企業の業種や規模に合わせた提案をすること
+    - 具体的な価値提案を含めること
+    - 営業文面は1社あたり300文字程度にすること
+    - 企業IDをキー、営業文面を値とするJSONオブジェクトのみを出力すること
+    """
+
+def parse_batch_response(response_text: str, company_ids: List[str]) -> Dict[str, str]:
+    """
+    一括生成の応答を解析し、正しく生成された企業の営業文面のみを返す
+    """
+    text = response_text.strip()
+    # ```json ... ``` で囲まれている場合は中身を取り出す
+    if text.startswith("```"):
+        text = text.split("\n", 1)[1] if "\n" in text else ""
+        text = text.rsplit("```", 1)[0]
+    
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        logger.warning("一括生成の応答がJSONではありません")
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    
+    results = {}
+    for company_id in company_ids:
+        sales_text = data.get(company_id)
+        if isinstance(sales_text, str) and sales_text.strip():
+            results[company_id] = sales_text.strip()
+    return results
@@ -0,0 +1,305 @@
+import uuid
+import asyncio
+import logging
+from typing import Dict, List, Any, Optional, Set, Tuple, AsyncIterator
+
+from config import settings
+from services.llm_service import generate_sales_texts
+from services.store_service import (
+    start_sales_text_run, finish_sales_text_run, get_sales_text_run,
+    save_sales_text_events, get_sales_text_events
+)
+from utils.metrics import ROWS_PROCESSED
+
+logger = logging.getLogger(__name__)
+
+# 生成の終了を表すイベント
+DONE_EVENT = {"status": "done"}
+
+def is_done_event(event: Dict[str, Any]) -> bool:
+    return event.get("status") == "done"
+
+def format_event_id(run_id: str, seq: int) -> str:
+    """
+    SSEのイベントIDを作成する（生成ごとのIDと連番）
+    """
+    return f"{run_id}:{seq}"
+
+def parse_event_id(event_id: Optional[str]) -> Optional[Tuple[str, int]]:
+    """
+    SSEのイベントID（Last-Event-ID）を (生成ごとのID, 連番) に分解する（不正な場合はNone）
+    """
+    if not event_id or ":" not in event_id:
+        return None
+    run_id, seq = event_id.rsplit(":", 1)
+    try:
+        return run_id, int(seq)
+    except ValueError:
+        return None
+
+class SalesTextRun:
+    """
+    1つのリストの営業文面の生成
+    クライアントの接続とは独立して実行し、生成結果などのイベントを連番付きで保存する
+    保存したイベントは再接続時に再送し、接続中のクライアントには同時に配信する
+    """
+    def __init__(self, list_id: str, run_id: str, force: bool = False):
+        self.list_id = list_id
+        self.run_id = run_id
+        self.force = force
+        self.seq = 0
+        self.lock = asyncio.Lock()
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.task: Optional[asyncio.Task] = None
+        # 開始の記録（前回の生成のイベントの破棄）が終わったか
+        self.started = asyncio.Event()
+    
+    async def emit(self, events: List[Dict[str, Any]], persist: bool = True) -> None:
+        """
+        イベントを配信する（persist=Trueの場合は連番を付けて保存してから配信する）
+        保存と配信の順序が連番と一致するよう、1件ずつ順に行う
+        """
+        async with self.lock:
+            if persist:
+                numbered = []
+                for event in events:
+                    self.seq += 1
+                    numbered.append((self.seq, event))
+                loop = asyncio.get_event_loop()
+                await loop.run_in_executor(None, save_sales_text_events, self.list_id, numbered)
+            else:
+                numbered = [(None, event) for event in events]
+            for queue in self.subscribers:
+                for item in numbered:
+                    queue.put_nowait(item)
+    
+    async def run(self) -> None:
+        """
+        リストの会社の営業文面を生成する
+        営業文面が保存済みの会社（force=Trueの場合を除く）はLLMを呼び出さずに保存済みの文面を送る
+        """
+        status = "completed"
+        try:
+            await self.generate()
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        except Exception as e:
+            logger.error("営業文面の生成に失敗しました: %s: %s", self.list_id, str(e))
+            status = "failed"
+            await self.emit([{"error": str(e)}])
+        finally:
+            if status != "cancelled":
+                await self.emit([DONE_EVENT])
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, finish_sales_text_run, self.list_id, self.run_id, status)
+    
+    async def generate(self) -> None:
+        # data_service（pandas）は読み込みに時間がかかるため、生成を開始する時に読み込む
+        from services.data_service import iter_company_data, save_company_sales_texts
+        
+        # LLM_BATCH_SIZE件ずつまとめて生成する（1の場合は1件ずつ）
+        batch_size = max(1, settings.LLM_BATCH_SIZE)
+        worker_count = max(1, settings.LLM_MAX_CONCURRENCY)
+        
+        # 生成待ちの会社を渡すキュー（Noneはワーカーの終了を表す）
+        # 上限を設け、リスト全体をメモリに読み込まないようにする
+        pending: asyncio.Queue = asyncio.Queue(maxsize=worker_count * batch_size * 2)
+        
+        async def feeder():
+            try:
+                # 会社データを保存先から少しずつ読み込む
+                index = 0
+                async for companies in iter_company_data(self.list_id or None):
+                    stored = []
+                    for company in companies:
+                        if company.get("salesText") and not self.force:
+                            # 生成済みの文面はそのまま送る
+                            stored.append({"id": company["id"], "index": index, "text": company["salesText"]})
+                        else:
+                            await pending.put((index, company))
+                        index += 1
+                    if stored:
+                        await self.emit(stored)
+            finally:
+                for _ in range(worker_count):
+                    await pending.put(None)
+        
+        async def worker():
+            finished = False
+            while not finished:
+                item = await pending.get()
+                if item is None:
+                    break
+                batch = [item]
+                while len(batch) < batch_size and not pending.empty():
+                    item = pending.get_nowait()
+                    if item is None:
+                        finished = True
+                        break
+                    batch.append(item)
+                
+                # 進捗状況の通知（保存せず、接続中のクライアントにのみ送る）
+                await self.emit([{
+                    "status": "processing",
+                    "id": company["id"],
+                    "index": index,
+                    "message": f"{company.get('company_name', '不明')}の営業文面を生成中..."
+                } for index, company in batch], persist=False)
+                
+                # 営業文面の生成
+                sales_texts, errors = await generate_sales_texts(
+                    [company for _, company in batch], force=self.force
+                )
+                
+                # 生成結果を保存済みのリストに書き戻す（失敗した企業は保存しない）
+                await save_company_sales_texts(self.list_id, sales_texts)
+                ROWS_PROCESSED.inc(len(sales_texts), stage="sales_text")
+                
+                # 生成結果の送信（失敗した企業はエラーとして通知する）
+                events = []
+                for index, company in batch:
+                    company_id = str(company["id"])
+                    if company_id in sales_texts:
+                        events.append({"id": company["id"], "index": index, "text": sales_texts[company_id]})
+                    else:
+                        events.append({
+                            "status": "error",
+                            "id": company["id"],
+                            "index": index,
+                            "error": errors.get(company_id, "営業文面を生成できませんでした。")
+                        })
+                await self.emit(events)
+        
+        feeder_task = asyncio.create_task(feeder())
+        workers = [asyncio.create_task(worker()) for _ in range(worker_count)]
+        try:
+            # 読み込み・生成中の例外を確認
+            await asyncio.gather(feeder_task, *workers)
+        finally:
+            for task in [feeder_task] + workers:
+                task.cancel()
+
+class SalesTextRunManager:
+    """
+    リストごとの営業文面の生成の管理
+    同じリストの生成は同時に1つのみ実行し、後から接続したクライアントは実行中の生成を購読する
+    """
+    def __init__(self):
+        self.runs: Dict[str, SalesTextRun] = {}
+    
+    async def start(self, list_id: str, force: bool = False) -> SalesTextRun:
+        """
+        営業文面の生成を開始する（実行中の場合はその生成を返す）
+        """
+        run = self.runs.get(list_id)
+        if run is not None:
+            return run
+        
+        run = SalesTextRun(list_id, uuid.uuid4().hex, force)
+        # 開始の記録を待つ間に同じリストの生成を重複して開始しないよう、先に登録する
+        self.runs[list_id] = run
+        try:
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, start_sales_text_run, list_id, run.run_id)
+        except Exception:
+            self._forget(run)
+            raise
+        run.started.set()
+        run.task = asyncio.create_task(run.run())
+        run.task.add_done_callback(lambda _: self._forget(run))
+        return run
+    
+    def _forget(self, run: SalesTextRun) -> None:
+        """
+        終了した生成を実行中の一覧から除く（以降は保存済みのイベントから再送する）
+        """
+        if self.runs.get(run.list_id) is run:
+            del self.runs[run.list_id]
+    
+    async def open(self, list_id: Optional[str], force: bool = False,
+                   last_event_id: Optional[str] = None) -> Tuple[str, AsyncIterator[Tuple[Optional[int], Dict[str, Any]]]]:
+        """
+        営業文面の生成のイベントを購読する
+        last_event_idが現在の生成のイベントを指す場合は、その続きから再送する
+        それ以外の場合は実行中の生成の最初から送る（実行中の生成がない場合は新たに開始する）
+        戻り値は (生成ごとのID, (連番, イベント) の非同期イテレーター)。連番は保存しないイベントではNone
+        """
+        list_id = list_id or ""
+        resume = parse_event_id(last_event_id)
+        after_seq = 0
+        
+        run = self.runs.get(list_id)
+        if resume is not None:
+            run_id, seq = resume
+            if run is not None and run.run_id == run_id:
+                after_seq = seq
+            elif run is None:
+                # 終了した生成は、最後まで記録が残っていれば続きを再送する
+                loop = asyncio.get_event_loop()
+                stored = await loop.run_in_executor(None, get_sales_text_run, list_id)
+                if stored is not None and stored["run_id"] == run_id and stored["status"] != "running":
+                    return run_id, self.replay(list_id, seq)
+        
+        if run is None:
+            run = await self.start(list_id, force)
+        return run.run_id, self.subscribe(run, after_seq)
+    
+    async def replay(self, list_id: str, after_seq: int) -> AsyncIterator[Tuple[Optional[int], Dict[str, Any]]]:
+        """
+        保存済みのイベントを連番の順に再送する
+        イベントの全体を一度に読み込まないよう、SALES_TEXT_REPLAY_BATCH_SIZE件ずつ読み込む
+        """
+        loop = asyncio.get_event_loop()
+        batch_size = max(1, settings.SALES_TEXT_REPLAY_BATCH_SIZE)
+        while True:
+            events = await loop.run_in_executor(None, get_sales_text_events, list_id, after_seq, batch_size)
+            for seq, event in events:
+                after_seq = seq
+                yield seq, event
+            if len(events) < batch_size:
+                return
+    
+    async def subscribe(self, run: SalesTextRun, after_seq: int) -> AsyncIterator[Tuple[Optional[int], Dict[str, Any]]]:
+        """
+        保存済みのイベントを再送した後、実行中の生成のイベントを配信する
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        # 再送中に発生したイベントを取りこぼさないよう、先に購読を開始する
+        run.subscribers.add(queue)
+        try:
+            # 前回の生成のイベントを再送しないよう、開始の記録が終わるまで待つ
+            await run.started.wait()
+            last_seq = after_seq
+            stored = self.replay(run.list_id, after_seq)
+            try:
+                async for seq, event in stored:
+                    last_seq = seq
+                    yield seq, event
+                    if is_done_event(event):
+                        return
+            finally:
+                await stored.aclose()
+            
+            while True:
+                seq, event = await queue.get()
+                if seq is not None and seq <= last_seq:
+                    # 再送済みのイベント
+                    continue
+                yield seq, event
+                if is_done_event(event):
+                    return
+        finally:
+            run.subscribers.discard(queue)
+    
+    async def shutdown(self) -> None:
+        """
+        実行中の生成を中止する
+        """
+        tasks = [run.task for run in self.runs.values() if run.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+# 営業文面の生成の管理（アプリケーション全体で共有）
+sales_text_runs = SalesTextRunManager()
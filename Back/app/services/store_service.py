@@ -0,0 +1,565 @@
+import os
+import time
+import sqlite3
+import threading
+import orjson
+from typing import Dict, List, Any, Optional, Iterable, Iterator, Tuple
+
+from config import settings
+
+# スレッドごとのSQLite接続
+_local = threading.local()
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lists (
+    list_id TEXT PRIMARY KEY,
+    mapping TEXT NOT NULL,
+    row_count INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS list_rows (
+    list_id TEXT NOT NULL,
+    row_index INTEGER NOT NULL,
+    row_id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    sales_text TEXT,
+    PRIMARY KEY (list_id, row_index)
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_list_rows_row_id ON list_rows (list_id, row_id);
+CREATE TABLE IF NOT EXISTS uploads (
+    file_id TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    ext TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    uploaded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_uploads_sha256 ON uploads (sha256, uploaded_at);
+CREATE TABLE IF NOT EXISTS dedup_keys (
+    list_id TEXT NOT NULL,
+    row_id TEXT NOT NULL,
+    row_index INTEGER NOT NULL,
+    key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_dedup_keys_key ON dedup_keys (key, list_id);
+CREATE INDEX IF NOT EXISTS idx_dedup_keys_list_id ON dedup_keys (list_id);
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    file_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    progress REAL NOT NULL DEFAULT 0,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sales_text_runs (
+    list_id TEXT PRIMARY KEY,
+    run_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sales_text_events (
+    list_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (list_id, seq)
+);
+"""
+
+# 既存のデータベースに追加するカラム（テーブル, カラム, 定義）
+MIGRATIONS = [
+    # 再アップロード時に前のバージョンの行と照合するためのキーとフィンガープリント
+    ("list_rows", "row_key", "TEXT"),
+    ("list_rows", "fingerprint", "TEXT"),
+    # 完了したジョブの概要と、ジョブを登録したプロセス（再起動後に中断されたジョブを判定するため）
+    ("jobs", "result", "TEXT"),
+    ("jobs", "owner_pid", "INTEGER"),
+]
+
+# ジョブの状態として更新できる項目
+JOB_FIELDS = ("status", "stage", "progress", "error")
+
+def get_connection() -> sqlite3.Connection:
+    """
+    現在のスレッド用のSQLite接続を取得する（初回のみテーブルを作成）
+    """
+    conn = getattr(_local, "conn", None)
+    # fork後の子プロセスでは親の接続を使い回さない
+    if conn is None or getattr(_local, "pid", None) != os.getpid():
+        os.makedirs(os.path.dirname(settings.LIST_STORE_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(settings.LIST_STORE_PATH, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        _migrate(conn)
+        _local.conn = conn
+        _local.pid = os.getpid()
+    return conn
+
+def _migrate(conn: sqlite3.Connection) -> None:
+    """
+    以前のバージョンで作成したテーブルに不足しているカラムを追加する
+    """
+    for table, column, definition in MIGRATIONS:
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if column not in columns:
+            try:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            except sqlite3.OperationalError:
+                # 他のプロセスが同時に追加した場合
+                pass
+
+def _reset_list(conn: sqlite3.Connection, list_id: str, column_mapping: Dict[str, str]) -> None:
+    """
+    リストを空の状態で登録する（同じIDのリストが既にある場合は行ごと置き換える）
+    """
+    conn.execute("DELETE FROM list_rows WHERE list_id = ?", (list_id,))
+    conn.execute("DELETE FROM dedup_keys WHERE list_id = ?", (list_id,))
+    # 行が変わるため、営業文面の生成の記録も破棄する
+    conn.execute("DELETE FROM sales_text_events WHERE list_id = ?", (list_id,))
+    conn.execute("DELETE FROM sales_text_runs WHERE list_id = ?", (list_id,))
+    conn.execute(
+        "INSERT OR REPLACE INTO lists (list_id, mapping, row_count, created_at) VALUES (?, ?, 0, ?)",
+        (list_id, orjson.dumps(column_mapping).decode("utf-8"), time.time())
+    )
+
+def _insert_rows(conn: sqlite3.Connection, list_id: str, start_index: int,
+                 records: Iterable[Dict[str, Any]],
+                 fingerprints: Optional[List[Tuple[Optional[str], str]]] = None) -> int:
+    """
+    リストに行を追加する（戻り値は追加した行数）
+    fingerprintsには各行の (照合用のキー, フィンガープリント) を指定する
+    前のバージョンから引き継いだ営業文面（salesText）は営業文面のカラムに保存する
+    """
+    rows = []
+    for offset, record in enumerate(records):
+        sales_text = record.get("salesText")
+        if sales_text is not None:
+            record = {key: value for key, value in record.items() if key != "salesText"}
+        row_key, fingerprint = fingerprints[offset] if fingerprints is not None else (None, None)
+        rows.append((list_id, start_index + offset, str(record["id"]), orjson.dumps(record).decode("utf-8"),
+                     sales_text, row_key, fingerprint))
+    conn.executemany(
+        "INSERT INTO list_rows (list_id, row_index, row_id, data, sales_text, row_key, fingerprint) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows
+    )
+    conn.execute(
+        "UPDATE lists SET row_count = row_count + ? WHERE list_id = ?",
+        (len(rows), list_id)
+    )
+    return len(rows)
+
+def create_list(list_id: str, column_mapping: Dict[str, str]) -> None:
+    """
+    リストを登録する（同じIDのリストが既にある場合は行ごと置き換える）
+    """
+    conn = get_connection()
+    with conn:
+        _reset_list(conn, list_id, column_mapping)
+
+def append_rows(list_id: str, start_index: int, records: Iterable[Dict[str, Any]],
+                fingerprints: Optional[List[Tuple[Optional[str], str]]] = None) -> int:
+    """
+    リストに行を追加する（戻り値は追加した行数）
+    """
+    conn = get_connection()
+    with conn:
+        return _insert_rows(conn, list_id, start_index, records, fingerprints)
+
+def save_list(list_id: str, records: List[Dict[str, Any]], column_mapping: Dict[str, str],
+              fingerprints: Optional[List[Tuple[Optional[str], str]]] = None) -> None:
+    """
+    処理済みのリストを保存する
+    同じリストが並行して保存されても混ざらないよう、置き換えを1つのトランザクションで行う
+    """
+    conn = get_connection()
+    with conn:
+        _reset_list(conn, list_id, column_mapping)
+        _insert_rows(conn, list_id, 0, records, fingerprints)
+
+def get_list_info(list_id: str) -> Optional[Dict[str, Any]]:
+    """
+    リストの情報（マッピング・行数）を取得する（存在しない場合はNone）
+    """
+    row = get_connection().execute(
+        "SELECT mapping, row_count, created_at FROM lists WHERE list_id = ?", (list_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    return {
+        "list_id": list_id,
+        "mapping": orjson.loads(row[0]),
+        "row_count": row[1],
+        "created_at": row[2]
+    }
+
+def _to_record(data: str, sales_text: Optional[str], columns: Optional[List[str]]) -> Dict[str, Any]:
+    """
+    保存されている行をレコードに変換する（columnsが指定された場合はそのカラムのみ）
+    """
+    record = orjson.loads(data)
+    if sales_text is not None:
+        record["salesText"] = sales_text
+    if columns is None:
+        return record
+    return {col: record.get(col) for col in columns}
+
+def get_rows(list_id: str, offset: int = 0, limit: Optional[int] = None,
+             columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    リストの行を順番に取得する
+    """
+    cursor = get_connection().execute(
+        "SELECT data, sales_text FROM list_rows WHERE list_id = ? "
+        "ORDER BY row_index LIMIT ? OFFSET ?",
+        (list_id, -1 if limit is None else limit, offset)
+    )
+    return [_to_record(data, sales_text, columns) for data, sales_text in cursor]
+
+def get_row_page(list_id: str, limit: int, offset: int = 0, after_index: Optional[int] = None,
+                 columns: Optional[List[str]] = None) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+    """
+    リストの行を1ページ分取得する
+    after_indexを指定した場合はその行番号より後の行から（OFFSETと異なり読み飛ばす行を走査しない）、
+    それ以外の場合はoffset件目から取得する
+    戻り値は (行, このページの最後の行番号（次のページがない場合はNone）)
+    """
+    # 次のページがあるか確認するため1件多く取得する
+    if after_index is not None:
+        cursor = get_connection().execute(
+            "SELECT row_index, data, sales_text FROM list_rows WHERE list_id = ? AND row_index > ? "
+            "ORDER BY row_index LIMIT ?",
+            (list_id, after_index, limit + 1)
+        )
+    else:
+        cursor = get_connection().execute(
+            "SELECT row_index, data, sales_text FROM list_rows WHERE list_id = ? "
+            "ORDER BY row_index LIMIT ? OFFSET ?",
+            (list_id, limit + 1, offset)
+        )
+    rows = cursor.fetchall()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    last_index = rows[-1][0] if rows and has_more else None
+    return [_to_record(data, sales_text, columns) for _, data, sales_text in rows], last_index
+
+def iter_rows(list_id: str, columns: Optional[List[str]] = None,
+              batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+    """
+    リストの行をbatch_size件ずつ取得する（リスト全体をメモリに載せない）
+    """
+    last_index = -1
+    while True:
+        rows = get_connection().execute(
+            "SELECT row_index, data, sales_text FROM list_rows "
+            "WHERE list_id = ? AND row_index > ? ORDER BY row_index LIMIT ?",
+            (list_id, last_index, batch_size)
+        ).fetchall()
+        if not rows:
+            return
+        last_index = rows[-1][0]
+        yield [_to_record(data, sales_text, columns) for _, data, sales_text in rows]
+
+def get_row_fingerprints(list_id: str) -> List[Tuple[str, Optional[str], Optional[str], Optional[str], Optional[Dict[str, Any]]]]:
+    """
+    前のバージョンとの照合用に、リストの各行の (行ID, キー, フィンガープリント, 営業文面, データ) を行の順に取得する
+    データはフィンガープリントを保存していない行（カラムの追加前に保存した行）のみ返す
+    """
+    cursor = get_connection().execute(
+        "SELECT row_id, row_key, fingerprint, sales_text, CASE WHEN fingerprint IS NULL THEN data END "
+        "FROM list_rows WHERE list_id = ? ORDER BY row_index",
+        (list_id,)
+    )
+    return [
+        (row_id, row_key, fingerprint, sales_text, orjson.loads(data) if data is not None else None)
+        for row_id, row_key, fingerprint, sales_text, data in cursor
+    ]
+
+def save_sales_texts(list_id: str, sales_texts: Dict[str, str]) -> None:
+    """
+    生成した営業文面を行ごとに保存する（キーは行ID）
+    """
+    conn = get_connection()
+    with conn:
+        conn.executemany(
+            "UPDATE list_rows SET sales_text = ? WHERE list_id = ? AND row_id = ?",
+            [(text, list_id, row_id) for row_id, text in sales_texts.items()]
+        )
+
+def save_dedup_keys(list_id: str, key_rows: Iterable[Tuple[str, int, str]]) -> None:
+    """
+    重複判定用のキーを保存する（key_rowsは (行ID, リスト内の行番号, "種類:値") の一覧）
+    """
+    # インデックスの更新が連続するよう、キーの順に挿入する
+    rows = sorted(((list_id, row_id, row_index, key) for row_id, row_index, key in key_rows),
+                  key=lambda row: row[3])
+    conn = get_connection()
+    with conn:
+        conn.executemany(
+            "INSERT INTO dedup_keys (list_id, row_id, row_index, key) VALUES (?, ?, ?, ?)",
+            rows
+        )
+
+def find_dedup_matches(list_id: str, keys: List[str], start_index: int = 0,
+                       cross_list: bool = False) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    保存済みのキー（"種類:値"）と照合する
+    同じリストはstart_indexより前の行（前のチャンク）のみを対象とする
+    戻り値は (同じリストで一致した行ID, 他のリストで一致したリストID)。いずれもキーごと
+    """
+    previous: Dict[str, str] = {}
+    other_lists: Dict[str, str] = {}
+    if not keys or (start_index <= 0 and not cross_list):
+        return previous, other_lists
+    
+    conn = get_connection()
+    with conn:
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS dedup_lookup (key TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM dedup_lookup")
+        conn.executemany("INSERT OR IGNORE INTO dedup_lookup (key) VALUES (?)", ((key,) for key in sorted(keys)))
+        
+        # 同じリストの前のチャンクで最初に現れた行
+        if start_index > 0:
+            previous = {
+                key: row_id for key, row_id, _ in conn.execute(
+                    "SELECT l.key, k.row_id, MIN(k.row_index) FROM dedup_lookup l "
+                    "JOIN dedup_keys k ON k.key = l.key AND k.list_id = ? AND k.row_index < ? "
+                    "GROUP BY l.key",
+                    (list_id, start_index)
+                )
+            }
+        
+        # 他のリストのうち最初に保存されたもの
+        if cross_list:
+            other_lists = {
+                key: matched_list_id for key, matched_list_id, _ in conn.execute(
+                    "SELECT l.key, k.list_id, MIN(k.rowid) FROM dedup_lookup l "
+                    "JOIN dedup_keys k ON k.key = l.key AND k.list_id != ? GROUP BY l.key",
+                    (list_id,)
+                )
+            }
+        conn.execute("DELETE FROM dedup_lookup")
+    return previous, other_lists
+
+def register_upload(file_id: str, path: str, file_name: str, ext: str, size: int, sha256: str) -> None:
+    """
+    アップロードされたファイルを登録する
+    """
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO uploads (file_id, path, file_name, ext, size, sha256, uploaded_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (file_id, path, file_name, ext, size, sha256, time.time())
+        )
+
+def get_upload(file_id: str) -> Optional[Dict[str, Any]]:
+    """
+    ファイルIDから登録済みのアップロード情報を取得する（未登録の場合はNone）
+    """
+    row = get_connection().execute(
+        "SELECT path, file_name, ext, size, sha256, uploaded_at FROM uploads WHERE file_id = ?",
+        (file_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    return {
+        "file_id": file_id,
+        "path": row[0],
+        "file_name": row[1],
+        "ext": row[2],
+        "size": row[3],
+        "sha256": row[4],
+        "uploaded_at": row[5]
+    }
+
+def find_upload_by_hash(sha256: str, exclude_file_id: Optional[str] = None) -> Optional[str]:
+    """
+    同じ内容で最初にアップロードされたファイルのIDを取得する（ない場合はNone）
+    """
+    row = get_connection().execute(
+        "SELECT file_id FROM uploads WHERE sha256 = ? AND file_id != ? ORDER BY uploaded_at LIMIT 1",
+        (sha256, exclude_file_id or "")
+    ).fetchone()
+    return row[0] if row else None
+
+def create_job(job_id: str, file_id: str) -> None:
+    """
+    ジョブを待機中として登録する（登録したプロセスのPIDを記録する）
+    """
+    now = time.time()
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "INSERT INTO jobs (job_id, file_id, status, owner_pid, created_at, updated_at) "
+            "VALUES (?, ?, 'queued', ?, ?, ?)",
+            (job_id, file_id, os.getpid(), now, now)
+        )
+
+def update_job(job_id: str, **fields: Any) -> None:
+    """
+    ジョブの状態（status・stage・progress・error）を更新する
+    """
+    names = [name for name in fields if name in JOB_FIELDS]
+    if not names:
+        return
+    assignments = ", ".join(f"{name} = ?" for name in names)
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            f"UPDATE jobs SET {assignments}, updated_at = ? WHERE job_id = ?",
+            [fields[name] for name in names] + [time.time(), job_id]
+        )
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    ジョブの状態を取得する（存在しない場合はNone）
+    """
+    row = get_connection().execute(
+        "SELECT file_id, status, stage, progress, error, cancel_requested, created_at, updated_at "
+        "FROM jobs WHERE job_id = ?",
+        (job_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    return {
+        "job_id": job_id,
+        "file_id": row[0],
+        "status": row[1],
+        "stage": row[2],
+        "progress": row[3],
+        "error": row[4],
+        "cancel_requested": bool(row[5]),
+        "created_at": row[6],
+        "updated_at": row[7]
+    }
+
+def complete_job(job_id: str, result: Dict[str, Any]) -> None:
+    """
+    ジョブを完了とし、処理結果の概要を保存する（プロセスの再起動後や他のワーカーからも取得できるようにする）
+    """
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "UPDATE jobs SET status = 'completed', stage = 'completed', progress = 1.0, result = ?, updated_at = ? "
+            "WHERE job_id = ?",
+            (orjson.dumps(result).decode("utf-8"), time.time(), job_id)
+        )
+
+def get_job_result(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    完了したジョブの処理結果の概要を取得する（完了していない場合はNone）
+    """
+    row = get_connection().execute(
+        "SELECT result FROM jobs WHERE job_id = ? AND status = 'completed'",
+        (job_id,)
+    ).fetchone()
+    if row is None or row[0] is None:
+        return None
+    return orjson.loads(row[0])
+
+def get_active_job_owners() -> List[Optional[int]]:
+    """
+    待機中・実行中のジョブを登録したプロセスのPIDの一覧を取得する（記録されていないジョブはNone）
+    """
+    return [row[0] for row in get_connection().execute(
+        "SELECT DISTINCT owner_pid FROM jobs WHERE status IN ('queued', 'running')"
+    )]
+
+def fail_active_jobs(owner_pids: List[Optional[int]], error: str) -> int:
+    """
+    指定したプロセスが登録した待機中・実行中のジョブを失敗とする（Noneは登録したプロセスが不明なジョブ）
+    戻り値は更新したジョブ数
+    """
+    conn = get_connection()
+    count = 0
+    with conn:
+        for owner_pid in owner_pids:
+            count += conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? "
+                "WHERE status IN ('queued', 'running') AND owner_pid IS ?",
+                (error, time.time(), owner_pid)
+            ).rowcount
+    return count
+
+def request_job_cancel(job_id: str) -> None:
+    """
+    実行中のジョブに中止を要求する（ジョブは次の段階に進む前に中止する）
+    """
+    conn = get_connection()
+    with conn:
+        conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE job_id = ?", (job_id,))
+
+def delete_jobs_before(timestamp: float) -> None:
+    """
+    指定時刻より前に終了したジョブを削除する
+    """
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "DELETE FROM jobs WHERE status IN ('completed', 'failed', 'cancelled') AND updated_at < ?",
+            (timestamp,)
+        )
+
+def start_sales_text_run(list_id: str, run_id: str) -> None:
+    """
+    営業文面の生成を開始したことを記録する（前回の生成のイベントは破棄する）
+    """
+    now = time.time()
+    conn = get_connection()
+    with conn:
+        conn.execute("DELETE FROM sales_text_events WHERE list_id = ?", (list_id,))
+        conn.execute(
+            "INSERT OR REPLACE INTO sales_text_runs (list_id, run_id, status, created_at, updated_at) "
+            "VALUES (?, ?, 'running', ?, ?)",
+            (list_id, run_id, now, now)
+        )
+
+def finish_sales_text_run(list_id: str, run_id: str, status: str) -> None:
+    """
+    営業文面の生成の終了を記録する
+    """
+    conn = get_connection()
+    with conn:
+        conn.execute(
+            "UPDATE sales_text_runs SET status = ?, updated_at = ? WHERE list_id = ? AND run_id = ?",
+            (status, time.time(), list_id, run_id)
+        )
+
+def get_sales_text_run(list_id: str) -> Optional[Dict[str, Any]]:
+    """
+    リストの最後の営業文面の生成の状態を取得する（ない場合はNone）
+    """
+    row = get_connection().execute(
+        "SELECT run_id, status, created_at, updated_at FROM sales_text_runs WHERE list_id = ?",
+        (list_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    return {"list_id": list_id, "run_id": row[0], "status": row[1], "created_at": row[2], "updated_at": row[3]}
+
+def save_sales_text_events(list_id: str, events: Iterable[Tuple[int, Dict[str, Any]]]) -> None:
+    """
+    営業文面の生成のイベントを連番とともに保存する
+    """
+    conn = get_connection()
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO sales_text_events (list_id, seq, data) VALUES (?, ?, ?)",
+            [(list_id, seq, orjson.dumps(event).decode("utf-8")) for seq, event in events]
+        )
+
+def get_sales_text_events(list_id: str, after_seq: int = 0, limit: int = -1) -> List[Tuple[int, Dict[str, Any]]]:
+    """
+    保存済みのイベントのうち、連番がafter_seqより後のものを順に最大limit件取得する（負の場合は全て）
+    """
+    cursor = get_connection().execute(
+        "SELECT seq, data FROM sales_text_events WHERE list_id = ? AND seq > ? ORDER BY seq LIMIT ?",
+        (list_id, after_seq, limit)
+    )
+    return [(seq, orjson.loads(data)) for seq, data in cursor]
@@ -0,0 +1,203 @@
+import re
+import json
+import hashlib
+import difflib
+import threading
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Optional, Iterable, Tuple
+
+from config import settings
+
+# 変換後のカラム名と、それに対応する元のカラム名（同義語）
+DEFAULT_SYNONYMS: Dict[str, List[str]] = {
+    "company_name": ["会社名", "企業名", "社名", "会社", "企業", "法人名", "商号", "取引先名",
+                     "company", "company name", "corporate name", "organization"],
+    "industry": ["業種", "業界", "業態", "業種名", "industry", "sector"],
+    "contact_person": ["担当者", "担当者名", "担当", "担当者氏名", "contact", "contact person", "contact name"],
+    "email": ["メールアドレス", "メール", "eメール", "email", "e-mail", "mail", "email address", "mail address"],
+    "phone": ["電話番号", "電話", "代表電話", "TEL", "phone", "phone number", "telephone"],
+    "address": ["住所", "所在地", "本社所在地", "address"],
+    "url": ["URL", "ウェブサイト", "webサイト", "ホームページ", "HP", "website", "web site", "homepage"],
+    "employee_count": ["従業員数", "社員数", "従業員", "employees", "employee count", "number of employees"],
+    "revenue": ["売上", "売上高", "年商", "売上金額", "revenue", "sales", "annual revenue"],
+    "established_year": ["設立年", "設立", "創業年", "設立年月", "設立日", "創業",
+                         "established", "founded", "year founded"],
+}
+
+# 括弧で囲まれた補足（例: 「会社名（正式）」の「（正式）」）
+BRACKETS_PATTERN = re.compile(r"[\(\[【〔<].*?[\)\]】〕>]")
+# 比較時に無視する記号・空白
+SEPARATORS_PATTERN = re.compile(r"[\s_\-・/:：.]+")
+# 英数字以外（英語の単語単位での部分一致に使用）
+NON_ALNUM_PATTERN = re.compile(r"[^0-9a-z]+")
+
+# 部分一致に使用する同義語の最小の長さ（「会社」「電話」などの短い語は「会社概要」「電話対応履歴」のような
+# 別の意味のカラム名にも含まれるため、完全一致・あいまい一致のみに使用する）
+MIN_PARTIAL_MATCH_LENGTH = 3
+
+# 別の会社・以前の値などを表す接頭辞。これで始まるカラム名は部分一致・あいまい一致させない
+# （例: 「親会社名」「取引先会社名」「parent company」を company_name に、「前担当者」を contact_person にしない）
+EXCLUDED_PREFIXES = ("親", "子", "関連", "関係", "グループ", "取引先", "仕入先", "販売先", "紹介元", "前", "旧")
+EXCLUDED_ENGLISH_PREFIXES = {"parent", "subsidiary", "affiliate", "affiliated", "group", "former", "previous",
+                             "partner", "supplier", "client", "customer"}
+
+# あいまい一致とみなす長さの差の上限
+MAX_FUZZY_LENGTH_DIFF = 2
+
+# 変換結果をメモ化するカラム名の上限（超えた場合は古いものから削除する）
+MAX_CACHE_SIZE = 10000
+
+# スネークケースへの一般的な変換に使用する正規表現
+CAMEL_WORD_PATTERN = re.compile(r"(.)([A-Z][a-z]+)")
+CAMEL_BOUNDARY_PATTERN = re.compile(r"([a-z0-9])([A-Z])")
+NON_WORD_PATTERN = re.compile(r"[^\w]")
+UNDERSCORES_PATTERN = re.compile(r"_+")
+
+def normalize_header(text: str) -> str:
+    """
+    比較用にカラム名を正規化する（NFKC・大文字小文字の統一・括弧内と記号の除去）
+    """
+    text = unicodedata.normalize("NFKC", str(text)).casefold()
+    text = BRACKETS_PATTERN.sub("", text)
+    return SEPARATORS_PATTERN.sub("", text)
+
+def generic_snake_case(text: str) -> str:
+    """
+    辞書にないカラム名を一般的なルールでスネークケースに変換する
+    """
+    s1 = CAMEL_WORD_PATTERN.sub(r"\1_\2", text)
+    s2 = CAMEL_BOUNDARY_PATTERN.sub(r"\1_\2", s1).lower()
+    # 空白やその他の文字を_に置換
+    s3 = NON_WORD_PATTERN.sub("_", s2)
+    # 連続する_を単一の_に置換し、先頭と末尾の_を削除
+    return UNDERSCORES_PATTERN.sub("_", s3).strip("_")
+
+class ColumnMapper:
+    """
+    カラム名を英語のスネークケースに変換する
+    完全一致 → 部分一致（末尾の語） → あいまい一致 → 一般的な変換 の順に判定し、結果はメモ化する
+    """
+    def __init__(self, synonyms: Dict[str, List[str]], fuzzy_cutoff: float = 0.85):
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.exact: Dict[str, str] = {}
+        self.japanese: List[tuple] = []
+        self.english: List[tuple] = []
+        for name, words in synonyms.items():
+            for word in [name] + list(words):
+                key = normalize_header(word)
+                if not key:
+                    continue
+                self.exact.setdefault(key, name)
+                if len(key) < MIN_PARTIAL_MATCH_LENGTH:
+                    continue
+                if key.isascii():
+                    # 英語は単語単位で、末尾の語のみ部分一致させる（例: "hotel" が "tel" に、
+                    # "Sales Rep" が "sales" に一致しないように）
+                    spaced = NON_ALNUM_PATTERN.sub(" ", unicodedata.normalize("NFKC", word).casefold()).strip()
+                    pattern = re.compile(r"(?:^| )" + re.escape(spaced) + r"$")
+                    self.english.append((pattern, len(spaced), name))
+                else:
+                    self.japanese.append((key, name))
+        self.exact_keys = list(self.exact.keys())
+        # 同義語辞書・しきい値の識別子（解析済みキャッシュのキーに使用する）
+        self.signature = hashlib.sha256(json.dumps(
+            [synonyms, fuzzy_cutoff], ensure_ascii=False, sort_keys=True
+        ).encode("utf-8")).hexdigest()[:16]
+        # カラム名 → (変換後の名前, 完全一致または一般的な変換か)
+        # ファイルの処理は複数のスレッドで行われるため、追加・削除はロックして行う
+        self.cache: Dict[str, Tuple[str, bool]] = {}
+        self.cache_lock = threading.Lock()
+    
+    def to_snake_case(self, text) -> str:
+        """
+        カラム名を変換する
+        """
+        return self.resolve(text)[0]
+    
+    def resolve(self, text) -> Tuple[str, bool]:
+        """
+        カラム名を変換し、(変換後の名前, 完全一致または一般的な変換か) を返す
+        部分一致・あいまい一致の場合はFalse（map_columnsで完全一致の列を優先するために使用する）
+        """
+        text = str(text)
+        result = self.cache.get(text)
+        if result is None:
+            key = normalize_header(text)
+            if key in self.exact:
+                result = (self.exact[key], True)
+            else:
+                name = self._match_partial(text, key)
+                result = (name, False) if name else (generic_snake_case(text), True)
+            with self.cache_lock:
+                if text not in self.cache and len(self.cache) >= MAX_CACHE_SIZE:
+                    self.cache.pop(next(iter(self.cache)))
+                self.cache[text] = result
+        return result
+    
+    def _match_partial(self, text: str, key: str) -> Optional[str]:
+        """
+        同義語辞書と部分一致・あいまい一致で照合する（一致しない場合はNone）
+        別の会社などを表す接頭辞（EXCLUDED_PREFIXES）で始まるカラム名は照合しない
+        """
+        if not key:
+            return None
+        
+        spaced = NON_ALNUM_PATTERN.sub(" ", unicodedata.normalize("NFKC", text).casefold()).strip()
+        if key.startswith(EXCLUDED_PREFIXES) or spaced.split(" ", 1)[0] in EXCLUDED_ENGLISH_PREFIXES:
+            return None
+        
+        # 部分一致（末尾が同義語と一致するもの。長い語を優先。例: 「代表者メールアドレス」）
+        japanese = [(len(word), name) for word, name in self.japanese if key.endswith(word)]
+        if japanese:
+            return max(japanese)[1]
+        
+        english = [(length, name) for pattern, length, name in self.english if pattern.search(spaced)]
+        if english:
+            return max(english)[1]
+        
+        # あいまい一致（表記ゆれ・タイプミス）
+        # 長さが大きく異なるもの（例: "organizationtype" と "organization"）は別の語を含むだけのため除く
+        for match in difflib.get_close_matches(key, self.exact_keys, n=3, cutoff=self.fuzzy_cutoff):
+            if abs(len(match) - len(key)) <= MAX_FUZZY_LENGTH_DIFF:
+                return self.exact[match]
+        return None
+    
+    def map_columns(self, columns: Iterable) -> List[str]:
+        """
+        カラム名の一覧を変換する（変換後の名前が重複する場合は _2, _3 ... を付ける）
+        完全一致の列が先に名前を取り、部分一致・あいまい一致の列は重複する場合に番号を付ける
+        （例: 「メール送信日」より「メールアドレス」を email とする）
+        """
+        resolved = [self.resolve(col) for col in columns]
+        names: List[Optional[str]] = [None] * len(resolved)
+        seen: Dict[str, int] = {}
+        for exact in (True, False):
+            for index, (name, is_exact) in enumerate(resolved):
+                if is_exact != exact:
+                    continue
+                if name in seen:
+                    seen[name] += 1
+                    name = f"{name}_{seen[name]}"
+                else:
+                    seen[name] = 1
+                names[index] = name
+        return names
+
+def load_synonyms(path: str = "") -> Dict[str, List[str]]:
+    """
+    既定の同義語辞書に、設定ファイル（JSON: {"変換後の名前": ["同義語", ...]}）の内容を追加する
+    """
+    synonyms = {name: list(words) for name, words in DEFAULT_SYNONYMS.items()}
+    if path:
+        with open(path, encoding="utf-8") as f:
+            for name, words in json.load(f).items():
+                synonyms.setdefault(name, []).extend(words)
+    return synonyms
+
+@lru_cache(maxsize=1)
+def get_column_mapper() -> ColumnMapper:
+    """
+    アプリケーション全体で共有するColumnMapperを取得する
+    """
+    return ColumnMapper(load_synonyms(settings.COLUMN_SYNONYMS_PATH), settings.COLUMN_FUZZY_CUTOFF)
@@ -0,0 +1,128 @@
+import re
+import codecs
+import logging
+import unicodedata
+from typing import List, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# BOMと対応するエンコーディング（長いものから判定する）
+BOMS = [
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+# ASCII以外のバイト
+NON_ASCII_PATTERN = re.compile(rb"[\x80-\xff]")
+
+# ASCII以外のバイトを探す範囲（サンプルサイズの倍数）。これを超えてASCIIのみの場合はASCIIのみのファイルとみなす
+MAX_SCAN_FACTOR = 16
+
+def score_text(text: str) -> float:
+    """
+    日本語の文章としての自然さを0〜1で評価する
+    ASCII以外の文字のうち、ひらがな・全角カタカナ・漢字・全角記号の割合
+    （誤ったエンコーディングで読むと、半角カナや外字・記号が多く混ざる）
+    """
+    total = 0
+    natural = 0
+    for char in text:
+        if char < "\x80":
+            continue
+        total += 1
+        if "぀" <= char <= "ヿ" or "一" <= char <= "鿿" or "　" <= char <= "〿" \
+                or "！" <= char <= "～":
+            natural += 1
+        elif unicodedata.category(char) in ("Co", "Cn", "Cc"):
+            # 私用領域・未定義の文字は大きく減点する
+            natural -= 1
+    return natural / total if total else 1.0
+
+def decode_sample(sample: bytes, encoding: str, truncated: bool) -> Optional[str]:
+    """
+    サンプルを指定したエンコーディングで復号する（復号できない場合はNone）
+    サンプルの途中で切れた末尾のマルチバイト文字は無視する
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    try:
+        return decoder.decode(sample, final=not truncated)
+    except UnicodeDecodeError:
+        return None
+
+def read_sample(file_path: str, sample_size: int) -> Tuple[bytes, bool]:
+    """
+    判定に使用するサンプルを読み込む
+    先頭からASCIIのみの部分は判定の手がかりにならないため、最初のASCII以外のバイトから
+    sample_sizeバイトを取り出す（マルチバイト文字の1バイト目はASCII以外のため、文字の途中からにはならない）
+    ASCII以外のバイトは先頭のsample_size * MAX_SCAN_FACTORバイトの範囲のみ探し、見つからない場合は空のサンプルを返す
+    （読み込むのは最大でもその範囲とsample_sizeバイトまで）
+    戻り値は (サンプル, ファイルの途中で切れているか)
+    """
+    with open(file_path, "rb") as f:
+        head = f.read(sample_size * MAX_SCAN_FACTOR)
+        match = NON_ASCII_PATTERN.search(head)
+        if match is None:
+            return b"", False
+        end = match.start() + sample_size
+        sample = head[match.start():end]
+        if len(sample) < sample_size:
+            sample += f.read(sample_size - len(sample))
+        truncated = end < len(head) or bool(f.read(1))
+        return sample, truncated
+
+def detect_encoding(file_path: str, candidates: Optional[List[str]] = None,
+                    sample_size: Optional[int] = None) -> str:
+    """
+    テキストファイルのエンコーディングを判定する
+    BOMがあればBOMに従い、なければ先頭付近のサンプルを候補（既定はCSV_ENCODINGS）の順に試しに復号する
+    UTF-8として復号できる場合はUTF-8とし、それ以外で複数の候補が復号できる場合は日本語としての自然さで選ぶ
+    いずれでも復号できない場合は最初の候補を返す（読み込み時にエラーとなる）
+    """
+    candidates = candidates or settings.CSV_ENCODINGS
+    sample_size = sample_size or settings.ENCODING_SAMPLE_SIZE
+    
+    with open(file_path, "rb") as f:
+        head = f.read(4)
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    
+    sample, truncated = read_sample(file_path, sample_size)
+    if not sample:
+        # ASCIIのみのファイル（先頭の範囲がASCIIのみの場合を含む）
+        # 範囲より後にASCII以外の文字があり復号できない場合は、読み込み時に次の候補で読み直す（next_encoding を参照）
+        return candidates[0]
+    
+    best_encoding = None
+    best_score = None
+    for encoding in candidates:
+        text = decode_sample(sample, encoding, truncated)
+        if text is None:
+            continue
+        if codecs.lookup(encoding).name == "utf-8":
+            # 日本語の文章がUTF-8として偶然復号できることはまずないため、そのまま採用する
+            return encoding
+        score = score_text(text)
+        if best_score is None or score > best_score:
+            best_encoding, best_score = encoding, score
+    
+    if best_encoding is None:
+        logger.warning("エンコーディングを判定できませんでした: %s", file_path)
+        return candidates[0]
+    return best_encoding
+
+def next_encoding(encoding: str, candidates: Optional[List[str]] = None) -> Optional[str]:
+    """
+    判定したエンコーディングで復号できなかった場合に試す次の候補を返す（候補がない場合はNone）
+    先頭の範囲がASCIIのみで、それより後に判定した候補で復号できない文字がある場合に使用する
+    """
+    candidates = candidates or settings.CSV_ENCODINGS
+    names = [codecs.lookup(candidate).name for candidate in candidates]
+    name = codecs.lookup(encoding).name
+    if name not in names:
+        return None
+    index = names.index(name) + 1
+    return candidates[index] if index < len(candidates) else None
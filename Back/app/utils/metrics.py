@@ -0,0 +1,222 @@
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Tuple, Iterator, Sequence
+
+logger = logging.getLogger(__name__)
+
+# 所要時間のヒストグラムの既定の区切り（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Prometheusのテキスト形式のContent-Type
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def escape_label_value(value: str) -> str:
+    """
+    ラベルの値をテキスト形式用にエスケープする
+    """
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    """
+    ラベルを {name="value",...} の形式にする（ラベルがない場合は空文字）
+    """
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label_value(value)}"' for name, value in zip(names, values)) + "}"
+
+def format_value(value: float) -> str:
+    """
+    値をテキスト形式の数値にする
+    """
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+class Metric:
+    """
+    ラベルごとに値を保持するメトリクスの基底クラス
+    """
+    kind = "untyped"
+    
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.values: Dict[Tuple[str, ...], Any] = {}
+        self.lock = threading.Lock()
+    
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name}のラベルが不正です: {sorted(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+    
+    def samples(self) -> List[Tuple[str, str, float]]:
+        """
+        出力する値の一覧（名前, ラベル, 値）を返す
+        """
+        with self.lock:
+            return [(self.name, format_labels(self.label_names, key), value)
+                    for key, value in sorted(self.values.items())]
+    
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{name}{labels} {format_value(value)}" for name, labels, value in self.samples())
+        return lines
+
+class Counter(Metric):
+    """
+    増加のみするメトリクス（処理件数・キャッシュのヒット数など）
+    """
+    kind = "counter"
+    
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+class Gauge(Metric):
+    """
+    増減するメトリクス（処理中のストリーム数など）
+    """
+    kind = "gauge"
+    
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+    
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+    
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+    
+    @contextmanager
+    def track_inprogress(self, **labels) -> Iterator[None]:
+        """
+        ブロックを実行している間だけ値を1増やす
+        """
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+class Histogram(Metric):
+    """
+    値の分布を区切りごとの件数で保持するメトリクス（所要時間など）
+    """
+    kind = "histogram"
+    
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+    
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                # 区切りごとの件数（累積ではない）・合計・件数
+                state = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+    
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """
+        ブロックの所要時間（秒）を記録する
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+    
+    def samples(self) -> List[Tuple[str, str, float]]:
+        names = self.label_names + ("le",)
+        result = []
+        with self.lock:
+            for key, (counts, total, count) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    result.append((f"{self.name}_bucket", format_labels(names, key + (format_value(bound),)),
+                                   cumulative))
+                labels = format_labels(self.label_names, key)
+                result.append((f"{self.name}_sum", labels, total))
+                result.append((f"{self.name}_count", labels, count))
+        return result
+
+class Registry:
+    """
+    メトリクスをまとめ、Prometheusのテキスト形式で出力する
+    """
+    def __init__(self):
+        self.metrics: List[Metric] = []
+    
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+    
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# アプリケーション全体で共有するメトリクス
+# ジョブとして別プロセスで実行した処理の値は含まれない
+registry = Registry()
+
+ROWS_PROCESSED = registry.register(Counter(
+    "leadagent_rows_processed_total", "処理した行数", ["stage"]))
+STAGE_DURATION = registry.register(Histogram(
+    "leadagent_stage_duration_seconds", "処理の段階ごとの所要時間（秒）", ["stage"]))
+LLM_REQUEST_DURATION = registry.register(Histogram(
+    "leadagent_llm_request_duration_seconds", "営業文面の生成1回あたりの所要時間（秒）", ["backend", "outcome"]))
+CACHE_REQUESTS = registry.register(Counter(
+    "leadagent_cache_requests_total", "キャッシュの参照回数", ["cache", "result"]))
+MODEL_DISCOVERY = registry.register(Counter(
+    "leadagent_model_discovery_total", "Geminiモデルの確認回数（skippedは共有モデルを再利用した回数）", ["result"]))
+LLM_RETRIES = registry.register(Counter(
+    "leadagent_llm_retries_total", "Gemini API呼び出しの再試行回数", ["reason"]))
+LLM_CONCURRENCY_LIMIT = registry.register(Gauge(
+    "leadagent_llm_concurrency_limit", "Gemini APIの同時呼び出し数の現在の上限"))
+STREAMS_IN_FLIGHT = registry.register(Gauge(
+    "leadagent_streams_in_flight", "送信中のストリーミングレスポンス数", ["kind"]))
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """
+    処理の段階の所要時間を記録し、DEBUGレベルでログに出力する
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_DURATION.observe(elapsed, stage=stage)
+        logger.debug("%s: %.3f秒", stage, elapsed)
+
+def render_metrics() -> str:
+    """
+    全てのメトリクスをPrometheusのテキスト形式で出力する
+    """
+    return registry.render()
+
+def track_stream(chunks: Iterator[bytes], kind: str) -> Iterator[bytes]:
+    """
+    ストリーミングレスポンスを送信している間、送信中のストリーム数に含める
+    """
+    with STREAMS_IN_FLIGHT.track_inprogress(kind=kind):
+        yield from chunks
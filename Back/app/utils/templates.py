@@ -0,0 +1,109 @@
+import math
+import random
+import zlib
+from string import Formatter
+from typing import Dict, List, Any, Iterable, Optional, Sequence, Tuple
+
+class CompiledTemplate:
+    """
+    {field}形式のテンプレートを事前に解析したもの
+    描画時は固定の文字列と値を連結するのみで、テンプレートの走査・置換は行わない
+    """
+    def __init__(self, template: str):
+        self.template = template
+        # (直前の固定文字列, フィールド名) の一覧（末尾の固定文字列はフィールド名がNone）
+        self.parts: List[Tuple[str, Optional[str]]] = [
+            (literal, field_name) for literal, field_name, _, _ in Formatter().parse(template)
+        ]
+        self.fields = [field_name for _, field_name in self.parts if field_name]
+    
+    def render(self, values: Dict[str, str]) -> str:
+        """
+        フィールドの値（文字列）を埋め込む（valuesに全てのフィールドが含まれている必要がある）
+        """
+        return "".join(literal + values[field_name] if field_name else literal
+                       for literal, field_name in self.parts)
+
+def format_field_value(value: Any) -> Optional[str]:
+    """
+    埋め込む値を文字列にする（空の値・NaN・文字列と数値以外はNone）
+    """
+    if not value or not isinstance(value, (str, int, float)):
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return str(value)
+
+class TemplateRenderer:
+    """
+    複数のテンプレートから1つを選んで描画する
+    値がないフィールドはdefaults（含まれない場合は空文字）で埋め、{field}が残らないようにする
+    """
+    def __init__(self, templates: Sequence[str], defaults: Optional[Dict[str, str]] = None):
+        self.templates = [CompiledTemplate(template) for template in templates]
+        self.defaults = dict(defaults or {})
+        self.fields = sorted({field for template in self.templates for field in template.fields})
+    
+    def get_values(self, data: Dict[str, Any]) -> Dict[str, str]:
+        values = {}
+        for field in self.fields:
+            value = format_field_value(data.get(field))
+            values[field] = value if value is not None else self.defaults.get(field, "")
+        return values
+    
+    def choose(self, rng: Optional[random.Random] = None) -> CompiledTemplate:
+        """
+        テンプレートを選ぶ（rngを省略した場合はrandomモジュールを使用する）
+        """
+        return (rng or random).choice(self.templates)
+    
+    def render(self, data: Dict[str, Any], rng: Optional[random.Random] = None) -> str:
+        """
+        1件分の文面を描画する
+        """
+        return self.choose(rng).render(self.get_values(data))
+    
+    def choose_seeded(self, seed: Any, key: Any) -> CompiledTemplate:
+        """
+        シードとレコードのキー（企業IDなど）からテンプレートを選ぶ（同じ組み合わせでは常に同じテンプレートになる）
+        レコードごとに乱数生成器を作成すると遅いため、CRC32で選ぶ
+        """
+        return self.templates[zlib.crc32(f"{seed}:{key}".encode("utf-8")) % len(self.templates)]
+    
+    def render_many(self, records: Iterable[Dict[str, Any]], seed: Optional[int] = None,
+                    key_field: str = "id") -> List[str]:
+        """
+        複数件の文面をまとめて描画する
+        seedを指定した場合はレコードごとにseedとkey_fieldの値（企業ID）からテンプレートを選ぶため、
+        件数・順序によらず同じレコードには常に同じ結果になる（choose_seeded を参照）
+        """
+        if seed is None:
+            return [self.render(record) for record in records]
+        return [self.choose_seeded(seed, record.get(key_field, "")).render(self.get_values(record))
+                for record in records]
+    
+    def render_frame(self, df, seed: Optional[int] = None, key_field: str = "id") -> List[str]:
+        """
+        DataFrame（pandas）の各行の文面をまとめて描画する（seedの扱いはrender_manyと同じ）
+        値の文字列への変換は列単位で一括して行う
+        """
+        columns = {}
+        for field in self.fields:
+            default = self.defaults.get(field, "")
+            if field in df.columns:
+                columns[field] = [
+                    value if value is not None else default
+                    for value in map(format_field_value, df[field].tolist())
+                ]
+            else:
+                columns[field] = [default] * len(df)
+        keys = df[key_field].tolist() if key_field in df.columns else [""] * len(df)
+        
+        texts = []
+        for index in range(len(df)):
+            if seed is not None:
+                template = self.choose_seeded(seed, keys[index])
+            else:
+                template = random.choice(self.templates)
+            texts.append(template.render({field: columns[field][index] for field in template.fields}))
+        return texts
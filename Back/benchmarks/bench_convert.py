@@ -0,0 +1,94 @@
+"""
+process_file のレコード変換処理のベンチマーク
+
+旧実装（iterrows による行単位の変換 + 標準 json）と
+新実装（列単位の一括変換 + orjson）を比較する。
+
+実行方法（Back ディレクトリから）:
+    python benchmarks/bench_convert.py --rows 200000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import orjson
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "app"))
+
+from services.data_service import convert_to_records  # noqa: E402
+
+
+def legacy_convert_to_json(df):
+    """
+    変更前の convert_to_json と同じロジック
+    """
+    records = []
+    for _, row in df.iterrows():
+        record = {}
+        for col in df.columns:
+            value = row[col]
+            if pd.isna(value):
+                record[col] = None
+            else:
+                if isinstance(value, (int, float)):
+                    record[col] = value
+                else:
+                    record[col] = str(value)
+        records.append(record)
+    return records
+
+
+def make_frame(rows: int) -> pd.DataFrame:
+    """
+    正規化後の DataFrame に近いテストデータを作成する
+    """
+    rng = np.random.default_rng(0)
+    revenue = rng.integers(1, 10000, rows).astype(float)
+    revenue[rng.random(rows) < 0.1] = np.nan
+    df = pd.DataFrame({
+        "company_name": [f"テスト株式会社{i}" for i in range(rows)],
+        "industry": rng.choice(["IT", "製造業", "小売", None], rows),
+        "email": [f"info{i}@example.com" for i in range(rows)],
+        "employee_count": rng.integers(1, 5000, rows),
+        "revenue": revenue,
+        "established_year": rng.choice(["2010-04-01", "1998-10-01", None], rows),
+    })
+    df["id"] = [f"id-{i}" for i in range(rows)]
+    return df
+
+
+def measure(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200000)
+    args = parser.parse_args()
+
+    df = make_frame(args.rows)
+
+    legacy_records, legacy_convert = measure(legacy_convert_to_json, df)
+    legacy_body, legacy_dump = measure(
+        lambda r: json.dumps({"data": r}, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8"),
+        legacy_records,
+    )
+
+    records, convert = measure(convert_to_records, df)
+    body, dump = measure(lambda r: orjson.dumps({"data": r}), records)
+
+    print(f"rows: {args.rows}")
+    print(f"legacy: convert {legacy_convert:.3f}s, serialize {legacy_dump:.3f}s")
+    print(f"new:    convert {convert:.3f}s, serialize {dump:.3f}s")
+    print(f"speedup: {(legacy_convert + legacy_dump) / (convert + dump):.1f}x")
+    print(f"identical output: {legacy_body == body}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Excel（xlsx）の読み込みのベンチマーク
+
+pandas.read_excel（openpyxl）と excel_reader の読み込み（シートの XML を直接走査）を比較する。
+複数シートのファイルでは、全シートの逐次読み込みとプロセスを使った並行読み込みも比較する。
+読み込み結果が pandas.read_excel と一致することも確認する。
+
+実行方法（Back ディレクトリから）:
+    python benchmarks/bench_excel.py --rows 100000 --sheets 4 --workers 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app"))
+sys.path.insert(0, BENCH_DIR)
+
+from generate_leads import generate_leads, write_leads  # noqa: E402
+from services.excel_reader import read_sheet, read_all_sheets, concat_sheets  # noqa: E402
+
+
+def write_sheets(df: pd.DataFrame, path: str, sheets: int) -> None:
+    """
+    営業リストを sheets 個のシートに分けて書き出す
+    """
+    workbook = Workbook(write_only=True)
+    for index, part in enumerate(np.array_split(df, sheets)):
+        sheet = workbook.create_sheet(f"Sheet{index + 1}")
+        sheet.append(list(part.columns))
+        for row in part.itertuples(index=False):
+            sheet.append([None if isinstance(v, float) and np.isnan(v) else v for v in row])
+    workbook.save(path)
+
+
+def measure(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def read_all_sheets_pandas(path: str) -> pd.DataFrame:
+    sheets = pd.read_excel(path, sheet_name=None)
+    return concat_sheets(list(sheets.keys()), list(sheets.values()))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--sheets", type=int, default=4, help="複数シートのファイルのシート数")
+    parser.add_argument("--workers", type=int, default=4, help="並行読み込みのプロセス数")
+    args = parser.parse_args()
+
+    work_dir = os.path.join(tempfile.gettempdir(), "leadagent_bench_excel")
+    os.makedirs(work_dir, exist_ok=True)
+    df = generate_leads(args.rows)
+    single_path = os.path.join(work_dir, f"leads_{args.rows}.xlsx")
+    multi_path = os.path.join(work_dir, f"leads_{args.rows}_{args.sheets}sheets.xlsx")
+    if not os.path.exists(single_path):
+        write_leads(df, single_path, "xlsx")
+    if not os.path.exists(multi_path):
+        write_sheets(df, multi_path, args.sheets)
+
+    expected, pandas_single = measure(pd.read_excel, single_path)
+    actual, fast_single = measure(read_sheet, single_path)
+    single_identical = expected.equals(actual) and expected.dtypes.equals(actual.dtypes)
+
+    expected, pandas_multi = measure(read_all_sheets_pandas, multi_path)
+    serial, fast_serial = measure(read_all_sheets, multi_path, 1)
+    parallel, fast_parallel = measure(read_all_sheets, multi_path, args.workers)
+    multi_identical = expected.equals(serial) and serial.equals(parallel)
+
+    print(f"rows: {args.rows}")
+    print(f"single sheet: pandas {pandas_single:.2f}s, fast {fast_single:.2f}s "
+          f"({pandas_single / fast_single:.1f}x), identical output: {single_identical}")
+    print(f"{args.sheets} sheets:     pandas {pandas_multi:.2f}s, fast {fast_serial:.2f}s "
+          f"({pandas_multi / fast_serial:.1f}x), fast x{args.workers} processes {fast_parallel:.2f}s "
+          f"({pandas_multi / fast_parallel:.1f}x), identical output: {multi_identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+営業文面の生成（Gemini API 呼び出し）のスケジューラーのベンチマーク
+
+fake_gemini.py の疑似サーバーに対して llm_service.generate_sales_texts を実行し、
+レート制限（429）・サーバーエラーを受けた場合の再試行と同時実行数の調整を確認する。
+成功・失敗の件数、所要時間、再試行の回数、同時実行数の上限の推移を JSON に出力する。
+
+実行方法（Back ディレクトリから）:
+    python benchmarks/bench_llm.py --companies 200 --latency 0.1 --error-rate 0.05 --server-concurrency 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app"))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_gemini import FakeGemini, start_server  # noqa: E402
+
+
+def prepare_environment(args, endpoint: str) -> None:
+    """
+    疑似サーバーに接続するよう、アプリの設定を読み込む前に環境変数を設定する
+    """
+    work_dir = os.path.join(tempfile.gettempdir(), "leadagent_bench_llm")
+    os.makedirs(work_dir, exist_ok=True)
+    os.chdir(work_dir)
+    os.environ["ENVIRONMENT"] = "production"
+    os.environ["GEMINI_API_KEY"] = "fake"
+    os.environ["GEMINI_API_ENDPOINT"] = endpoint
+    os.environ["SALES_TEXT_CACHE_ENABLED"] = "false"
+    os.environ["LLM_MAX_CONCURRENCY"] = str(args.concurrency)
+    os.environ["LLM_REQUESTS_PER_MINUTE"] = str(args.rpm)
+    os.environ["LLM_BATCH_SIZE"] = str(args.batch_size)
+    os.environ["LLM_MAX_RETRIES"] = str(args.max_retries)
+    os.environ["LLM_RETRY_BASE_DELAY"] = str(args.retry_base_delay)
+
+
+async def run(companies: list, batch_size: int, concurrency: int) -> dict:
+    """
+    営業文面の生成をストリーミングのエンドポイントと同じく並行して実行する
+    """
+    from services.llm_service import generate_sales_texts, llm_scheduler
+
+    queue: asyncio.Queue = asyncio.Queue()
+    for start in range(0, len(companies), batch_size):
+        queue.put_nowait(companies[start:start + batch_size])
+    latencies, limits = [], []
+    succeeded, failed = 0, 0
+
+    async def worker():
+        nonlocal succeeded, failed
+        while not queue.empty():
+            batch = queue.get_nowait()
+            start = time.perf_counter()
+            texts, errors = await generate_sales_texts(batch)
+            latencies.append(time.perf_counter() - start)
+            succeeded += len(texts)
+            failed += len(errors)
+
+    async def monitor():
+        while True:
+            limits.append(llm_scheduler.concurrency.limit)
+            await asyncio.sleep(0.1)
+
+    monitor_task = asyncio.create_task(monitor())
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    monitor_task.cancel()
+
+    return {
+        "elapsed": elapsed,
+        "succeeded": succeeded,
+        "failed": failed,
+        "companies_per_sec": succeeded / elapsed if elapsed > 0 else None,
+        "latency_p50": float(np.percentile(latencies, 50)),
+        "latency_p95": float(np.percentile(latencies, 95)),
+        "concurrency_limit_min": min(limits),
+        "concurrency_limit_final": llm_scheduler.concurrency.limit,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--companies", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=1, help="LLM_BATCH_SIZE")
+    parser.add_argument("--concurrency", type=int, default=5, help="LLM_MAX_CONCURRENCY")
+    parser.add_argument("--rpm", type=int, default=0, help="LLM_REQUESTS_PER_MINUTE（0の場合は制限しない）")
+    parser.add_argument("--max-retries", type=int, default=4, help="LLM_MAX_RETRIES")
+    parser.add_argument("--retry-base-delay", type=float, default=0.2, help="LLM_RETRY_BASE_DELAY")
+    parser.add_argument("--latency", type=float, default=0.1, help="疑似サーバーの応答時間（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="疑似サーバーが 500 / 503 を返す割合")
+    parser.add_argument("--server-rpm", type=int, default=0, help="疑似サーバーの1分あたりの上限（超えると 429）")
+    parser.add_argument("--server-concurrency", type=int, default=0,
+                        help="疑似サーバーの同時実行数の上限（超えると 429）")
+    parser.add_argument("-o", "--output", default="bench_llm.json")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    fake = FakeGemini(args.latency, args.latency / 4, args.error_rate, args.server_rpm, args.server_concurrency)
+    server = start_server(fake)
+    prepare_environment(args, f"http://127.0.0.1:{server.server_port}")
+
+    companies = [{"id": f"company-{i}", "company_name": f"テスト商事{i}", "industry": "IT"}
+                 for i in range(args.companies)]
+    result = asyncio.run(run(companies, args.batch_size, args.concurrency))
+    server.shutdown()
+
+    from utils.metrics import LLM_RETRIES
+    result["retries"] = {labels[0]: value for labels, value in LLM_RETRIES.values.items()}
+    result["server"] = fake.stats
+    result["args"] = vars(args)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
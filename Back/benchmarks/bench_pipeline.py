@@ -0,0 +1,262 @@
+"""
+アップロード → 処理 → 営業文面の生成（SSE） → エクスポート の一連の処理のベンチマーク
+
+generate_leads.py で生成した営業リストを使い、FastAPI アプリをプロセス内（TestClient）で呼び出す。
+営業文面は開発環境のダミー生成を使用するため、Gemini API は呼び出さない。
+段階ごとに所要時間の p50 / p95、1秒あたりの行数、実行中のピーク RSS を JSON に出力する。
+
+実行方法（Back ディレクトリから）:
+    python benchmarks/bench_pipeline.py --rows 1000 100000 --formats csv-utf8 csv-sjis xlsx -o bench.json
+    python benchmarks/bench_pipeline.py --rows 1000 --baseline bench.json   # 前回の結果と比較する
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.join(BENCH_DIR, "..", "app")
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from generate_leads import generate_leads, write_leads  # noqa: E402
+
+# 入力ファイルの形式: (拡張子, generate_leads.write_leads の引数)
+FORMATS = {
+    "csv-utf8": ("csv", {"file_format": "csv", "encoding": "utf-8"}),
+    "csv-sjis": ("csv", {"file_format": "csv", "encoding": "shift_jis"}),
+    "xlsx": ("xlsx", {"file_format": "xlsx"}),
+}
+STAGES = ["upload", "process", "process_stream", "sales_text_stream", "export_csv", "export_excel"]
+
+
+class RssSampler:
+    """
+    一定間隔で RSS を取得し、計測中の最大値を記録する
+    /proc が使えない環境ではプロセス開始からの最大値（ru_maxrss）を使用する
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = 0
+        self.running = False
+        self.thread = None
+        self.page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    def current(self) -> int:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * self.page_size
+        except OSError:
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _run(self):
+        while self.running:
+            self.peak = max(self.peak, self.current())
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self.peak = self.current()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.running = False
+        self.thread.join()
+        self.peak = max(self.peak, self.current())
+
+
+def prepare_environment(work_dir: str, parse_cache: bool) -> None:
+    """
+    アップロード先・保存先を作業ディレクトリに向け、アプリの設定を読み込む前に環境変数を設定する
+    """
+    os.makedirs(work_dir, exist_ok=True)
+    os.chdir(work_dir)
+    os.environ.pop("ENVIRONMENT", None)  # ダミーの営業文面を使用する
+    os.environ["MAX_FILE_SIZE"] = str(4 * 1024 ** 3)
+    os.environ["PARSE_CACHE_ENABLED"] = "true" if parse_cache else "false"
+    os.environ["DUMMY_LLM_LATENCY"] = "0"
+
+
+def prepare_input(data_dir: str, rows: int, name: str) -> str:
+    """
+    入力ファイルを生成する（生成済みの場合は再利用する）
+    """
+    ext, options = FORMATS[name]
+    path = os.path.join(data_dir, f"leads_{rows}_{name}.{ext}")
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        write_leads(generate_leads(rows), path, **options)
+    return path
+
+
+def consume(response) -> float:
+    """
+    ストリーミングレスポンスを最後まで読み込み、最初のデータを受け取るまでの時間を返す
+    """
+    start = time.perf_counter()
+    first = None
+    for chunk in response.iter_bytes():
+        if first is None and chunk:
+            first = time.perf_counter() - start
+    return first if first is not None else time.perf_counter() - start
+
+
+def run_stage(client, stage: str, path: str, state: dict) -> dict:
+    """
+    1つの段階を1回実行する（戻り値は段階ごとの追加の計測値）
+    """
+    extra = {}
+    if stage == "upload":
+        with open(path, "rb") as f:
+            response = client.post("/api/upload", files={"file": (os.path.basename(path), f)})
+        response.raise_for_status()
+        state["file_id"] = response.json()["file_id"]
+    elif stage == "process":
+        response = client.post("/api/process", json={"file_id": state["file_id"]})
+        response.raise_for_status()
+        extra["response_bytes"] = len(response.content)
+    elif stage == "process_stream":
+        with client.stream("POST", "/api/process", json={"file_id": state["file_id"], "stream": True}) as response:
+            response.raise_for_status()
+            extra["time_to_first_byte"] = consume(response)
+    elif stage == "sales_text_stream":
+        # 生成済みの文面は再送されるだけのため、毎回生成し直す
+        with client.stream("GET", f"/api/sales-text-stream?list_id={state['file_id']}&force=true") as response:
+            response.raise_for_status()
+            extra["time_to_first_byte"] = consume(response)
+    elif stage == "export_csv":
+        with client.stream("GET", f"/api/export?format=csv&list_id={state['file_id']}") as response:
+            response.raise_for_status()
+            extra["time_to_first_byte"] = consume(response)
+    elif stage == "export_excel":
+        with client.stream("GET", f"/api/export?format=excel&list_id={state['file_id']}") as response:
+            response.raise_for_status()
+            extra["time_to_first_byte"] = consume(response)
+    return extra
+
+
+def summarize(rows: int, durations: list, peaks: list, extras: list) -> dict:
+    """
+    複数回の計測結果を集計する
+    """
+    p50 = float(np.percentile(durations, 50))
+    result = {
+        "runs": durations,
+        "p50": p50,
+        "p95": float(np.percentile(durations, 95)),
+        "rows_per_sec": rows / p50 if p50 > 0 else None,
+        "peak_rss_mb": max(peaks) / 1024 ** 2,
+    }
+    ttfb = [extra["time_to_first_byte"] for extra in extras if "time_to_first_byte" in extra]
+    if ttfb:
+        result["time_to_first_byte_p50"] = float(np.percentile(ttfb, 50))
+    sizes = [extra["response_bytes"] for extra in extras if "response_bytes" in extra]
+    if sizes:
+        result["response_bytes"] = sizes[-1]
+    return result
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(results: list, baseline_path: str) -> None:
+    """
+    前回の結果（JSON）と p50 を比較して表示する
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["rows"], r["format"], r["stage"]): r for r in json.load(f)["results"]}
+    print(f"\nbaseline: {baseline_path}")
+    for result in results:
+        previous = baseline.get((result["rows"], result["format"], result["stage"]))
+        if previous is None:
+            continue
+        change = (result["p50"] - previous["p50"]) / previous["p50"] * 100 if previous["p50"] else 0.0
+        print(f"{result['rows']:>9} {result['format']:<9} {result['stage']:<18} "
+              f"{previous['p50']:8.3f}s -> {result['p50']:8.3f}s ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100000],
+                        help="行数（例: 1000 100000 1000000）")
+    parser.add_argument("--formats", nargs="+", choices=list(FORMATS), default=list(FORMATS))
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--repeat", type=int, default=3, help="各段階の実行回数")
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "leadagent_bench"),
+                        help="アップロード先・保存先・生成した入力ファイルを置くディレクトリ")
+    parser.add_argument("--parse-cache", action="store_true", help="解析済みデータのキャッシュを有効にする")
+    parser.add_argument("-o", "--output", default="bench_pipeline.json")
+    parser.add_argument("--baseline", help="比較する前回の結果（JSON）")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+    data_dir = os.path.join(os.path.abspath(args.work_dir), "inputs")
+    prepare_environment(os.path.abspath(args.work_dir), args.parse_cache)
+
+    # 設定は読み込み時に環境変数から決まるため、アプリは環境を整えてから読み込む
+    from fastapi.testclient import TestClient
+    import main as app_main
+
+    results = []
+    with TestClient(app_main.app) as client:
+        for rows in args.rows:
+            for name in args.formats:
+                path = prepare_input(data_dir, rows, name)
+                state = {}
+                for stage in args.stages:
+                    durations, peaks, extras = [], [], []
+                    for _ in range(args.repeat):
+                        # アプリのデバッグ出力は計測に含めない
+                        with contextlib.redirect_stdout(io.StringIO()), RssSampler() as sampler:
+                            start = time.perf_counter()
+                            extras.append(run_stage(client, stage, path, state))
+                            durations.append(time.perf_counter() - start)
+                        peaks.append(sampler.peak)
+                    result = {"rows": rows, "format": name, "stage": stage}
+                    result.update(summarize(rows, durations, peaks, extras))
+                    results.append(result)
+                    print(f"{rows:>9} {name:<9} {stage:<18} p50 {result['p50']:8.3f}s  "
+                          f"p95 {result['p95']:8.3f}s  {result['rows_per_sec'] or 0:>12,.0f} rows/s  "
+                          f"RSS {result['peak_rss_mb']:7.1f}MB", flush=True)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "parse_cache": args.parse_cache,
+        },
+        "results": results,
+    }
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nresults -> {output}")
+
+    if baseline:
+        compare(results, baseline)
+
+
+if __name__ == "__main__":
+    main()
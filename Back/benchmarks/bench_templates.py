@@ -0,0 +1,77 @@
+"""
+ダミー営業文面（開発環境・負荷試験で使用）の作成のベンチマーク
+
+旧実装（企業データの全項目について str.replace でテンプレートを置換する）と
+事前に解析したテンプレート（utils.templates.TemplateRenderer）の1件ずつ・一括の描画を比較する。
+シードを指定した一括の描画が、アプリのダミー営業文面（DUMMY_LLM_SEED を指定した generate_dummy_sales_text）と
+同じ文面になることも確認する。
+
+実行方法（Back ディレクトリから）:
+    python benchmarks/bench_templates.py --rows 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, "..", "app"))
+sys.path.insert(0, BENCH_DIR)
+
+from generate_leads import generate_leads  # noqa: E402
+from services.data_service import map_column_names  # noqa: E402
+from config import settings  # noqa: E402
+from services.llm_service import SAMPLE_TEXTS, generate_dummy_sales_text, sample_text_renderer  # noqa: E402
+
+
+def legacy_generate_dummy_sales_text(company_data):
+    """
+    変更前の generate_dummy_sales_text と同じロジック
+    """
+    template = random.choice(SAMPLE_TEXTS)
+    for key, value in company_data.items():
+        if value and isinstance(value, (str, int, float)):
+            placeholder = "{" + key + "}"
+            if placeholder in template:
+                template = template.replace(placeholder, str(value))
+    return template
+
+
+def measure(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    df = generate_leads(args.rows, args.seed)
+    df.columns = map_column_names(df.columns)
+    # シードを指定した描画は企業IDごとにテンプレートを選ぶため、アプリと同じく行IDを付ける
+    df.insert(0, "id", [f"row-{index}" for index in range(len(df))])
+    records = df.to_dict("records")
+
+    legacy, legacy_time = measure(lambda: [legacy_generate_dummy_sales_text(r) for r in records])
+    single, single_time = measure(lambda: [sample_text_renderer.render(r) for r in records])
+    bulk, bulk_time = measure(sample_text_renderer.render_many, records, args.seed)
+    frame, frame_time = measure(sample_text_renderer.render_frame, df, args.seed)
+
+    print(f"rows: {args.rows}")
+    print(f"legacy replace: {legacy_time:.3f}s, unfilled placeholders: {sum('{' in t for t in legacy)}")
+    print(f"renderer:       {single_time:.3f}s, unfilled placeholders: {sum('{' in t for t in single)}")
+    print(f"render_many:    {bulk_time:.3f}s")
+    print(f"render_frame:   {frame_time:.3f}s")
+    print(f"speedup (render_frame): {legacy_time / frame_time:.1f}x")
+    print(f"seeded output reproducible: {bulk == sample_text_renderer.render_many(records, args.seed)}")
+    print(f"render_frame matches render_many: {frame == bulk}")
+    settings.DUMMY_LLM_SEED = args.seed
+    print(f"matches generate_dummy_sales_text: {bulk == [generate_dummy_sales_text(r) for r in records]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+API プロセスの起動時間（main の読み込み時間）のチェック
+
+python -X importtime で main を読み込み、所要時間が予算内であることと、
+起動直後および / ・ /api/upload を処理した後に重い依存（pandas など）が読み込まれていないことを確認する。
+いずれかを満たさない場合は終了コード 1 で終了する（CI などで使用する）。
+
+実行方法（Back ディレクトリから）:
+    python benchmarks/check_startup.py --budget-ms 1000
+    python benchmarks/check_startup.py --top 20   # 読み込みに時間がかかるモジュールを多めに表示する
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.abspath(os.path.join(BENCH_DIR, "..", "app"))
+
+# 起動時・軽いエンドポイントの処理時に読み込まれてはならないモジュール
+HEAVY_MODULES = ["pandas", "numpy", "pyarrow", "openpyxl", "google.generativeai", "google.api_core"]
+
+# -X importtime の出力（import time: 自身の時間 | 累積時間 | モジュール名、単位はマイクロ秒）
+IMPORTTIME_PATTERN = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+# / と /api/upload を処理した後に読み込まれているモジュールを出力するスクリプト
+SERVE_SCRIPT = """
+import json, sys
+from fastapi.testclient import TestClient
+import main
+
+client = TestClient(main.app)
+statuses = [
+    client.get("/").status_code,
+    client.post("/api/upload", files={"file": ("leads.csv", "会社名,業種\\n山田商事,IT\\n".encode("utf-8"))}).status_code,
+]
+print(json.dumps({"statuses": statuses, "modules": [m for m in %r if m in sys.modules]}))
+"""
+
+
+def run_app_python(args, work_dir):
+    """
+    アプリのディレクトリを import パスに含め、作業ディレクトリで Python を実行する
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = APP_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    env.pop("ENVIRONMENT", None)  # 本番環境の起動処理（Gemini の準備）は計測に含めない
+    return subprocess.run([sys.executable] + args, cwd=work_dir, env=env,
+                          capture_output=True, text=True, check=True)
+
+
+def measure_import(work_dir):
+    """
+    main を読み込み、(main の累積時間（ミリ秒）, モジュールごとの自身の時間（ミリ秒）) を返す
+    """
+    result = run_app_python(["-X", "importtime", "-c", "import main"], work_dir)
+    total = None
+    self_times = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        self_times[name] = int(self_us) / 1000
+        if name == "main" and not indent:
+            total = int(cumulative_us) / 1000
+    return total, self_times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=1000, help="main の読み込み時間の上限（ミリ秒）")
+    parser.add_argument("--repeat", type=int, default=3, help="計測回数（最小値で判定する）")
+    parser.add_argument("--top", type=int, default=10, help="表示する時間のかかったモジュールの数")
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        measurements = [measure_import(work_dir) for _ in range(max(1, args.repeat))]
+        total, self_times = min(measurements, key=lambda m: m[0])
+        print(f"import main: {total:.1f}ms (budget {args.budget_ms:.0f}ms, best of {len(measurements)})")
+        for name, elapsed in sorted(self_times.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"  {elapsed:8.1f}ms  {name}")
+        if total > args.budget_ms:
+            failures.append(f"import main took {total:.1f}ms (budget {args.budget_ms:.0f}ms)")
+
+        heavy = [name for name in HEAVY_MODULES if name in self_times]
+        if heavy:
+            failures.append(f"heavy modules imported at startup: {', '.join(heavy)}")
+
+        served = json.loads(run_app_python(["-c", SERVE_SCRIPT % HEAVY_MODULES], work_dir).stdout.splitlines()[-1])
+        print(f"GET / and POST /api/upload: {served['statuses']}")
+        if any(status != 200 for status in served["statuses"]):
+            failures.append(f"unexpected status codes: {served['statuses']}")
+        if served["modules"]:
+            failures.append(f"heavy modules imported while serving / and /api/upload: {', '.join(served['modules'])}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
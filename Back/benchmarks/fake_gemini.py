@@ -0,0 +1,179 @@
+"""
+Gemini API（REST）の疑似サーバー
+
+llm_service の再試行・レート制限・同時実行数の調整を、実際の API を使わずに確認するために使う。
+応答の遅延、サーバーエラー（500 / 503）の割合、1分あたりのリクエスト数・同時実行数の上限
+（超えた場合は 429）を指定できる。
+
+実行方法（Back ディレクトリから）:
+    python benchmarks/fake_gemini.py --port 8001 --latency 0.2 --error-rate 0.05 --rpm 120
+    # アプリ側は GEMINI_API_ENDPOINT=http://127.0.0.1:8001 ENVIRONMENT=production で起動する
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+GENERATE_PATH = re.compile(r"^/v1beta/(models/[^/:]+):generateContent$")
+MODEL_NAMES = ["models/gemini-1.5-flash", "models/gemini-1.5-pro"]
+
+
+class FakeGemini:
+    """
+    疑似サーバーの設定と、受け付けたリクエストの集計
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 rpm: int = 0, max_concurrency: int = 0, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rpm = rpm
+        self.max_concurrency = max_concurrency
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.recent = deque()
+        self.in_flight = 0
+        self.stats = {"requests": 0, "ok": 0, "rate_limited": 0, "errors": 0, "max_in_flight": 0}
+
+    def admit(self) -> int:
+        """
+        リクエストを受け付けるか判定する（戻り値は返すステータスコード）
+        """
+        now = time.monotonic()
+        with self.lock:
+            self.stats["requests"] += 1
+            while self.recent and now - self.recent[0] >= 60:
+                self.recent.popleft()
+            if (self.rpm and len(self.recent) >= self.rpm) or \
+                    (self.max_concurrency and self.in_flight >= self.max_concurrency):
+                self.stats["rate_limited"] += 1
+                return 429
+            self.recent.append(now)
+            if self.random.random() < self.error_rate:
+                self.stats["errors"] += 1
+                return self.random.choice([500, 503])
+            self.in_flight += 1
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.in_flight)
+            return 200
+
+    def finish(self) -> None:
+        with self.lock:
+            self.in_flight -= 1
+            self.stats["ok"] += 1
+
+    def delay(self) -> float:
+        with self.lock:
+            return max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+
+
+def generate_text(prompt: str) -> str:
+    """
+    プロンプトに応じた応答を作成する（一括生成のプロンプトには企業IDをキーとするJSONを返す）
+    """
+    match = re.search(r"## 企業情報（キーは企業ID）\s*(\{.*?\n\})", prompt, re.S)
+    if match:
+        try:
+            companies = json.loads(match.group(1))
+            return json.dumps({company_id: f"{fields.get('company_name', '')}様への営業文面です。"
+                               for company_id, fields in companies.items()}, ensure_ascii=False)
+        except json.JSONDecodeError:
+            pass
+    name = re.search(r"company_name: (.+)", prompt)
+    return f"{name.group(1) if name else '貴社'}様\n\n疑似サーバーが生成した営業文面です。"
+
+
+def make_handler(fake: FakeGemini):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def send_json(self, status: int, body: dict) -> None:
+            data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def send_error_json(self, status: int) -> None:
+            statuses = {429: "RESOURCE_EXHAUSTED", 500: "INTERNAL", 503: "UNAVAILABLE"}
+            self.send_json(status, {"error": {"code": status, "message": "fake error",
+                                              "status": statuses.get(status, "UNKNOWN")}})
+
+        def do_GET(self):
+            if self.path.split("?")[0] == "/v1beta/models":
+                self.send_json(200, {"models": [
+                    {"name": name, "supportedGenerationMethods": ["generateContent"]} for name in MODEL_NAMES
+                ]})
+            else:
+                self.send_error_json(404)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not GENERATE_PATH.match(self.path.split("?")[0]):
+                self.send_error_json(404)
+                return
+
+            status = fake.admit()
+            if status != 200:
+                self.send_error_json(status)
+                return
+            try:
+                time.sleep(fake.delay())
+                prompt = "\n".join(part.get("text", "") for content in body.get("contents", [])
+                                   for part in content.get("parts", []))
+                text = generate_text(prompt)
+            finally:
+                fake.finish()
+            self.send_json(200, {
+                "candidates": [{"content": {"role": "model", "parts": [{"text": text}]},
+                                "finishReason": "STOP", "index": 0}],
+                "usageMetadata": {"promptTokenCount": len(prompt), "candidatesTokenCount": len(text),
+                                  "totalTokenCount": len(prompt) + len(text)},
+            })
+
+    return Handler
+
+
+def start_server(fake: FakeGemini, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """
+    疑似サーバーを別スレッドで起動する（port=0 の場合は空いているポートを使う）
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(fake))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.2, help="応答までの時間（秒）")
+    parser.add_argument("--jitter", type=float, default=0.05, help="応答時間のばらつき（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500 / 503 を返す割合")
+    parser.add_argument("--rpm", type=int, default=0, help="1分あたりのリクエスト数の上限（超えると 429）")
+    parser.add_argument("--max-concurrency", type=int, default=0, help="同時実行数の上限（超えると 429）")
+    args = parser.parse_args()
+
+    fake = FakeGemini(args.latency, args.jitter, args.error_rate, args.rpm, args.max_concurrency)
+    server = start_server(fake, args.host, args.port)
+    print(f"fake Gemini API: http://{args.host}:{server.server_port}")
+    try:
+        while True:
+            time.sleep(10)
+            print(json.dumps(fake.stats), flush=True)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
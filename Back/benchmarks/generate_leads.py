@@ -0,0 +1,114 @@
+"""
+ベンチマーク用の営業リスト（日本語）を生成する
+
+カラム名は to_snake_case が認識する日本語の見出しを使用する。
+CSV（UTF-8 / Shift-JIS）と XLSX に出力できる。
+
+実行方法（Back ディレクトリから）:
+    python benchmarks/generate_leads.py --rows 100000 --format csv --encoding shift_jis -o leads.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+# 見出し（to_snake_case で company_name などに変換される）
+HEADERS = ["会社名", "業種", "担当者", "メールアドレス", "電話番号", "住所", "URL",
+           "従業員数", "売上", "設立年"]
+
+# Shift-JIS で表現できる文字のみを使用する
+COMPANY_WORDS = ["山田", "東京", "日本", "大和", "富士", "中央", "北斗", "未来", "緑川", "青葉",
+                 "桜井", "光", "新星", "旭", "丸山", "平和", "三栄", "共栄", "総合", "国際"]
+COMPANY_KINDS = ["商事", "工業", "製作所", "システム", "ソリューションズ", "物産", "電機",
+                 "建設", "運輸", "食品", "不動産", "コンサルティング"]
+LEGAL_FORMS = ["株式会社{}", "{}株式会社", "有限会社{}", "(株){}", "合同会社{}"]
+INDUSTRIES = ["IT・通信", "製造業", "小売", "卸売", "建設", "不動産", "飲食", "医療・福祉",
+              "物流", "金融", "教育", "広告"]
+LAST_NAMES = ["佐藤", "鈴木", "高橋", "田中", "伊藤", "渡辺", "山本", "中村", "小林", "加藤"]
+FIRST_NAMES = ["太郎", "花子", "一郎", "次郎", "美咲", "健太", "陽子", "翔太", "彩", "誠"]
+PREFECTURES = [("東京都", "03", ["千代田区", "中央区", "港区", "新宿区", "渋谷区"]),
+               ("大阪府", "06", ["大阪市北区", "大阪市中央区", "堺市", "豊中市"]),
+               ("愛知県", "052", ["名古屋市中区", "名古屋市東区", "豊田市"]),
+               ("福岡県", "092", ["福岡市博多区", "福岡市中央区", "北九州市"]),
+               ("北海道", "011", ["札幌市中央区", "札幌市北区", "旭川市"])]
+
+
+def generate_leads(rows: int, seed: int = 0, duplicate_ratio: float = 0.1) -> pd.DataFrame:
+    """
+    営業リストを生成する（duplicate_ratio の割合で表記ゆれのある同じ会社を含む）
+    """
+    rng = np.random.default_rng(seed)
+    # 重複させる行は、前に出てきた会社の番号を再利用する
+    company_no = np.arange(rows)
+    duplicated = rng.random(rows) < duplicate_ratio
+    company_no[duplicated] = (rng.random(duplicated.sum()) * np.maximum(np.flatnonzero(duplicated), 1)).astype(int)
+
+    word = np.array(COMPANY_WORDS)[company_no % len(COMPANY_WORDS)]
+    kind = np.array(COMPANY_KINDS)[(company_no // len(COMPANY_WORDS)) % len(COMPANY_KINDS)]
+    form = np.array(LEGAL_FORMS)[rng.integers(0, len(LEGAL_FORMS), rows)]
+    names = [f.format(f"{w}{k}{n}") for f, w, k, n in zip(form, word, kind, company_no)]
+
+    prefecture = company_no % len(PREFECTURES)
+    addresses = []
+    phones = []
+    for pref_index, no in zip(prefecture, company_no):
+        pref, area_code, cities = PREFECTURES[pref_index]
+        addresses.append(f"{pref}{cities[no % len(cities)]}{no % 9 + 1}-{no % 20 + 1}-{no % 30 + 1}")
+        # 市外局番を含めて10桁になるようにする
+        digits = 10 - len(area_code)
+        subscriber = f"{no % (10 ** digits):0{digits}d}"
+        phones.append(f"{area_code}-{subscriber[:-4]}-{subscriber[-4:]}")
+
+    contacts = [f"{LAST_NAMES[i % len(LAST_NAMES)]}{FIRST_NAMES[(i // 10) % len(FIRST_NAMES)]}"
+                for i in rng.integers(0, 100, rows)]
+    revenue = rng.integers(10, 100000, rows).astype(float)
+    revenue[rng.random(rows) < 0.05] = np.nan
+
+    return pd.DataFrame({
+        "会社名": names,
+        "業種": rng.choice(INDUSTRIES, rows),
+        "担当者": contacts,
+        "メールアドレス": [f"info@company{no}.co.jp" for no in company_no],
+        "電話番号": phones,
+        "住所": addresses,
+        "URL": [f"https://www.company{no}.co.jp/" for no in company_no],
+        "従業員数": rng.integers(1, 5000, rows),
+        "売上": revenue,
+        "設立年": rng.integers(1950, 2024, rows),
+    }, columns=HEADERS)
+
+
+def write_leads(df: pd.DataFrame, path: str, file_format: str = "csv", encoding: str = "utf-8") -> None:
+    """
+    営業リストを CSV または XLSX に書き出す
+    """
+    if file_format == "csv":
+        df.to_csv(path, index=False, encoding=encoding)
+    elif file_format == "xlsx":
+        # 大きなファイルでもメモリを使いすぎないよう書き込み専用モードを使用する
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Sheet1")
+        sheet.append(list(df.columns))
+        for row in df.itertuples(index=False):
+            sheet.append([None if isinstance(v, float) and np.isnan(v) else v for v in row])
+        workbook.save(path)
+    else:
+        raise ValueError(f"Unsupported format: {file_format}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--format", choices=["csv", "xlsx"], default="csv")
+    parser.add_argument("--encoding", default="utf-8", help="CSV の文字コード（utf-8 / shift_jis）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", required=True)
+    args = parser.parse_args()
+
+    write_leads(generate_leads(args.rows, args.seed), args.output, args.format, args.encoding)
+    print(f"{args.rows} rows -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+import os
+import sys
+import threading
+
+import pytest
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+sys.path.insert(0, os.path.abspath(APP_DIR))
+
+from config import settings  # noqa: E402
+from services import store_service  # noqa: E402
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """
+    リストの保存先を一時ディレクトリのデータベースに切り替える
+    """
+    monkeypatch.setattr(settings, "LIST_STORE_PATH", str(tmp_path / "lists.db"))
+    monkeypatch.setattr(store_service, "_local", threading.local())
+    return store_service
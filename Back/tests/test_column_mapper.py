@@ -0,0 +1,83 @@
+"""
+カラム名の変換（utils.column_mapper.ColumnMapper）のテスト
+
+実行方法（Back ディレクトリから）:
+    python -m pytest tests
+"""
+import sys
+import threading
+
+import pytest
+
+from utils import column_mapper
+from utils.column_mapper import ColumnMapper, load_synonyms
+
+
+@pytest.fixture
+def mapper():
+    return ColumnMapper(load_synonyms())
+
+
+@pytest.mark.parametrize("header, expected", [
+    # 完全一致（表記ゆれ・括弧内の補足を含む）
+    ("会社名", "company_name"),
+    ("会社名（正式）", "company_name"),
+    ("取引先名", "company_name"),
+    ("Company Name", "company_name"),
+    ("ＴＥＬ", "phone"),
+    # 部分一致（末尾の語）
+    ("代表者メールアドレス", "email"),
+    ("電子メールアドレス", "email"),
+    ("Sales Contact", "contact_person"),
+    # 別の会社・以前の値を表すカラム名は部分一致・あいまい一致させない
+    ("親会社名", "親会社名"),
+    ("子会社名", "子会社名"),
+    ("取引先会社名", "取引先会社名"),
+    ("関連会社電話番号", "関連会社電話番号"),
+    ("前担当者", "前担当者"),
+    ("Parent Company", "parent_company"),
+    ("Parent Company Name", "parent_company_name"),
+    ("Client Contact", "client_contact"),
+    # 短い語・長さの大きく異なる語は部分一致・あいまい一致させない
+    ("会社概要", "会社概要"),
+    ("Organization Type", "organization_type"),
+])
+def test_to_snake_case(mapper, header, expected):
+    assert mapper.to_snake_case(header) == expected
+
+
+def test_parent_company_is_not_used_as_company_name(mapper):
+    assert mapper.map_columns(["親会社名", "電話番号"]) == ["親会社名", "phone"]
+    assert mapper.map_columns(["親会社名", "会社名"]) == ["親会社名", "company_name"]
+
+
+def test_exact_match_wins_over_partial_match(mapper):
+    assert mapper.map_columns(["代表者メールアドレス", "メールアドレス"]) == ["email_2", "email"]
+    assert mapper.map_columns(["電話", "電話番号"]) == ["phone", "phone_2"]
+
+
+def test_cache_is_bounded_and_thread_safe(mapper, monkeypatch):
+    monkeypatch.setattr(column_mapper, "MAX_CACHE_SIZE", 50)
+    errors = []
+
+    def resolve_many(offset):
+        try:
+            for index in range(2000):
+                header = f"項目{offset + index % 300}"
+                assert mapper.to_snake_case(header) == header
+        except Exception as e:
+            errors.append(e)
+
+    # スレッドの切り替えを頻繁にし、メモ化の追加・削除が競合しやすくする
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=resolve_many, args=(offset,)) for offset in range(0, 1600, 200)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert errors == []
+    assert len(mapper.cache) <= 50
@@ -0,0 +1,80 @@
+"""
+会社データの取得（data_service.get_company_data / iter_company_data）と、
+それを使用するエクスポート・営業文面の生成のエンドポイントのテスト
+
+実行方法（Back ディレクトリから）:
+    python -m pytest tests
+"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from services.data_service import ListNotFoundError, get_company_data, iter_company_data
+from services.store_service import get_sales_text_run, save_list
+
+ROWS = [
+    {"id": "r1", "company_name": "山田商事", "industry": "IT"},
+    {"id": "r2", "company_name": "佐藤工業", "industry": "製造業"},
+]
+
+
+@pytest.fixture
+def client(store):
+    import main
+
+    with TestClient(main.app) as client:
+        yield client
+
+
+async def collect(list_id):
+    return [company async for companies in iter_company_data(list_id) for company in companies]
+
+
+def test_stored_list(store):
+    save_list("list1", ROWS, {"company_name": "会社名", "industry": "業種"}, ["f1", "f2"])
+    assert asyncio.run(get_company_data("list1")) == ROWS
+    assert asyncio.run(get_company_data("list1", offset=1, columns=["company_name"])) == [
+        {"company_name": "佐藤工業"}
+    ]
+    assert asyncio.run(collect("list1")) == ROWS
+
+
+@pytest.mark.parametrize("list_id", [None, "", "current"])
+def test_dummy_list_ids(store, list_id):
+    companies = asyncio.run(get_company_data(list_id))
+    assert companies and companies[0]["company_name"] == "テスト株式会社"
+    assert asyncio.run(collect(list_id)) == companies
+
+
+def test_unknown_list(store):
+    with pytest.raises(ListNotFoundError):
+        asyncio.run(get_company_data("nope"))
+    with pytest.raises(ListNotFoundError):
+        asyncio.run(collect("nope"))
+
+
+@pytest.mark.parametrize("format", ["csv", "excel"])
+def test_export_unknown_list(client, format):
+    response = client.get("/api/export", params={"list_id": "nope", "format": format})
+    assert response.status_code == 404
+
+
+def test_export_stored_and_dummy_lists(client):
+    save_list("list1", ROWS, {"company_name": "会社名", "industry": "業種"}, ["f1", "f2"])
+    response = client.get("/api/export", params={"list_id": "list1"})
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines[0].startswith("会社名,業種")
+    assert [line.split(",")[0] for line in lines[1:]] == ["山田商事", "佐藤工業"]
+
+    response = client.get("/api/export", params={"list_id": "current"})
+    assert response.status_code == 200
+    assert "テスト株式会社" in response.text
+
+
+def test_sales_text_stream_unknown_list(client):
+    response = client.get("/api/sales-text-stream", params={"list_id": "nope"})
+    assert response.status_code == 404
+    # 生成を開始せず、イベントも保存しない
+    assert get_sales_text_run("nope") is None
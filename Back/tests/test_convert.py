@@ -0,0 +1,103 @@
+"""
+レコードへの変換（data_service.convert_to_records）のテスト
+
+変更前の実装（iterrows による行単位の変換 + 標準 json）と同じ JSON になることを確認する。
+
+実行方法（Back ディレクトリから）:
+    python -m pytest tests
+"""
+import json
+
+import numpy as np
+import orjson
+import pandas as pd
+import pytest
+
+from services.data_service import convert_to_records
+
+
+def legacy_convert_to_json(df):
+    """
+    変更前の convert_to_json と同じロジック（benchmarks/bench_convert.py と同じ）
+    """
+    records = []
+    for _, row in df.iterrows():
+        record = {}
+        for col in df.columns:
+            value = row[col]
+            if pd.isna(value):
+                record[col] = None
+            else:
+                if isinstance(value, (int, float)):
+                    record[col] = value
+                else:
+                    record[col] = str(value)
+        records.append(record)
+    return records
+
+
+def legacy_body(df):
+    return json.dumps({"data": legacy_convert_to_json(df)}, ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def body(df):
+    return orjson.dumps({"data": convert_to_records(df)})
+
+
+def make_frame(rows):
+    """
+    正規化後の DataFrame に近いテストデータ（benchmarks/bench_convert.py と同じ構成）
+    """
+    rng = np.random.default_rng(0)
+    revenue = rng.integers(1, 10000, rows).astype(float)
+    revenue[rng.random(rows) < 0.1] = np.nan
+    df = pd.DataFrame({
+        "company_name": [f"テスト株式会社{i}" for i in range(rows)],
+        "industry": rng.choice(["IT", "製造業", "小売", None], rows),
+        "email": [f"info{i}@example.com" for i in range(rows)],
+        "employee_count": rng.integers(1, 5000, rows),
+        "revenue": revenue,
+        "established_year": rng.choice(["2010-04-01", "1998-10-01", None], rows),
+    })
+    df["id"] = [f"id-{i}" for i in range(rows)]
+    return df
+
+
+# 処理結果の DataFrame には常に文字列の id 列があるため、各データに id 列を含める
+# （数値の列のみの場合、iterrows は整数を小数に変換するため変更前の実装とは一致しない）
+FRAMES = {
+    "normalized": make_frame(500),
+    "numeric_only_with_id": pd.DataFrame({
+        "id": ["id-0", "id-1", "id-2"],
+        "employee_count": [10, 200, 3000],
+        "revenue": [1.5, np.nan, 300.0],
+    }),
+    "mixed_object": pd.DataFrame({
+        "id": ["id-0", "id-1", "id-2", "id-3", "id-4"],
+        "value": ["1", 2, 3.5, None, np.nan],
+    }),
+    "bool": pd.DataFrame({"id": ["id-0", "id-1"], "flag": [True, False]}),
+    "datetime": pd.DataFrame({"id": ["id-0", "id-1"], "date": pd.to_datetime(["2020-04-01 10:30", None])}),
+    "nullable": pd.DataFrame({
+        "id": ["id-0", "id-1"],
+        "count": pd.array([1, None], dtype="Int64"),
+        "name": pd.array(["山田商事", None], dtype="string"),
+        "category": pd.Categorical(["IT", None]),
+    }),
+    "empty": make_frame(0),
+}
+
+
+@pytest.mark.parametrize("name", FRAMES)
+def test_convert_to_records_matches_legacy_conversion(name):
+    df = FRAMES[name]
+    assert body(df) == legacy_body(df)
+
+
+def test_convert_to_records_keeps_id_as_string_and_numbers_as_numbers():
+    records = convert_to_records(FRAMES["numeric_only_with_id"])
+
+    assert records[0] == {"id": "id-0", "employee_count": 10, "revenue": 1.5}
+    assert type(records[0]["employee_count"]) is int
+    assert records[1]["revenue"] is None
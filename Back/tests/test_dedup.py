@@ -0,0 +1,121 @@
+"""
+重複する会社の検出（dedup_service.deduplicate）のテスト
+
+実行方法（Back ディレクトリから）:
+    python -m pytest tests
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from services.dedup_service import deduplicate
+from services.store_service import save_dedup_keys
+
+ROWS = [
+    # id, company_name, phone, email, url
+    ("r0", "株式会社テスト", "03-1234-5678", "info@test.co.jp", "https://www.test.co.jp/"),
+    ("r1", "テスト（株）", "03-9999-0000", None, None),
+    # 代表番号のみ共有する別の会社
+    ("r2", "別会社", "03-1234-5678", None, None),
+    # 代表番号とドメインを共有するグループ会社
+    ("r3", "テストシステムズ株式会社", "03-1234-5678", "sales@test.co.jp", "https://systems.test.co.jp/"),
+    # 会社名がなく、代表番号とホスト名が一致する行
+    ("r4", None, "0312345678", None, "test.co.jp/contact"),
+    # 会社名がなく、代表番号のみ一致する行
+    ("r5", None, "03-1234-5678", "someone@gmail.com", None),
+]
+
+
+def make_frame(rows):
+    return pd.DataFrame(rows, columns=["id", "company_name", "phone", "email", "url"])
+
+
+def duplicate_map(df):
+    return dict(zip(df["id"], df["duplicate_of"].replace({np.nan: None})))
+
+
+def test_flag_confirms_by_name_or_two_keys(store):
+    df, stats, _ = deduplicate(make_frame(ROWS), "list1", "flag")
+    assert duplicate_map(df) == {
+        "r0": None,
+        "r1": "r0",
+        "r2": None,
+        "r3": None,
+        "r4": "r0",
+        "r5": None,
+    }
+    assert stats == {"duplicates": 2, "cross_list_matches": 0}
+
+
+def test_flag_does_not_chain_different_names_through_nameless_row(store):
+    rows = [
+        ("r0", "山田商事", "03-1111-2222", "a@yamada.co.jp", None),
+        ("r1", None, "03-1111-2222", "b@yamada.co.jp", "https://sato.co.jp"),
+        ("r2", "佐藤工業", "03-1111-2222", "c@sato.co.jp", "https://sato.co.jp"),
+    ]
+    df, _, _ = deduplicate(make_frame(rows), "list1", "flag")
+    # 会社名のない行はどちらか一方（先の行）にのみまとめられ、会社名の異なる行どうしはまとめない
+    assert duplicate_map(df) == {"r0": None, "r1": "r0", "r2": None}
+
+
+def test_merge_drops_only_confirmed_duplicates(store):
+    df, stats, _ = deduplicate(make_frame(ROWS), "list1", "merge")
+    assert df["id"].tolist() == ["r0", "r2", "r3", "r5"]
+    assert df["company_name"].tolist() == ["株式会社テスト", "別会社", "テストシステムズ株式会社", None]
+    assert df["duplicate_count"].tolist() == [2, 0, 0, 0]
+    assert "duplicate_of" not in df.columns
+    assert stats["duplicates"] == 2
+
+
+def test_merge_fills_missing_values_from_duplicates(store):
+    rows = [
+        ("r0", "株式会社テスト", None, None, None),
+        ("r1", "テスト株式会社", "03-1234-5678", "info@test.co.jp", None),
+    ]
+    df, _, _ = deduplicate(make_frame(rows), "list1", "merge")
+    assert df[["id", "phone", "email"]].values.tolist() == [["r0", "03-1234-5678", "info@test.co.jp"]]
+
+
+def test_previous_chunk_is_matched_by_confirmed_keys_only(store):
+    first, _, key_rows = deduplicate(make_frame(ROWS[:1]), "list1", "flag")
+    save_dedup_keys("list1", key_rows)
+    df, stats, _ = deduplicate(make_frame(ROWS[1:]), "list1", "flag", start_index=1)
+    assert duplicate_map(df) == {"r1": "r0", "r2": None, "r3": None, "r4": "r0", "r5": None}
+    assert stats["duplicates"] == 2
+
+
+def test_cross_list_matches_confirmed_companies_only(store):
+    _, _, key_rows = deduplicate(make_frame(ROWS[:1]), "list1", "flag")
+    save_dedup_keys("list1", key_rows)
+
+    rows = [(f"n{index}",) + row[1:] for index, row in enumerate(ROWS[1:])]
+    df, stats, _ = deduplicate(make_frame(rows), "list2", "flag", cross_list=True)
+    matched = dict(zip(df["company_name"].fillna(df["url"]).fillna(df["email"]), df["duplicate_of_list"]))
+    assert matched == {
+        "テスト（株）": "list1",
+        "別会社": None,
+        "テストシステムズ株式会社": None,
+        "test.co.jp/contact": "list1",
+        "someone@gmail.com": None,
+    }
+    assert stats["cross_list_matches"] == 2
+    # 他のリストとの照合では同じリスト内の重複としては扱わない
+    assert df["duplicate_of"].isna().all()
+
+
+def test_cross_list_nameless_row_matches_named_row_in_later_list(store):
+    rows = [("r0", None, "03-1234-5678", "info@test.co.jp", None)]
+    _, _, key_rows = deduplicate(make_frame(rows), "list1", "flag")
+    save_dedup_keys("list1", key_rows)
+
+    rows = [
+        ("n0", "株式会社テスト", "0312345678", "sales@test.co.jp", None),
+        ("n1", "別会社", "0312345678", None, None),
+    ]
+    df, _, _ = deduplicate(make_frame(rows), "list2", "flag", cross_list=True)
+    assert df["duplicate_of_list"].tolist() == ["list1", None]
+
+
+def test_invalid_mode(store):
+    with pytest.raises(ValueError):
+        deduplicate(make_frame(ROWS), "list1", "drop")
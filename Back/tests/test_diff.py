@@ -0,0 +1,154 @@
+"""
+前のバージョンのリストとの照合（diff_service）のテスト
+
+実行方法（Back ディレクトリから）:
+    python -m pytest tests
+"""
+import pytest
+
+from services.diff_service import RowMatcher, compute_fingerprints, remap_duplicate_ids
+from services.store_service import save_list
+
+MAPPING = {"company_name": "会社名", "industry": "業種"}
+
+
+def save_previous(rows, with_fingerprints=True):
+    records = [dict(row) for row in rows]
+    fingerprints = compute_fingerprints(records) if with_fingerprints else None
+    save_list("prev", records, MAPPING, fingerprints)
+    return "prev"
+
+
+def upload(rows):
+    """
+    再アップロードされた行（処理ごとに新しい行IDが付く）とそのフィンガープリント
+    """
+    records = [dict(row, id=f"new{index}") for index, row in enumerate(rows, 1)]
+    return records, compute_fingerprints(records)
+
+
+def test_unchanged_rows_are_matched_before_name_key(store):
+    save_previous([
+        {"id": "p1", "company_name": "山田商事", "industry": "IT", "salesText": "山田商事様への営業文面"},
+        {"id": "p2", "company_name": "佐藤工業", "industry": "製造業"},
+    ])
+    # 会社名のみ一致する行が、内容が同じ行より先にある
+    records, fingerprints = upload([
+        {"company_name": "山田商事", "industry": "小売"},
+        {"company_name": "株式会社 山田商事", "industry": "IT"},
+        {"company_name": "山田商事", "industry": "IT"},
+        {"company_name": "佐藤工業", "industry": "建設業"},
+    ])
+    matcher = RowMatcher("prev")
+    id_map = matcher.match(records, fingerprints)
+
+    # 内容が同じ行がIDと営業文面を引き継ぎ、会社名のみ一致する行はIDのみ引き継ぐ
+    assert records[2]["id"] == "p1"
+    assert records[2]["salesText"] == "山田商事様への営業文面"
+    assert records[3]["id"] == "p2"
+    assert "salesText" not in records[3]
+    assert [records[0]["id"], records[1]["id"]] == ["new1", "new2"]
+    assert id_map == {"new3": "p1", "new4": "p2"}
+
+    summary = matcher.summary()
+    assert summary["unchanged"] == 1
+    assert summary["changed_ids"] == ["p2"]
+    assert summary["added_ids"] == ["new1", "new2"]
+    assert summary["removed_ids"] == []
+
+
+def test_name_key_matches_in_order_when_content_changed(store):
+    save_previous([
+        {"id": "p1", "company_name": "山田商事", "industry": "IT"},
+        {"id": "p2", "company_name": "山田商事", "industry": "製造業"},
+        {"id": "p3", "company_name": "鈴木物産", "industry": "小売"},
+    ])
+    records, fingerprints = upload([
+        {"company_name": "山田商事", "industry": "建設業"},
+        {"company_name": "山田商事", "industry": "製造業"},
+        {"company_name": "山田商事", "industry": "小売"},
+    ])
+    matcher = RowMatcher("prev")
+    matcher.match(records, fingerprints)
+
+    # 内容が同じ行がp2を取り、残りはp1（前のバージョンの順番）に、3件目は追加とする
+    assert [record["id"] for record in records] == ["p1", "p2", "new3"]
+    summary = matcher.summary()
+    assert summary["changed_ids"] == ["p1"]
+    assert summary["removed_ids"] == ["p3"]
+
+
+def test_duplicate_fingerprints_are_matched_one_to_one(store):
+    row = {"company_name": "山田商事", "industry": "IT"}
+    save_previous([
+        dict(row, id="p1", salesText="1件目の営業文面"),
+        dict(row, id="p2", salesText="2件目の営業文面"),
+    ])
+    records, fingerprints = upload([row, row, row])
+    matcher = RowMatcher("prev")
+    id_map = matcher.match(records, fingerprints)
+
+    # 同じ内容の行は前のバージョンの行に順番に1対1で対応し、余った行は追加とする
+    assert [record["id"] for record in records] == ["p1", "p2", "new3"]
+    assert [record.get("salesText") for record in records] == ["1件目の営業文面", "2件目の営業文面", None]
+    assert id_map == {"new1": "p1", "new2": "p2"}
+    summary = matcher.summary()
+    assert (summary["unchanged"], summary["changed"], summary["added"], summary["removed"]) == (2, 0, 1, 0)
+
+
+def test_duplicate_fingerprints_leave_unmatched_previous_rows_removed(store):
+    row = {"company_name": "山田商事", "industry": "IT"}
+    save_previous([dict(row, id="p1"), dict(row, id="p2")])
+    records, fingerprints = upload([row])
+    matcher = RowMatcher("prev")
+    matcher.match(records, fingerprints)
+
+    assert records[0]["id"] == "p1"
+    assert matcher.summary()["removed_ids"] == ["p2"]
+
+
+def test_rows_saved_without_fingerprints_are_matched_by_data(store):
+    save_previous([
+        {"id": "p1", "company_name": "山田商事", "industry": "IT", "employee_count": 10.0},
+        {"id": "p2", "company_name": "佐藤工業", "industry": "製造業"},
+    ], with_fingerprints=False)
+    records, fingerprints = upload([
+        {"company_name": "山田商事", "industry": "IT", "employee_count": 10},
+        {"company_name": "佐藤工業", "industry": "建設業"},
+    ])
+    matcher = RowMatcher("prev")
+    matcher.match(records, fingerprints)
+
+    assert [record["id"] for record in records] == ["p1", "p2"]
+    assert matcher.summary()["unchanged"] == 1
+    assert matcher.summary()["changed_ids"] == ["p2"]
+
+
+def test_unknown_previous_list_raises(store):
+    with pytest.raises(ValueError):
+        RowMatcher("missing")
+
+
+def test_remap_duplicate_ids_follows_matched_ids():
+    records = [
+        {"id": "p1", "company_name": "山田商事"},
+        {"id": "new2", "company_name": "山田商事", "duplicate_of": "new1"},
+        {"id": "new3", "company_name": "佐藤工業", "duplicate_of": "other-row"},
+        {"id": "new4", "company_name": "鈴木物産", "duplicate_of": None},
+    ]
+    key_rows = [("new1", 0, "山田商事"), ("new3", 2, "佐藤工業"), ("new4", 3, "鈴木物産")]
+    id_map = {"new1": "p1", "new4": "p4"}
+
+    remapped = remap_duplicate_ids(records, key_rows, id_map)
+
+    # 照合で置き換えたIDのみ変わり、照合されなかった行のIDはそのまま
+    assert [record.get("duplicate_of") for record in records] == [None, "p1", "other-row", None]
+    assert remapped == [("p1", 0, "山田商事"), ("new3", 2, "佐藤工業"), ("p4", 3, "鈴木物産")]
+
+
+def test_remap_duplicate_ids_without_matches_returns_keys_unchanged():
+    records = [{"id": "new2", "duplicate_of": "new1"}]
+    key_rows = [("new1", 0, "山田商事")]
+
+    assert remap_duplicate_ids(records, key_rows, {}) is key_rows
+    assert records[0]["duplicate_of"] == "new1"
@@ -0,0 +1,87 @@
+"""
+CSVのエンコーディングの判定（utils.encoding）と読み込み（data_service.read_file / read_file_chunks）のテスト
+
+実行方法（Back ディレクトリから）:
+    python -m pytest tests
+"""
+import pandas as pd
+import pytest
+
+from services.data_service import read_file, read_file_chunks
+from utils.encoding import detect_encoding, next_encoding
+
+JAPANESE_CSV = "会社名,業種,所在地\n山田商事株式会社,情報通信業,東京都千代田区\n佐藤工業株式会社,製造業,大阪府大阪市\n"
+
+EXPECTED = pd.DataFrame({
+    "会社名": ["山田商事株式会社", "佐藤工業株式会社"],
+    "業種": ["情報通信業", "製造業"],
+    "所在地": ["東京都千代田区", "大阪府大阪市"],
+})
+
+
+def write_csv(tmp_path, data, name="leads.csv"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.mark.parametrize("data, expected", [
+    (JAPANESE_CSV.encode("utf-8-sig"), "utf-8-sig"),
+    (JAPANESE_CSV.encode("utf-8"), "utf-8"),
+    (JAPANESE_CSV.encode("cp932"), "cp932"),
+    (JAPANESE_CSV.encode("euc-jp"), "euc-jp"),
+])
+def test_detect_encoding(tmp_path, data, expected):
+    path = write_csv(tmp_path, data)
+    assert detect_encoding(path) == expected
+    pd.testing.assert_frame_equal(read_file(path), EXPECTED)
+
+
+def test_next_encoding():
+    assert next_encoding("utf-8") == "cp932"
+    assert next_encoding("UTF8") == "cp932"
+    assert next_encoding("cp932") == "euc-jp"
+    assert next_encoding("euc-jp") is None
+    assert next_encoding("utf-8-sig") is None
+
+
+def ascii_then_cp932_csv(rows=22000):
+    """
+    英語のヘッダーとASCIIのみの行が判定の範囲（1MiB）を超えて続き、最後の行のみcp932の日本語を含むCSV（約1.27MB）
+    """
+    lines = ["company_name,industry,phone"]
+    lines += [f"Company {i:05d} Holdings,Information Technology,03-{i:04d}-0000" for i in range(rows)]
+    return ("\n".join(lines) + "\n").encode("ascii") + "山田商事株式会社,情報通信業,03-1234-5678\n".encode("cp932")
+
+
+def test_read_file_falls_back_when_prefix_is_ascii(tmp_path):
+    data = ascii_then_cp932_csv()
+    assert len(data) > 1024 * 1024
+    path = write_csv(tmp_path, data)
+
+    # 先頭の範囲はASCIIのみのため判定できず、最初の候補になる
+    assert detect_encoding(path) == "utf-8"
+
+    df = read_file(path)
+    assert len(df) == 22001
+    assert df.iloc[-1].tolist() == ["山田商事株式会社", "情報通信業", "03-1234-5678"]
+    assert df.iloc[0, 0] == "Company 00000 Holdings"
+
+
+def test_read_file_chunks_falls_back_without_repeating_rows(tmp_path):
+    path = write_csv(tmp_path, ascii_then_cp932_csv())
+
+    chunks = list(read_file_chunks(path, chunksize=5000))
+    df = pd.concat(chunks)
+    assert len(df) == 22001
+    assert df["company_name"].is_unique
+    assert df.index.tolist() == list(range(22001))
+    assert df.iloc[-1].tolist() == ["山田商事株式会社", "情報通信業", "03-1234-5678"]
+    assert all(len(chunk) <= 5000 for chunk in chunks)
+
+
+def test_read_file_raises_when_no_candidate_decodes(tmp_path):
+    # どの候補でも復号できないバイト列は、次の候補で読み直した後にエラーとなる
+    path = write_csv(tmp_path, b"company_name\n" + b"\xff\xfe\xfd\xfc\n" * 3)
+    with pytest.raises(UnicodeDecodeError):
+        read_file(path)
@@ -0,0 +1,114 @@
+"""
+ファイル処理のジョブ（job_service.JobManager）のテスト
+
+実行方法（Back ディレクトリから）:
+    python -m pytest tests
+"""
+import subprocess
+import sys
+from concurrent.futures import Future
+
+from fastapi.testclient import TestClient
+
+from services.job_service import JobManager
+from services.store_service import create_job, get_connection, get_job, save_list, update_job
+
+SUMMARY = {
+    "list_id": "list1",
+    "mapping": {"company_name": "会社名"},
+    "column_types": {"company_name": "text"},
+    "encoding": "utf-8",
+    "dedup": {"duplicates": 0, "cross_list_matches": 0},
+    "row_count": 1,
+}
+
+
+def make_manager():
+    return JobManager(max_workers=1, max_active=10, retention=3600)
+
+
+def finished_future(result=None, error=None):
+    future = Future()
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+    return future
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_result_survives_restart(store):
+    create_job("job1", "list1")
+    make_manager()._finish("job1", finished_future(SUMMARY))
+
+    # 再起動後（別のインスタンス）でも状態と概要を取得できる
+    manager = make_manager()
+    assert manager.get_status("job1")["status"] == "completed"
+    assert manager.get_status("job1")["progress"] == 1.0
+    assert manager.get_result("job1") == SUMMARY
+
+
+def test_result_is_none_until_completed(store):
+    create_job("job1", "list1")
+    manager = make_manager()
+    assert manager.get_result("job1") is None
+    manager._finish("job1", finished_future(error=ValueError("読み込めません")))
+    assert manager.get_result("job1") is None
+    assert get_job("job1")["status"] == "failed"
+
+
+def test_recover_fails_jobs_of_exited_processes(store):
+    for job_id in ("orphan-queued", "orphan-running", "live", "done"):
+        create_job(job_id, "list1")
+    update_job("orphan-running", status="running", stage="normalizing", progress=0.3)
+    update_job("done", status="completed")
+    conn = get_connection()
+    with conn:
+        conn.execute("UPDATE jobs SET owner_pid = ? WHERE job_id LIKE 'orphan-%'", (dead_pid(),))
+
+    assert make_manager().recover() == 2
+    assert get_job("orphan-queued")["status"] == "failed"
+    assert get_job("orphan-running")["status"] == "failed"
+    assert get_job("orphan-running")["error"]
+    # 実行中のプロセスのジョブと終了済みのジョブはそのまま
+    assert get_job("live")["status"] == "queued"
+    assert get_job("done")["status"] == "completed"
+    assert make_manager().recover() == 0
+
+
+def test_result_endpoint_reads_persisted_summary(store):
+    import main
+
+    save_list("list1", [{"id": "r1", "company_name": "山田商事"}], SUMMARY["mapping"], ["f1"])
+    create_job("job1", "list1")
+    make_manager()._finish("job1", finished_future(SUMMARY))
+    create_job("job2", "list1")
+
+    with TestClient(main.app) as client:
+        response = client.get("/api/process/jobs/job1/result")
+        assert response.status_code == 200
+        body = response.json()
+        assert body["data"] == [{"id": "r1", "company_name": "山田商事"}]
+        assert body["mapping"] == SUMMARY["mapping"]
+        assert body["dedup"] == SUMMARY["dedup"]
+
+        response = client.get("/api/process/jobs/job2/result")
+        assert response.status_code == 409
+
+
+def test_app_startup_fails_orphaned_jobs(store):
+    import main
+
+    create_job("orphan", "list1")
+    conn = get_connection()
+    with conn:
+        conn.execute("UPDATE jobs SET owner_pid = ? WHERE job_id = 'orphan'", (dead_pid(),))
+
+    with TestClient(main.app) as client:
+        assert get_job("orphan")["status"] == "failed"
+        assert client.get("/api/process/jobs/orphan").json()["status"] == "failed"
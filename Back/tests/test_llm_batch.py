@@ -0,0 +1,156 @@
+"""
+営業文面の一括生成（llm_service）のテスト
+
+Gemini API は呼び出さず、call_gemini_api をプロンプトに応じて応答を返すスタブに置き換える。
+
+実行方法（Back ディレクトリから）:
+    python -m pytest tests
+"""
+import asyncio
+import json
+import re
+
+import pytest
+
+from config import settings
+from services import llm_service
+from services.llm_service import build_batch_prompt, generate_sales_texts, parse_batch_response
+
+COMPANIES = [
+    {"id": "c1", "company_name": "山田商事", "industry": "IT", "status": "処理中", "salesText": ""},
+    {"id": "c2", "company_name": "佐藤工業", "industry": "製造業"},
+    {"id": "c3", "company_name": "鈴木物産", "industry": "小売"},
+]
+
+COMPANY_NAME_PATTERN = re.compile(r"company_name: (\S+)")
+
+
+class StubModel:
+    """
+    call_gemini_api の代わりに呼び出され、プロンプトの種類ごとに応答を返す
+    batch_response: 一括生成のプロンプトを受け取り、応答の文字列を返す（例外を送出してもよい）
+    failing: 個別生成で失敗させる会社名
+    """
+    def __init__(self, batch_response=None, failing=()):
+        self.batch_response = batch_response
+        self.failing = set(failing)
+        self.batch_calls = 0
+        self.single_calls = []
+
+    def __call__(self, prompt):
+        if "複数の企業" in prompt:
+            self.batch_calls += 1
+            return self.batch_response(prompt)
+        company_name = COMPANY_NAME_PATTERN.search(prompt).group(1)
+        self.single_calls.append(company_name)
+        if company_name in self.failing:
+            raise ValueError(f"生成できません: {company_name}")
+        return single_text(company_name)
+
+
+def single_text(company_name):
+    return f"{company_name}様への個別の営業文面"
+
+
+def batch_text(company_id):
+    return f"{company_id}への一括の営業文面"
+
+
+def batch_ids(prompt):
+    """
+    一括生成のプロンプトに含まれる企業IDを取り出す
+    """
+    start = prompt.index("{")
+    end = prompt.index("\n    \n    ## 指示")
+    return list(json.loads(prompt[start:end]).keys())
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    """
+    本番環境の設定で一括生成を有効にし、Gemini API の呼び出しをスタブに置き換える
+    """
+    monkeypatch.setenv("ENVIRONMENT", "production")
+    monkeypatch.setattr(settings, "LLM_BATCH_SIZE", 10)
+    monkeypatch.setattr(settings, "SALES_TEXT_CACHE_ENABLED", False)
+    monkeypatch.setattr(llm_service.llm_scheduler, "max_retries", 0)
+
+    def no_model():
+        raise AssertionError("実際のGeminiモデルを使用しようとしました")
+
+    monkeypatch.setattr(llm_service, "get_gemini_model", no_model)
+    model = StubModel()
+    monkeypatch.setattr(llm_service, "call_gemini_api", model)
+    return model
+
+
+def generate(companies=COMPANIES):
+    return asyncio.run(generate_sales_texts(companies))
+
+
+def test_build_batch_prompt_lists_companies_without_excluded_fields():
+    prompt = build_batch_prompt({company["id"]: company for company in COMPANIES})
+    start = prompt.index("{")
+    end = prompt.index("\n    \n    ## 指示")
+    data = json.loads(prompt[start:end])
+    assert list(data) == ["c1", "c2", "c3"]
+    assert data["c1"] == {"company_name": "山田商事", "industry": "IT"}
+
+
+def test_parse_batch_response_reads_fenced_json():
+    response = '```json\n{"c1": " 文面1 ", "c2": "文面2"}\n```'
+    assert parse_batch_response(response, ["c1", "c2"]) == {"c1": "文面1", "c2": "文面2"}
+
+
+def test_parse_batch_response_returns_nothing_for_malformed_json():
+    assert parse_batch_response('{"c1": "文面1", "c2": ', ["c1", "c2"]) == {}
+    assert parse_batch_response('["文面1", "文面2"]', ["c1", "c2"]) == {}
+
+
+def test_parse_batch_response_skips_missing_extra_and_empty_ids():
+    response = json.dumps({"c1": "文面1", "c3": "", "c4": "文面4", "c5": 5})
+    assert parse_batch_response(response, ["c1", "c2", "c3", "c5"]) == {"c1": "文面1"}
+
+
+def test_batch_response_is_used_for_all_companies(stub):
+    stub.batch_response = lambda prompt: "```json\n" + json.dumps(
+        {company_id: batch_text(company_id) for company_id in batch_ids(prompt)}, ensure_ascii=False
+    ) + "\n```"
+    results, errors = generate()
+    assert results == {"c1": batch_text("c1"), "c2": batch_text("c2"), "c3": batch_text("c3")}
+    assert errors == {}
+    assert stub.batch_calls == 1
+    assert stub.single_calls == []
+
+
+def test_missing_and_extra_ids_fall_back_to_individual_calls(stub):
+    stub.batch_response = lambda prompt: json.dumps(
+        {"c1": batch_text("c1"), "c3": "  ", "unknown": batch_text("unknown")}, ensure_ascii=False
+    )
+    results, errors = generate()
+    assert results == {"c1": batch_text("c1"), "c2": single_text("佐藤工業"), "c3": single_text("鈴木物産")}
+    assert list(results) == ["c1", "c2", "c3"]
+    assert errors == {}
+    assert sorted(stub.single_calls) == ["佐藤工業", "鈴木物産"]
+
+
+def test_malformed_batch_response_falls_back_to_individual_calls(stub):
+    stub.batch_response = lambda prompt: "申し訳ありません。JSONで出力できませんでした。"
+    results, errors = generate()
+    assert results == {company["id"]: single_text(company["company_name"]) for company in COMPANIES}
+    assert errors == {}
+    assert stub.batch_calls == 1
+    assert len(stub.single_calls) == 3
+
+
+def test_failed_batch_falls_back_to_individual_calls_and_reports_errors(stub):
+    def fail(prompt):
+        raise ValueError("一括生成に失敗しました")
+
+    stub.batch_response = fail
+    stub.failing = {"佐藤工業"}
+    results, errors = generate()
+    assert results == {"c1": single_text("山田商事"), "c3": single_text("鈴木物産")}
+    assert list(errors) == ["c2"]
+    assert stub.batch_calls == 1
+    assert sorted(stub.single_calls) == ["佐藤工業", "山田商事", "鈴木物産"]
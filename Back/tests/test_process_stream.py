@@ -0,0 +1,68 @@
+"""
+ファイルのストリーミング処理（data_service.iter_process_file）のテスト
+
+実行方法（Back ディレクトリから）:
+    python -m pytest tests
+"""
+import orjson
+import pytest
+
+from config import settings
+from services.data_service import iter_process_file, process_file_sync
+
+CSV = (
+    "会社名,従業員数,設立日\n"
+    "山田商事,100,2010-04-01\n"
+    "佐藤工業,200,2011/05/01\n"
+    "鈴木物産,約100名,不明\n"
+    "高橋電機,300,2012-06-03\n"
+    "田中建設,不明,\n"
+)
+
+
+@pytest.fixture
+def upload(store, tmp_path, monkeypatch):
+    """
+    アップロードディレクトリを一時ディレクトリに切り替え、CSVを置く
+    """
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "PARSE_CACHE_ENABLED", False)
+    (tmp_path / "file1.csv").write_text(CSV, encoding="utf-8")
+    return "file1"
+
+
+def read_stream(file_id, chunksize):
+    lines = [orjson.loads(line) for line in b"".join(iter_process_file(file_id, chunksize=chunksize)).splitlines()]
+    return lines[0], lines[1:-1], lines[-1]
+
+
+def test_summary_reports_values_that_do_not_match_header_types(upload):
+    header, records, trailer = read_stream(upload, chunksize=2)
+
+    # 型は最初のチャンクから推定する
+    assert header["column_types"]["employee_count"] == "numeric"
+    assert header["column_types"]["established_year"] == "date"
+    assert [record["employee_count"] for record in records] == [100, 200, "約100名", 300, "不明"]
+    assert [record["established_year"] for record in records] == [
+        "2010-04-01", "2011-05-01", "不明", "2012-06-03", None
+    ]
+    assert trailer == {"summary": {
+        "row_count": 5,
+        "type_violations": {
+            "employee_count": {"type": "numeric", "count": 2},
+            "established_year": {"type": "date", "count": 1},
+        },
+    }}
+
+
+def test_summary_without_violations(upload):
+    _, records, trailer = read_stream(upload, chunksize=100)
+    assert len(records) == 5
+    assert trailer == {"summary": {"row_count": 5, "type_violations": {}}}
+
+
+def test_violating_columns_are_text_in_batch_mode(upload):
+    _, _, trailer = read_stream(upload, chunksize=2)
+    result = process_file_sync(upload)
+    for col in trailer["summary"]["type_violations"]:
+        assert result["column_types"][col] == "text"
@@ -0,0 +1,157 @@
+"""
+営業文面の生成の再接続（sales_text_service.SalesTextRunManager）のテスト
+
+LLM は呼び出さず、generate_sales_texts を呼び出しを記録するスタブに置き換える。
+
+実行方法（Back ディレクトリから）:
+    python -m pytest tests
+"""
+import asyncio
+
+import pytest
+
+from config import settings
+from services import sales_text_service
+from services.sales_text_service import SalesTextRunManager, format_event_id, is_done_event
+from services.store_service import get_sales_text_run, save_list
+
+COMPANIES = [
+    {"id": "c1", "company_name": "山田商事"},
+    {"id": "c2", "company_name": "佐藤工業"},
+    {"id": "c3", "company_name": "鈴木物産"},
+]
+
+
+class StubGenerator:
+    """
+    generate_sales_texts の代わりに呼び出され、生成した企業IDを記録する
+    gate を指定した場合、最初の企業以外は gate が設定されるまで生成を待つ
+    """
+    def __init__(self, gate=None):
+        self.gate = gate
+        self.calls = []
+
+    async def __call__(self, companies, force=False):
+        ids = [str(company["id"]) for company in companies]
+        self.calls.extend(ids)
+        if self.gate is not None and ids != ["c1"]:
+            await self.gate.wait()
+        return {company_id: f"{company_id}への営業文面" for company_id in ids}, {}
+
+
+@pytest.fixture
+def saved_list(store, monkeypatch):
+    monkeypatch.delenv("ENVIRONMENT", raising=False)
+    # 1件ずつ順に生成し、イベントの順序を一定にする
+    monkeypatch.setattr(settings, "LLM_BATCH_SIZE", 1)
+    monkeypatch.setattr(settings, "LLM_MAX_CONCURRENCY", 1)
+    save_list("list1", [dict(company) for company in COMPANIES], {"company_name": "会社名"})
+    return "list1"
+
+
+def use_generator(monkeypatch, generator):
+    monkeypatch.setattr(sales_text_service, "generate_sales_texts", generator)
+    return generator
+
+
+async def collect(events):
+    """
+    保存されるイベント（連番付き）のみを (連番, イベント) の一覧として返す
+    """
+    received = []
+    async for seq, event in events:
+        if seq is not None:
+            received.append((seq, event))
+    return received
+
+
+async def wait_finished(manager):
+    await asyncio.gather(*[run.task for run in list(manager.runs.values())])
+
+
+def text_ids(received):
+    return [event["id"] for _, event in received if "text" in event]
+
+
+def test_reconnect_with_last_event_id_resumes_running_generation(saved_list, monkeypatch):
+    async def scenario():
+        generator = use_generator(monkeypatch, StubGenerator(gate=asyncio.Event()))
+        manager = SalesTextRunManager()
+
+        # 最初の生成結果を受け取った時点で切断する
+        run_id, events = await manager.open(saved_list)
+        async for seq, event in events:
+            if seq is not None:
+                first = (seq, event)
+                break
+        await events.aclose()
+        assert first[1]["id"] == "c1"
+
+        resumed_id, events = await manager.open(saved_list, last_event_id=format_event_id(run_id, first[0]))
+        generator.gate.set()
+        received = await collect(events)
+        await wait_finished(manager)
+        return run_id, resumed_id, first, received, generator
+
+    run_id, resumed_id, first, received, generator = asyncio.run(scenario())
+
+    # 同じ生成の続きのみを受け取り、生成はやり直さない
+    assert resumed_id == run_id
+    assert [seq for seq, _ in received] == list(range(first[0] + 1, first[0] + 1 + len(received)))
+    assert text_ids(received) == ["c2", "c3"]
+    assert is_done_event(received[-1][1])
+    assert generator.calls == ["c1", "c2", "c3"]
+
+
+def test_stale_run_id_starts_from_beginning(saved_list, monkeypatch):
+    async def scenario():
+        use_generator(monkeypatch, StubGenerator())
+        manager = SalesTextRunManager()
+        old_run_id, events = await manager.open(saved_list)
+        await collect(events)
+        await wait_finished(manager)
+
+        # 前回の生成のイベントを消して新たに生成したため、古いIDの連番は使えない
+        new_run_id, events = await manager.open(saved_list, force=True)
+        await collect(events)
+        await wait_finished(manager)
+
+        stale_id, events = await manager.open(saved_list, last_event_id=format_event_id(old_run_id, 2))
+        received = await collect(events)
+        await wait_finished(manager)
+        return old_run_id, new_run_id, stale_id, received
+
+    old_run_id, new_run_id, stale_id, received = asyncio.run(scenario())
+
+    # 古いIDでは再送せず、新たな生成を最初から送る
+    assert stale_id not in (old_run_id, new_run_id)
+    assert get_sales_text_run(saved_list)["run_id"] == stale_id
+    assert received[0][0] == 1
+    assert [seq for seq, _ in received] == list(range(1, len(received) + 1))
+    assert sorted(text_ids(received)) == ["c1", "c2", "c3"]
+    assert is_done_event(received[-1][1])
+
+
+def test_resume_after_run_finished_replays_stored_events(saved_list, monkeypatch):
+    async def scenario():
+        generator = use_generator(monkeypatch, StubGenerator())
+        manager = SalesTextRunManager()
+        run_id, events = await manager.open(saved_list)
+        complete = await collect(events)
+        await wait_finished(manager)
+
+        # 再起動後（別のインスタンス）に再接続する
+        resumed_id, events = await SalesTextRunManager().open(
+            saved_list, last_event_id=format_event_id(run_id, complete[0][0])
+        )
+        received = await collect(events)
+        return run_id, resumed_id, complete, received, generator
+
+    run_id, resumed_id, complete, received, generator = asyncio.run(scenario())
+
+    # 保存済みのイベントの続きを再送し、LLMは呼び出さない
+    assert get_sales_text_run(saved_list)["status"] == "completed"
+    assert resumed_id == run_id
+    assert received == complete[1:]
+    assert is_done_event(received[-1][1])
+    assert generator.calls == ["c1", "c2", "c3"]
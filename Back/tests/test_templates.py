@@ -0,0 +1,51 @@
+"""
+ダミー営業文面のテンプレートの描画（utils.templates・llm_service のダミー生成）のテスト
+
+実行方法（Back ディレクトリから）:
+    python -m pytest tests
+"""
+import asyncio
+
+import pandas as pd
+import pytest
+
+from config import settings
+from services.llm_service import generate_dummy_sales_text, generate_dummy_sales_texts, sample_text_renderer
+
+COMPANIES = [
+    {"id": f"row-{index}", "company_name": f"株式会社テスト{index}", "industry": "IT",
+     "contact_person": "山田太郎" if index % 2 else None}
+    for index in range(20)
+]
+
+
+@pytest.fixture
+def seeded(monkeypatch):
+    monkeypatch.setattr(settings, "DUMMY_LLM_SEED", 7)
+    monkeypatch.setattr(settings, "DUMMY_LLM_LATENCY", 0)
+
+
+def test_batch_matches_single_with_seed(seeded):
+    singles = [generate_dummy_sales_text(company) for company in COMPANIES]
+    batch = asyncio.run(generate_dummy_sales_texts({company["id"]: company for company in COMPANIES}))
+    assert batch == {company["id"]: text for company, text in zip(COMPANIES, singles)}
+
+
+def test_bulk_apis_match_app_output(seeded):
+    expected = [generate_dummy_sales_text(company) for company in COMPANIES]
+    assert sample_text_renderer.render_many(COMPANIES, 7) == expected
+    assert sample_text_renderer.render_frame(pd.DataFrame(COMPANIES), 7) == expected
+    # 件数・順序によらず、同じ企業には同じ文面になる
+    assert sample_text_renderer.render_many(COMPANIES[::-1], 7) == expected[::-1]
+    assert sample_text_renderer.render_many(COMPANIES[3:4], 7) == expected[3:4]
+
+
+def test_seed_selects_different_templates():
+    texts = sample_text_renderer.render_many(COMPANIES, 7)
+    assert len({text.replace(company["company_name"], "") for company, text in zip(COMPANIES, texts)}) > 1
+    assert texts != sample_text_renderer.render_many(COMPANIES, 8)
+
+
+def test_placeholders_are_filled():
+    for text in sample_text_renderer.render_frame(pd.DataFrame(COMPANIES)):
+        assert "{" not in text